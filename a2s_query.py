@@ -0,0 +1,347 @@
+# a2s_query.py
+# Consulta directa al servidor de juego por UDP (protocolo Steam A2S_INFO / A2S_PLAYER)
+
+import asyncio
+import struct
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from config import ARK_SERVER_IDS, ARK_A2S_ADDRESSES, A2S_TIMEOUT, A2S_RETRIES
+
+HEADER_SIMPLE = b"\xFF\xFF\xFF\xFF"
+HEADER_SPLIT = -2
+A2S_INFO = HEADER_SIMPLE + b"TSource Engine Query\x00"
+A2S_PLAYER = HEADER_SIMPLE + b"U"
+S2C_CHALLENGE = 0x41  # 'A'
+S2A_INFO = 0x49  # 'I'
+S2A_PLAYER = 0x44  # 'D'
+NO_CHALLENGE = b"\xFF\xFF\xFF\xFF"
+
+
+class A2SError(Exception):
+    """Respuesta A2S inválida o inesperada"""
+
+
+# ==================== PAQUETES ====================
+
+class _Reader:
+    """Lectura secuencial de los tipos del protocolo (little-endian, cadenas terminadas en \\0)"""
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def _unpack(self, fmt: str):
+        try:
+            value = struct.unpack_from(fmt, self.data, self.offset)[0]
+        except struct.error:
+            raise A2SError("paquete truncado")
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def byte(self) -> int:
+        return self._unpack("<B")
+
+    def short(self) -> int:
+        return self._unpack("<h")
+
+    def long(self) -> int:
+        return self._unpack("<l")
+
+    def longlong(self) -> int:
+        return self._unpack("<Q")
+
+    def float(self) -> float:
+        return self._unpack("<f")
+
+    def string(self) -> str:
+        end = self.data.find(b"\x00", self.offset)
+        if end < 0:
+            raise A2SError("cadena sin terminar")
+        value = self.data[self.offset:end].decode("utf-8", errors="replace")
+        self.offset = end + 1
+        return value
+
+    def remaining(self) -> int:
+        return len(self.data) - self.offset
+
+
+def parse_info(payload: bytes) -> Dict[str, Any]:
+    """Cuerpo de S2A_INFO (sin la cabecera de 4 bytes ni el tipo) -> dict con los campos del protocolo"""
+    reader = _Reader(payload)
+    info = {
+        "protocol": reader.byte(),
+        "name": reader.string(),
+        "map": reader.string(),
+        "folder": reader.string(),
+        "game": reader.string(),
+        "app_id": reader.short(),
+        "players": reader.byte(),
+        "max_players": reader.byte(),
+        "bots": reader.byte(),
+        "server_type": chr(reader.byte()),
+        "environment": chr(reader.byte()),
+        "visibility": reader.byte(),
+        "vac": reader.byte(),
+        "version": reader.string(),
+    }
+    if reader.remaining():
+        edf = reader.byte()
+        if edf & 0x80:
+            info["port"] = reader.short() & 0xFFFF
+        if edf & 0x10:
+            info["steam_id"] = reader.longlong()
+        if edf & 0x40:
+            info["spectator_port"] = reader.short() & 0xFFFF
+            info["spectator_name"] = reader.string()
+        if edf & 0x20:
+            info["keywords"] = reader.string()
+        if edf & 0x01:
+            info["game_id"] = reader.longlong()
+    return info
+
+
+def parse_players(payload: bytes) -> List[Dict[str, Any]]:
+    """Cuerpo de S2A_PLAYER -> [{name, score, duration}] (ARK deja el nombre vacío en jugadores conectándose)"""
+    reader = _Reader(payload)
+    count = reader.byte()
+    players = []
+    for _ in range(count):
+        if not reader.remaining():
+            break  # Algunos servidores anuncian más jugadores de los que envían
+        reader.byte()  # índice (siempre 0 en la práctica)
+        players.append({
+            "name": reader.string(),
+            "score": reader.long(),
+            "duration": reader.float()
+        })
+    return players
+
+
+class _Protocol(asyncio.DatagramProtocol):
+    """Endpoint UDP de una consulta: encola los datagramas recibidos"""
+
+    def __init__(self):
+        self.packets: asyncio.Queue = asyncio.Queue()
+
+    def datagram_received(self, data: bytes, addr):
+        self.packets.put_nowait(data)
+
+    def error_received(self, exc: Exception):
+        self.packets.put_nowait(exc)
+
+
+class _Connection:
+    """Socket UDP hacia un servidor, con reensamblado de respuestas fragmentadas"""
+
+    def __init__(self, address: Tuple[str, int], timeout: float):
+        self.address = address
+        self.timeout = timeout
+        self.transport = None
+        self.protocol: Optional[_Protocol] = None
+        self.rtt_ms: Optional[float] = None  # Ida y vuelta del último intercambio (el ping)
+
+    async def __aenter__(self) -> "_Connection":
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            _Protocol, remote_addr=self.address
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        self.transport.close()
+
+    async def _packet(self) -> bytes:
+        packet = await asyncio.wait_for(self.protocol.packets.get(), self.timeout)
+        if isinstance(packet, Exception):
+            raise packet
+        return packet
+
+    async def request(self, payload: bytes) -> bytes:
+        """Enviar y devolver la respuesta completa, sin la cabecera 0xFFFFFFFF"""
+        sent = time.perf_counter()
+        self.transport.sendto(payload)
+        packet = await self._packet()
+        self.rtt_ms = (time.perf_counter() - sent) * 1000
+        header = struct.unpack_from("<l", packet)[0] if len(packet) >= 4 else 0
+        if header == -1:
+            return packet[4:]
+        if header != HEADER_SPLIT:
+            raise A2SError(f"cabecera desconocida {header}")
+
+        # Respuesta fragmentada (formato Source): id, total, número, tamaño máximo
+        fragments: Dict[int, bytes] = {}
+        total = None
+        while True:
+            if len(packet) < 12:
+                raise A2SError("fragmento truncado")
+            response_id, total, number = struct.unpack_from("<lBB", packet, 4)
+            if response_id & 0x80000000:
+                raise A2SError("respuesta comprimida no soportada")
+            if number >= total:
+                raise A2SError(f"fragmento {number} de {total}")
+            if number in fragments:
+                raise A2SError(f"fragmento {number} repetido")
+            fragments[number] = packet[12:]
+            if len(fragments) == total:
+                break
+            packet = await self._packet()
+        data = b"".join(fragments[i] for i in range(total))
+        if not data.startswith(HEADER_SIMPLE):
+            raise A2SError("respuesta fragmentada inválida")
+        return data[4:]
+
+    async def request_with_challenge(self, build) -> bytes:
+        """Hacer una petición resolviendo el desafío anti-spoofing (S2C_CHALLENGE) si el servidor lo pide"""
+        challenge = NO_CHALLENGE
+        for _ in range(3):
+            response = await self.request(build(challenge))
+            if not response:
+                raise A2SError("respuesta vacía")
+            if response[0] == S2C_CHALLENGE:
+                challenge = response[1:5]
+                continue
+            return response
+        raise A2SError("el servidor repite el desafío")
+
+
+# ==================== CLIENTE ====================
+
+class A2SStatusSource:
+    """
+    Fuente de estado alternativa a ARKStatusAPI: pregunta directamente al servidor de juego
+    - Misma interfaz que usa status_poller (get_server_status_async, retry_after, stats)
+      y mismo dict que ARKStatusAPI._parse_server_data
+    - Sin terceros ni límite de peticiones; una consulta tarda lo que el ping al servidor
+    - Un servidor que no responde se informa como offline (con el último nombre y mapa conocidos)
+    Direcciones en ARK_A2S_ADDRESSES ({server_id: (host, puerto de consulta)}); un server_id
+    con forma "host:puerto" se usa tal cual.
+    """
+
+    def __init__(self, server_ids: Optional[List[str]] = None,
+                 addresses: Optional[Dict[str, Tuple[str, int]]] = None, timeout: float = A2S_TIMEOUT):
+        self.server_ids = list(server_ids or ARK_SERVER_IDS)
+        self.server_id = self.server_ids[0]
+        self.addresses = dict(ARK_A2S_ADDRESSES if addresses is None else addresses)
+        self.timeout = timeout
+        self.retry_after: Dict[str, Optional[float]] = {}  # Interfaz de ARKStatusAPI: UDP no tiene límite
+        self._last_info: Dict[str, Dict[str, Any]] = {}
+        self._peak: Dict[str, int] = {}
+
+        # Métricas
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.last_response_ms: Optional[float] = None
+        self._response_times = deque(maxlen=100)
+
+    def address_for(self, server_id: str) -> Tuple[str, int]:
+        if server_id in self.addresses:
+            return self.addresses[server_id]
+        host, sep, port = server_id.rpartition(":")
+        if sep and port.isdigit():
+            return host, int(port)
+        raise A2SError(f"sin dirección A2S para el servidor {server_id} (ver ARK_A2S_ADDRESSES)")
+
+    async def query_info(self, server_id: str) -> Tuple[Dict[str, Any], float]:
+        """A2S_INFO de un servidor -> (campos del protocolo, ping en ms)"""
+        async with _Connection(self.address_for(server_id), self.timeout) as connection:
+            response = await connection.request_with_challenge(lambda challenge: (
+                A2S_INFO if challenge == NO_CHALLENGE else A2S_INFO + challenge
+            ))
+        if response[0] != S2A_INFO:
+            raise A2SError(f"tipo de respuesta inesperado {response[0]:#x}")
+        return parse_info(response[1:]), connection.rtt_ms
+
+    async def query_players(self, server_id: str) -> List[Dict[str, Any]]:
+        """A2S_PLAYER de un servidor -> [{name, score, duration}] (cuenta en stats() como las de estado)"""
+        started = time.perf_counter()
+        try:
+            async with _Connection(self.address_for(server_id), self.timeout) as connection:
+                response = await connection.request_with_challenge(lambda challenge: A2S_PLAYER + challenge)
+            if response[0] != S2A_PLAYER:
+                raise A2SError(f"tipo de respuesta inesperado {response[0]:#x}")
+            players = parse_players(response[1:])
+        except asyncio.TimeoutError:
+            self._record(started, error=True)
+            self.timeouts += 1
+            raise
+        except (OSError, A2SError):
+            self._record(started, error=True)
+            raise
+        self._record(started)
+        return players
+
+    async def get_server_status_async(self, server_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Estado de un servidor con el formato de ARKStatusAPI
+        Returns: dict (online=False si no responde) o None si la consulta no se pudo hacer
+        """
+        server_id = server_id or self.server_id
+        started = time.perf_counter()
+        info = None
+        for attempt in range(A2S_RETRIES + 1):
+            try:
+                info, ping = await self.query_info(server_id)
+                break
+            except asyncio.TimeoutError:
+                continue
+            except (OSError, A2SError) as e:
+                self._record(started, error=True)
+                print(f"Error A2S ({server_id}): {e}")
+                return None
+
+        if info is None:
+            # UDP sin respuesta: el servidor está caído o inaccesible
+            self._record(started, error=True)
+            self.timeouts += 1
+            return self._to_status(server_id, None, 0)
+
+        self._record(started)
+        self._last_info[server_id] = info
+        return self._to_status(server_id, info, ping)
+
+    async def get_cluster_status_async(self, server_ids: Optional[List[str]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Estado de varios servidores en paralelo: {server_id: datos o None}"""
+        server_ids = list(server_ids or self.server_ids)
+        results = await asyncio.gather(*[self.get_server_status_async(sid) for sid in server_ids])
+        return dict(zip(server_ids, results))
+
+    def _to_status(self, server_id: str, info: Optional[Dict[str, Any]], ping: float) -> Dict[str, Any]:
+        """Mismo dict que ARKStatusAPI._parse_server_data"""
+        known = info or self._last_info.get(server_id, {})
+        players = info["players"] if info else 0
+        self._peak[server_id] = max(self._peak.get(server_id, 0), players)
+        return {
+            "name": known.get("name", "Unknown Server"),
+            "map": known.get("map", "Unknown Map"),
+            "players": players,
+            "max_players": known.get("max_players", 70),
+            "ping": round(ping),
+            "version": known.get("version", "N/A"),
+            "online": info is not None,
+            "uptime": 0,  # A2S no informa del uptime
+            "peak_players": self._peak[server_id],
+            "platform": "PC",
+            "last_update": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+
+    def _record(self, started: float, error: bool = False):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.requests += 1
+        self.last_response_ms = elapsed_ms
+        self._response_times.append(elapsed_ms)
+        if error:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Consultas hechas, errores, timeouts y tiempos de respuesta recientes (ms)"""
+        times = sorted(self._response_times)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "last_ms": self.last_response_ms,
+            "p50_ms": times[len(times) // 2] if times else None,
+            "max_ms": times[-1] if times else None
+        }
@@ -1,46 +1,218 @@
 # ark_api.py
 # Cliente para la API de ARK Status
 
+import asyncio
+import time
+import httpx
 import requests
-from typing import Optional, Dict, Any
-from config import ARKSTATUS_API_KEY, ARKSTATUS_URL, ARK_SERVER_ID
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List
+from config import (
+    ARKSTATUS_API_KEY,
+    ARKSTATUS_URL,
+    ARK_SERVER_IDS,
+    ARKSTATUS_CONNECT_TIMEOUT,
+    ARKSTATUS_READ_TIMEOUT,
+    ARKSTATUS_KEEPALIVE,
+    ARKSTATUS_RATE_LIMIT,
+    ARKSTATUS_BURST
+)
+
+
+class RateBudget:
+    """
+    Presupuesto de peticiones compartido por todos los servidores (token bucket)
+    - per_minute peticiones por minuto de media, con ráfagas de hasta `burst`
+    - pause() detiene todas las peticiones (p. ej. tras un 429 con Retry-After: el límite es de la cuenta)
+    """
+    
+    def __init__(self, per_minute: int = ARKSTATUS_RATE_LIMIT, burst: int = ARKSTATUS_BURST):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waited = 0.0  # Segundos acumulados de espera por falta de presupuesto
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self):
+        """Esperar hasta que haya presupuesto para una petición"""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.paused_until and self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate else 1.0)
+            self.waited += wait
+            await asyncio.sleep(wait)
+    
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
 
 
 class ARKStatusAPI:
-    """Cliente para consultar el estado del servidor ARK"""
+    """
+    Cliente para consultar el estado de los servidores ARK (ARK_SERVER_IDS; el primero es el principal)
+    - get_server_status_async: httpx.AsyncClient persistente (keep-alive entre sondeos, sin hilo por consulta)
+    - get_cluster_status_async: todos los servidores en paralelo dentro de un presupuesto de peticiones común
+    - get_server_status: versión bloqueante con una requests.Session reutilizada
+    - Mide el tiempo de respuesta de cada consulta (ver stats())
+    """
     
-    def __init__(self):
+    def __init__(self, server_ids: Optional[List[str]] = None):
         self.api_key = ARKSTATUS_API_KEY
         self.base_url = ARKSTATUS_URL
-        self.server_id = ARK_SERVER_ID
+        self.server_ids = list(server_ids or ARK_SERVER_IDS)
+        self.server_id = self.server_ids[0]
+        self.budget = RateBudget()
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._session: Optional[requests.Session] = None
+        
+        # Métricas
+        self.requests = 0
+        self.errors = 0
+        self.last_response_ms: Optional[float] = None
+        self.last_status_code: Dict[str, Optional[int]] = {}  # Por servidor; None si no hubo respuesta
+        self.retry_after: Dict[str, Optional[float]] = {}  # Segundos pedidos en el último 429/503 de cada servidor
+        self._response_times = deque(maxlen=100)
+    
+    @property
+    def url(self) -> str:
+        return self.url_for(self.server_id)
+    
+    def url_for(self, server_id: str) -> str:
+        return f"{self.base_url}/{server_id}"
     
-    def get_server_status(self) -> Optional[Dict[str, Any]]:
+    # ==================== ASYNC ====================
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente async del proceso (queda ligado al event loop donde se usa por primera vez)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(ARKSTATUS_READ_TIMEOUT, connect=ARKSTATUS_CONNECT_TIMEOUT),
+                # Una conexión por servidor consultado en paralelo; se mantienen vivas entre consultas
+                limits=httpx.Limits(max_connections=max(4, len(self.server_ids)),
+                                    max_keepalive_connections=max(2, len(self.server_ids)),
+                                    keepalive_expiry=ARKSTATUS_KEEPALIVE)
+            )
+        return self._client
+    
+    async def get_server_status_async(self, server_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        Obtener estado actual del servidor
+        Obtener estado actual de un servidor (el principal por defecto) sin bloquear el event loop
         Returns: Dict con información del servidor o None si hay error
         """
+        server_id = server_id or self.server_id
+        await self.budget.acquire()
+        started = time.perf_counter()
         try:
-            url = f"{self.base_url}/{self.server_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_server_data(data)
-            else:
-                print(f"Error API: {response.status_code}")
-                return None
+            response = await self._get_client().get(self.url_for(server_id))
+            data = self._handle_response(response, server_id)
+            # Se registra una sola vez: si el parseo falla cuenta como error, no como éxito y error
+            self._record(started, server_id)
+            if response.status_code == 429 and self.retry_after.get(server_id):
+                self.budget.pause(self.retry_after[server_id])
+            return data
+        except httpx.TimeoutException:
+            self._record(started, server_id, error=True)
+            print(f"Timeout al consultar API ({server_id})")
+            return None
+        except Exception as e:
+            self._record(started, server_id, error=True)
+            print(f"Error consultando servidor {server_id}: {e}")
+            return None
+    
+    async def get_cluster_status_async(self, server_ids: Optional[List[str]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Estado de varios servidores en paralelo: {server_id: datos o None}"""
+        server_ids = list(server_ids or self.server_ids)
+        results = await asyncio.gather(*[self.get_server_status_async(sid) for sid in server_ids])
+        return dict(zip(server_ids, results))
+    
+    async def aclose(self):
+        """Cerrar las conexiones del cliente async"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    # ==================== SÍNCRONO ====================
+    
+    def get_server_status(self, server_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtener estado actual de un servidor (el principal por defecto)
+        Returns: Dict con información del servidor o None si hay error
+        """
+        server_id = server_id or self.server_id
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+        
+        started = time.perf_counter()
+        try:
+            response = self._session.get(
+                self.url_for(server_id),
+                timeout=(ARKSTATUS_CONNECT_TIMEOUT, ARKSTATUS_READ_TIMEOUT)
+            )
+            data = self._handle_response(response, server_id)
+            self._record(started, server_id)
+            return data
                 
         except requests.exceptions.Timeout:
-            print("Timeout al consultar API")
+            self._record(started, server_id, error=True)
+            print(f"Timeout al consultar API ({server_id})")
             return None
         except Exception as e:
-            print(f"Error consultando servidor: {e}")
+            self._record(started, server_id, error=True)
+            print(f"Error consultando servidor {server_id}: {e}")
             return None
     
+    # ==================== RESPUESTAS ====================
+    
+    def _handle_response(self, response, server_id: str) -> Optional[Dict[str, Any]]:
+        """Respuesta de httpx o de requests (misma interfaz: status_code, headers, json())"""
+        self.last_status_code[server_id] = response.status_code
+        self.retry_after[server_id] = None
+        if response.status_code == 200:
+            return self._parse_server_data(response.json())
+        if response.status_code in (429, 503):
+            self.retry_after[server_id] = _parse_retry_after(response.headers.get("Retry-After"))
+        print(f"Error API ({server_id}): {response.status_code}")
+        self.errors += 1
+        return None
+    
+    def _record(self, started: float, server_id: str, error: bool = False):
+        """Registrar la duración de una consulta (incluye las fallidas)"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if error:
+            self.last_status_code[server_id] = None
+            self.retry_after[server_id] = None
+        self.requests += 1
+        self.last_response_ms = elapsed_ms
+        self._response_times.append(elapsed_ms)
+        if error:
+            self.errors += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Consultas hechas, errores y tiempos de respuesta recientes (ms)"""
+        times = sorted(self._response_times)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "last_ms": self.last_response_ms,
+            "p50_ms": times[len(times) // 2] if times else None,
+            "max_ms": times[-1] if times else None,
+            "budget_waited_s": self.budget.waited
+        }
+    
     def _parse_server_data(self, raw_data: Dict) -> Dict[str, Any]:
         """Parsear y estructurar datos de la API"""
         try:
@@ -74,3 +246,17 @@ class ARKStatusAPI:
                 "platform": "N/A",
                 "last_update": "N/A"
             }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After en segundos o como fecha HTTP -> segundos desde ahora"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -7,6 +7,7 @@ from .server_status_view import ServerStatusView
 from .generators_view import GeneratorsView
 from .tasks_view import TasksView
 from .members_view import MembersView
+from .keyed_list import KeyedList
 
 __all__ = [
     'LoginView',
@@ -14,5 +15,6 @@ __all__ = [
     'ServerStatusView',
     'GeneratorsView',
     'TasksView',
-    'MembersView'
+    'MembersView',
+    'KeyedList'
 ]
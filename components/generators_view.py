@@ -4,7 +4,8 @@
 import flet as ft
 from config import COLORS
 import time
-from typing import Dict, Any
+from models import Generator
+from components.keyed_list import KeyedList
 
 
 class GeneratorsView:
@@ -41,7 +42,14 @@ class GeneratorsView:
         )
         
         self.generators_container = ft.Column([], spacing=10)
+        self.generator_cards = KeyedList(
+            self.generators_container,
+            create=lambda state: self._create_generator_card(state[0]),
+            update=self._update_generator_card,
+            empty_text="No hay generadores activos"
+        )
         self.error_text = ft.Text("", color=COLORS["danger"], size=12)
+        self.generators = {}  # {gen_id: Generator} del último listado (para acciones en lote)
 
     def build(self) -> ft.Container:
         """Construir vista de generadores"""
@@ -59,7 +67,7 @@ class GeneratorsView:
             bgcolor=COLORS["accent"],
             color="#000000",
             height=40,
-            on_click=lambda _: self._add_generator()
+            on_click=lambda _: self.page.run_task(self._add_generator)
         )
         
         add_form = ft.Container(
@@ -77,14 +85,23 @@ class GeneratorsView:
             border=ft.border.all(1, COLORS["border"])
         )
         
+        purge_button = ft.TextButton(
+            content=ft.Text("Eliminar expirados", size=12, color=COLORS["danger"]),
+            icon=ft.Icons.DELETE_SWEEP,
+            on_click=lambda _: self.page.run_task(self._delete_expired)
+        )
+        
         generators_list = ft.Container(
             content=ft.Column([
-                ft.Text(
-                    "Generadores Activos",
-                    size=16,
-                    weight=ft.FontWeight.BOLD,
-                    color=COLORS["text_secondary"]
-                ),
+                ft.Row([
+                    ft.Text(
+                        "Generadores Activos",
+                        size=16,
+                        weight=ft.FontWeight.BOLD,
+                        color=COLORS["text_secondary"]
+                    ),
+                    purge_button
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                 self.generators_container
             ], spacing=15),
             padding=20,
@@ -103,7 +120,7 @@ class GeneratorsView:
             padding=30
         )
     
-    def _add_generator(self):
+    async def _add_generator(self):
         """Añadir nuevo generador"""
         self.error_text.value = ""
         
@@ -122,67 +139,74 @@ class GeneratorsView:
                 if self.page: self.page.update()
                 return
             
-            success = self.firebase.add_generator(name, duration_days)
-            if success:
-                self.name_field.value = ""
-                self.duration_field.value = ""
-                if self.page:
-                    self.page.update()
-                self.refresh_generators(self.page)
         except ValueError:
             self.error_text.value = "Ingresa un número válido de días."
             if self.page: self.page.update()
+            return
+        
+        # Optimista: se pinta ya y la cola de escritura lo guarda en segundo plano
+        gen_id = self.firebase.new_key()
+        gen_data = self.firebase.generator_record(name, duration_days)
+        self.firebase.enqueue_set(
+            f"generators/{gen_id}", gen_data,
+            on_error=lambda _: self._rollback("No se pudo guardar el generador.", lambda: self.generators.pop(gen_id, None))
+        )
+        
+        self.generators[gen_id] = Generator.from_dict(gen_id, gen_data)
+        self.name_field.value = ""
+        self.duration_field.value = ""
+        self._render_generators(force=True)
     
-    def refresh_generators(self, page=None):
+    async def refresh_generators(self, page=None):
         """Actualizar lista de generadores"""
         if page:
             self.page = page
         
-        generators = self.firebase.get_generators()
-        self.generators_container.controls.clear()
-        
-        if not generators:
-            self.generators_container.controls.append(
-                ft.Text("No hay generadores activos", size=14, color=COLORS["text_secondary"])
-            )
-        else:
-            for gen_id, gen_data in generators.items():
-                self.generators_container.controls.append(
-                    self._create_generator_card(gen_id, gen_data)
-                )
+        generators = await self.firebase.get_generators_async()
+        self.generators = dict(self.firebase.overlay_pending("generators", list(generators.items())))
+        self._render_generators()
+    
+    def _render_generators(self, force: bool = False):
+        """
+        Pintar la lista desde el estado local (solo cambian las tarjetas cuyo countdown o datos cambian)
+        force: enviar la página aunque la lista no cambie (se tocaron otros controles)
+        """
+        now = int(time.time())
+        changed = self.generator_cards.render(
+            (gen_id, self._card_state(generator, now)) for gen_id, generator in self.generators.items()
+        )
         
-        if self.page:
+        if self.page and (changed or force):
             self.page.update()
     
-    def _create_generator_card(self, gen_id: str, gen_data: Dict[str, Any]) -> ft.Container:
-        """Crear tarjeta de generador con countdown"""
-        name = gen_data.get("name", "Sin nombre")
-        start_time = gen_data.get("start_timestamp", 0)
-        duration = gen_data.get("duration_seconds", 0)
-        created_by = gen_data.get("created_by", "Unknown")
+    def _rollback(self, message: str, undo):
+        """Deshacer un cambio local cuyo guardado falló (llamado desde la cola de escritura)"""
+        async def apply():
+            undo()
+            self.error_text.value = message
+            self._render_generators(force=True)
         
-        # Calcular tiempo restante
-        current_time = int(time.time())
-        elapsed = current_time - start_time
-        remaining = max(0, duration - elapsed)
+        if self.page:
+            self.page.run_task(apply)
+    
+    def _card_state(self, generator: Generator, now: int) -> tuple:
+        """Lo que muestra la tarjeta: (generador, countdown, progreso, activo)"""
+        duration = generator.duration_seconds
+        remaining = generator.remaining(now)
         progress = 1 - (remaining / duration) if duration > 0 else 1
-        
-        # Formatear tiempo restante
-        time_text = self._format_time(remaining)
+        return (generator, self._format_time(remaining), round(progress, 3), remaining > 0)
+    
+    def _create_generator_card(self, generator: Generator) -> ft.Container:
+        """Crear tarjeta de generador con countdown"""
+        name_text = ft.Text(size=16, weight=ft.FontWeight.BOLD, color=COLORS["text_primary"])
+        author_text = ft.Text(size=11, color=COLORS["text_secondary"])
         
         # Texto de tiempo
-        countdown_text = ft.Text(
-            time_text,
-            size=16,
-            weight=ft.FontWeight.BOLD,
-            color=COLORS["accent"] if remaining > 0 else COLORS["danger"]
-        )
+        countdown_text = ft.Text(size=16, weight=ft.FontWeight.BOLD)
         
         # Barra de progreso
         progress_bar = ft.ProgressBar(
-            value=progress,
             width=None,
-            color=COLORS["warning"] if remaining > 0 else COLORS["danger"],
             bgcolor=COLORS["border"],
             height=8,
             border_radius=4
@@ -193,14 +217,14 @@ class GeneratorsView:
             icon=ft.Icons.DELETE_OUTLINE,
             icon_color=COLORS["danger"],
             tooltip="Eliminar",
-            on_click=lambda _, gid=gen_id: self._delete_generator(gid)
+            on_click=lambda _, gid=generator.id: self.page.run_task(self._delete_generator, gid)
         )
         
-        return ft.Container(
+        card = ft.Container(
             content=ft.Row([
                 ft.Column([
-                    ft.Text(name, size=16, weight=ft.FontWeight.BOLD, color=COLORS["text_primary"]),
-                    ft.Text(f"Por: {created_by}", size=11, color=COLORS["text_secondary"]),
+                    name_text,
+                    author_text,
                     countdown_text,
                     progress_bar
                 ], spacing=8, expand=True),
@@ -209,13 +233,50 @@ class GeneratorsView:
             padding=15,
             bgcolor=COLORS["card_hover"],
             border_radius=8,
-            border=ft.border.all(1, COLORS["border"])
+            border=ft.border.all(1, COLORS["border"]),
+            data=(name_text, author_text, countdown_text, progress_bar)
         )
+        self._update_generator_card(card, self._card_state(generator, int(time.time())))
+        return card
     
-    def _delete_generator(self, gen_id: str):
+    def _update_generator_card(self, card: ft.Container, state: tuple):
+        """Actualizar en sitio los textos y la barra de una tarjeta ya pintada"""
+        generator, time_text, progress, active = state
+        name_text, author_text, countdown_text, progress_bar = card.data
+        name_text.value = generator.name
+        author_text.value = f"Por: {generator.created_by}"
+        countdown_text.value = time_text
+        countdown_text.color = COLORS["accent"] if active else COLORS["danger"]
+        progress_bar.value = progress
+        progress_bar.color = COLORS["warning"] if active else COLORS["danger"]
+    
+    async def _delete_generator(self, gen_id: str):
         """Eliminar generador"""
-        self.firebase.delete_generator(gen_id)
-        self.refresh_generators(self.page)
+        gen_data = self.generators.pop(gen_id, None)
+        if gen_data is None:
+            return
+        
+        self.firebase.enqueue_set(
+            f"generators/{gen_id}", None,
+            on_error=lambda _: self._rollback("No se pudo eliminar el generador.", lambda: self.generators.update({gen_id: gen_data}))
+        )
+        self._render_generators()
+    
+    async def _delete_expired(self):
+        """Eliminar todos los generadores expirados en un único lote"""
+        current_time = int(time.time())
+        batch = self.firebase.batch()
+        for gen_id, generator in self.generators.items():
+            if generator.end_timestamp <= current_time:
+                batch.delete(f"generators/{gen_id}")
+        
+        if not len(batch):
+            return
+        
+        if not await batch.commit_async():
+            self.error_text.value = "Error al eliminar los generadores expirados."
+            if self.page: self.page.update()
+        await self.refresh_generators(self.page)
     
     def _format_time(self, seconds: int) -> str:
         """Formatear tiempo en formato legible"""
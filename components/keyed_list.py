@@ -0,0 +1,67 @@
+# components/keyed_list.py
+# Lista de tarjetas con reconciliación por clave (solo se crean, quitan o actualizan las que cambian)
+
+import flet as ft
+from config import COLORS
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class KeyedList:
+    """
+    Tarjetas de un ft.Column identificadas por clave (id del registro)
+    - render() compara el listado nuevo con el pintado: crea las tarjetas nuevas, quita las que ya
+      no están y conserva la instancia de las demás
+    - Una tarjeta cuyo registro cambió se actualiza en sitio con update(tarjeta, registro) o,
+      sin update, se sustituye por una nueva
+    Flet solo envía por el websocket los controles añadidos o quitados y las propiedades que cambian
+    de los que ya existían, así el coste de refrescar depende de los cambios y no del tamaño de la lista.
+    """
+
+    def __init__(self, column: ft.Column, create: Callable[[Any], ft.Control],
+                 update: Optional[Callable[[ft.Control, Any], None]] = None, empty_text: str = ""):
+        self.column = column
+        self.create = create
+        self.update = update
+        self.empty = ft.Text(empty_text, size=14, color=COLORS["text_secondary"])
+        self._entries: Dict[Hashable, Tuple[ft.Control, Any]] = {}  # clave -> (tarjeta, registro pintado)
+        self.last_changes = {"inserted": 0, "removed": 0, "patched": 0}
+
+    def render(self, items: Iterable[Tuple[Hashable, Any]]) -> bool:
+        """Pintar [(clave, registro), ...] en ese orden; devuelve False si no cambió nada"""
+        inserted = patched = 0
+        entries: Dict[Hashable, Tuple[ft.Control, Any]] = {}
+        controls = []
+        for key, item in items:
+            entry = self._entries.get(key)
+            if entry is None:
+                control = self.create(item)
+                inserted += 1
+            else:
+                control, previous = entry
+                if item != previous:
+                    if self.update is not None:
+                        self.update(control, item)
+                    else:
+                        control = self.create(item)
+                    patched += 1
+            entries[key] = (control, item)
+            controls.append(control)
+
+        removed = len(self._entries.keys() - entries.keys())
+        self._entries = entries
+        self.last_changes = {"inserted": inserted, "removed": removed, "patched": patched}
+
+        if not controls:
+            controls = [self.empty]
+        current = self.column.controls
+        if len(current) == len(controls) and all(a is b for a, b in zip(current, controls)):
+            return bool(patched)
+        self.column.controls = controls
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[ft.Control]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
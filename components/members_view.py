@@ -2,8 +2,9 @@
 # Vista de gestión de miembros
 
 import flet as ft
-from config import COLORS, ROLE_TAGS
-from typing import Dict, Any
+from config import COLORS, ROLE_TAGS, PAGE_SIZE
+from models import Member
+from components.keyed_list import KeyedList
 
 
 class MembersView:
@@ -72,8 +73,33 @@ class MembersView:
             "BR": ft.Checkbox(label="BR", value=False, fill_color=ROLE_TAGS["BR"]["color"]),
         }
         
+        # Importación de lista (una línea por miembro)
+        self.import_field = ft.TextField(
+            label="Importar lista",
+            hint_text="nombre, discord, vouch, confianza, ROL ROL",
+            bgcolor=COLORS["card"],
+            border_color=COLORS["border"],
+            focused_border_color=COLORS["accent"],
+            color=COLORS["text_primary"],
+            label_style=ft.TextStyle(color=COLORS["text_secondary"]),
+            text_size=13,
+            multiline=True,
+            min_lines=2,
+            max_lines=8
+        )
+        
         self.members_container = ft.Column([], spacing=10)
+        self.member_cards = KeyedList(self.members_container, create=self._create_member_card, empty_text="No hay miembros registrados")
         self.error_text = ft.Text("", color=COLORS["danger"], size=12)
+        
+        # Paginación (orden alfabético)
+        self.members = []  # [(member_id, Member), ...] cargados hasta ahora
+        self.cursor = None
+        self.load_more_button = ft.TextButton(
+            content=ft.Text("Cargar más", size=12, color=COLORS["accent"]),
+            visible=False,
+            on_click=lambda _: self.page.run_task(self._load_more)
+        )
 
     def build(self) -> ft.Container:
         """Construir vista de miembros"""
@@ -103,7 +129,25 @@ class MembersView:
             bgcolor=COLORS["accent"],
             color="#000000",
             height=40,
-            on_click=lambda _: self._add_member()
+            on_click=lambda _: self.page.run_task(self._add_member)
+        )
+        
+        import_button = ft.OutlinedButton(
+            content=ft.Text("Importar"),
+            icon=ft.Icons.UPLOAD,
+            on_click=lambda _: self.page.run_task(self._import_members)
+        )
+        
+        import_form = ft.ExpansionTile(
+            title=ft.Text("Importar lista de miembros", size=14, color=COLORS["text_secondary"]),
+            controls=[
+                ft.Container(
+                    content=ft.Column([self.import_field, import_button], spacing=10),
+                    padding=ft.padding.only(top=10)
+                )
+            ],
+            collapsed_icon_color=COLORS["text_secondary"],
+            icon_color=COLORS["accent"]
         )
         
         add_form = ft.Container(
@@ -116,7 +160,8 @@ class MembersView:
                 ], spacing=15, wrap=True),
                 roles_section,
                 self.error_text,
-                add_button
+                add_button,
+                import_form
             ], spacing=15),
             padding=20,
             bgcolor=COLORS["card"],
@@ -132,7 +177,8 @@ class MembersView:
                     weight=ft.FontWeight.BOLD,
                     color=COLORS["text_secondary"]
                 ),
-                self.members_container
+                self.members_container,
+                self.load_more_button
             ], spacing=15),
             padding=20,
             bgcolor=COLORS["card"],
@@ -150,7 +196,7 @@ class MembersView:
             padding=30
         )
     
-    def _add_member(self):
+    async def _add_member(self):
         """Añadir nuevo miembro"""
         # Limpiar error anterior
         self.error_text.value = ""
@@ -168,62 +214,125 @@ class MembersView:
         # Obtener roles seleccionados
         roles = [role for role, checkbox in self.role_checkboxes.items() if checkbox.value]
         
-        success = self.firebase.add_member(name, discord, vouch, trust, roles)
-        if success:
-            self.name_field.value = ""
-            self.discord_field.value = ""
-            self.vouch_field.value = ""
-            self.trust_dropdown.value = "medium"
-            for checkbox in self.role_checkboxes.values():
-                checkbox.value = False
+        # Optimista: se pinta ya y la cola de escritura lo guarda en segundo plano
+        member_id = self.firebase.new_key()
+        member_data = self.firebase.member_record(name, discord, vouch, trust, roles)
+        self.firebase.enqueue_set(
+            f"members/{member_id}", member_data,
+            on_error=lambda _: self._rollback("Error al guardar el miembro.", lambda: self._remove_local(member_id))
+        )
+        
+        self.members = self._with_pending(self.members + [(member_id, Member.from_dict(member_id, member_data))])
+        self.name_field.value = ""
+        self.discord_field.value = ""
+        self.vouch_field.value = ""
+        self.trust_dropdown.value = "medium"
+        for checkbox in self.role_checkboxes.values():
+            checkbox.value = False
+        self._render_members(force=True)
+    
+    async def _import_members(self):
+        """Importar varios miembros en un único lote (una línea por miembro)"""
+        self.error_text.value = ""
+        
+        batch = self.firebase.batch()
+        invalid_lines = []
+        for line_number, line in enumerate((self.import_field.value or "").splitlines(), start=1):
+            if not line.strip():
+                continue
+            fields = [field.strip() for field in line.split(",")]
+            if len(fields) < 3 or not all(fields[:3]):
+                invalid_lines.append(str(line_number))
+                continue
             
-            if self.page:
-                self.page.update()
-            self.refresh_members(self.page)
+            trust = fields[3] if len(fields) > 3 and fields[3] in ("high", "medium", "low") else "medium"
+            roles = [role for role in (fields[4].split() if len(fields) > 4 else []) if role in ROLE_TAGS]
+            batch.add("members", self.firebase.member_record(fields[0], fields[1], fields[2], trust, roles))
+        
+        if invalid_lines:
+            self.error_text.value = f"Líneas inválidas: {', '.join(invalid_lines)}"
+            if self.page: self.page.update()
+            return
+        
+        if not len(batch):
+            return
+        
+        if await batch.commit_async():
+            self.import_field.value = ""
+            if self.page: self.page.update()
+            await self.refresh_members(self.page)
         else:
             self.error_text.value = "Error al conectar con la base de datos."
             if self.page: self.page.update()
     
-    def refresh_members(self, page=None):
-        """Actualizar lista de miembros"""
+    async def refresh_members(self, page=None):
+        """Recargar la lista desde la primera página (conservando las páginas ya cargadas)"""
         if page:
             self.page = page
         
-        members = self.firebase.get_members()
-        self.members_container.controls.clear()
+        limit = max(PAGE_SIZE, len(self.members))
+        members, self.cursor = await self.firebase.query_page_async(
+            "members", "name", limit, descending=False
+        )
+        self.members = self._with_pending(members)
+        self._render_members()
+    
+    async def _load_more(self):
+        """Añadir la siguiente página al final de la lista"""
+        if self.cursor is None:
+            return
         
-        if not members:
-            self.members_container.controls.append(
-                ft.Text("No hay miembros registrados", size=14, color=COLORS["text_secondary"])
-            )
-        else:
-            for member_id, member_data in members.items():
-                self.members_container.controls.append(
-                    self._create_member_card(member_id, member_data)
-                )
+        items, self.cursor = await self.firebase.query_page_async(
+            "members", "name", PAGE_SIZE, cursor=self.cursor, descending=False
+        )
+        self.members = self._with_pending(self.members + items)
+        self._render_members()
+    
+    def _with_pending(self, members: list) -> list:
+        """Mantener visibles los cambios locales aún no confirmados, en orden"""
+        members = self.firebase.overlay_pending("members", members)
+        return sorted(members, key=lambda item: (item[1].name, item[0]))
+    
+    def _render_members(self, force: bool = False):
+        """
+        Pintar la lista desde el estado local (solo se crean o sustituyen las tarjetas que cambian)
+        force: enviar la página aunque la lista no cambie (se tocaron otros controles)
+        """
+        changed = self.member_cards.render(self.members)
         
-        if self.page:
+        has_more = self.cursor is not None
+        if self.load_more_button.visible != has_more:
+            self.load_more_button.visible = has_more
+            changed = True
+        if self.page and (changed or force):
             self.page.update()
     
-    def _create_member_card(self, member_id: str, member_data: Dict[str, Any]) -> ft.Container:
-        """Crear tarjeta de miembro"""
-        name = member_data.get("name", "Unknown")
-        discord = member_data.get("discord", "-")
-        roles = member_data.get("roles", [])
-        trust = member_data.get("trust_level", "medium")
-        vouch = member_data.get("vouch", "None")
+    def _remove_local(self, member_id: str):
+        self.members = [item for item in self.members if item[0] != member_id]
+    
+    def _rollback(self, message: str, undo):
+        """Deshacer un cambio local cuyo guardado falló (llamado desde la cola de escritura)"""
+        async def apply():
+            undo()
+            self.error_text.value = message
+            self._render_members(force=True)
         
+        if self.page:
+            self.page.run_task(apply)
+    
+    def _create_member_card(self, member: Member) -> ft.Container:
+        """Crear tarjeta de miembro"""
         # Color según confianza
         trust_colors = {
             "high": COLORS["success"],
             "medium": COLORS["warning"],
             "low": COLORS["danger"]
         }
-        trust_color = trust_colors.get(trust, COLORS["text_secondary"])
+        trust_color = trust_colors.get(member.trust_level, COLORS["text_secondary"])
         
         # Badges de roles
         role_badges = []
-        for role in roles:
+        for role in member.roles:
             role_info = ROLE_TAGS.get(role, {"color": COLORS["text_secondary"], "label": role})
             role_badges.append(
                 ft.Container(
@@ -239,16 +348,16 @@ class MembersView:
                 ft.Container(width=5, bgcolor=trust_color, border_radius=2), # Barra lateral de confianza
                 ft.Column([
                     ft.Row([
-                        ft.Text(name, size=16, weight=ft.FontWeight.BOLD, color=COLORS["text_primary"]),
-                        ft.Text(f"(@{discord})", size=12, color=COLORS["text_secondary"]),
+                        ft.Text(member.name, size=16, weight=ft.FontWeight.BOLD, color=COLORS["text_primary"]),
+                        ft.Text(f"(@{member.discord})", size=12, color=COLORS["text_secondary"]),
                     ], spacing=10),
-                    ft.Text(f"Vouch: {vouch}", size=11, color=COLORS["text_secondary"]),
+                    ft.Text(f"Vouch: {member.vouch}", size=11, color=COLORS["text_secondary"]),
                     ft.Row(role_badges, spacing=5) if role_badges else ft.Container()
                 ], spacing=5, expand=True),
                 ft.IconButton(
                     icon=ft.Icons.DELETE_OUTLINE,
                     icon_color=COLORS["danger"],
-                    on_click=lambda _, mid=member_id: self._delete_member(mid)
+                    on_click=lambda _, mid=member.id: self.page.run_task(self._delete_member, mid)
                 )
             ], spacing=15),
             padding=15,
@@ -257,7 +366,16 @@ class MembersView:
             border=ft.border.all(1, COLORS["border"])
         )
     
-    def _delete_member(self, member_id: str):
+    async def _delete_member(self, member_id: str):
         """Eliminar un miembro"""
-        self.firebase.delete_member(member_id)
-        self.refresh_members(self.page)
+        removed = [(index, item) for index, item in enumerate(self.members) if item[0] == member_id]
+        if not removed:
+            return
+        
+        index, item = removed[0]
+        self.members.pop(index)
+        self.firebase.enqueue_set(
+            f"members/{member_id}", None,
+            on_error=lambda _: self._rollback("No se pudo eliminar el miembro.", lambda: self.members.insert(index, item))
+        )
+        self._render_members()
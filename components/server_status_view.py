@@ -2,8 +2,15 @@
 # Vista del estado del servidor ARK
 
 import flet as ft
-from config import COLORS
+import time
+from config import COLORS, STATUS_SPARKLINE_WINDOW, STATUS_PEAK_DAYS, ARK_SERVER_IDS, SERVER_STALE_AFTER
 from typing import Optional, Dict, Any
+import status_history
+import status_store
+
+SPARKLINE_SLOTS = 48  # Barras de la gráfica de población
+SPARKLINE_HEIGHT = 48
+PEAK_CHART_HEIGHT = 80
 
 
 class ServerStatusView:
@@ -11,6 +18,9 @@ class ServerStatusView:
     
     def __init__(self):
         self.server_data = None
+        self.cluster = {}  # {server_id: estado} del sondeo compartido
+        self.selected_server = ARK_SERVER_IDS[0]  # Servidor que se muestra en detalle
+        self.cluster_grid = None
         self.name_text = None
         self.map_text = None
         self.players_text = None
@@ -22,6 +32,12 @@ class ServerStatusView:
         self.peak_text = None
         self.platform_text = None
         self.status_indicator = None
+        self.stale_badge = None
+        self.stale_text = None
+        self.sparkline_row = None
+        self.sparkline_caption = None
+        self.peak_row = None
+        self.peak_caption = None
         self.page = None
     
     def build(self) -> ft.Container:
@@ -35,6 +51,16 @@ class ServerStatusView:
             border_radius=6
         )
         
+        # Aviso de dato desactualizado (estado guardado o consulta fallida, mientras se revalida)
+        self.stale_text = ft.Text("", size=12, color=COLORS["warning"])
+        self.stale_badge = ft.Container(
+            content=self.stale_text,
+            padding=ft.padding.symmetric(horizontal=10, vertical=4),
+            border_radius=10,
+            border=ft.border.all(1, COLORS["warning"]),
+            visible=False
+        )
+        
         # Título con indicador
         header = ft.Row([
             ft.Text(
@@ -43,9 +69,14 @@ class ServerStatusView:
                 weight=ft.FontWeight.BOLD,
                 color=COLORS["text_primary"]
             ),
-            self.status_indicator
+            self.status_indicator,
+            self.stale_badge
         ], spacing=15)
         
+        # Resumen del cluster (solo con varios servidores): tocar una tarjeta la muestra en detalle
+        self.cluster_grid = ft.ResponsiveRow([], spacing=10, run_spacing=10, visible=len(ARK_SERVER_IDS) > 1)
+        self._render_cluster()
+        
         # Información principal
         self.name_text = ft.Text("Cargando...", size=20, weight=ft.FontWeight.BOLD, color=COLORS["accent"])
         self.map_text = ft.Text("Map: -", size=14, color=COLORS["text_secondary"])
@@ -63,13 +94,20 @@ class ServerStatusView:
         
         # Estadísticas principales
         self.players_text = ft.Text("0", size=24, weight=ft.FontWeight.BOLD, color=COLORS["accent"])
+        self.players_progress = ft.ProgressBar(
+            value=0,
+            color=COLORS["accent"],
+            bgcolor=COLORS["border"],
+            height=6,
+            border_radius=3
+        )
         self.rank_text = ft.Text("-", size=24, weight=ft.FontWeight.BOLD, color=COLORS["accent"])
         self.ping_text = ft.Text("-", size=24, weight=ft.FontWeight.BOLD, color=COLORS["accent"])
         self.version_text = ft.Text("-", size=14, weight=ft.FontWeight.BOLD, color=COLORS["accent"])
         
         # Grid de estadísticas (Responsivo)
         stats_grid = ft.ResponsiveRow([
-            self._create_stat_card("Players Online", self.players_text, 6),
+            self._create_stat_card("Players Online", ft.Column([self.players_text, self.players_progress], spacing=8), 6),
             self._create_stat_card("Server Rank", self.rank_text, 6),
             self._create_stat_card("Ping", self.ping_text, 6),
             self._create_stat_card("Version", self.version_text, 6),
@@ -94,12 +132,65 @@ class ServerStatusView:
             border=ft.border.all(1, COLORS["border"])
         )
         
+        # Población reciente (del historial compartido, sin consultas extra a la API)
+        self.sparkline_row = ft.Row(
+            [],
+            spacing=2,
+            height=SPARKLINE_HEIGHT,
+            vertical_alignment=ft.CrossAxisAlignment.END
+        )
+        self.sparkline_caption = ft.Text("Sin datos todavía", size=12, color=COLORS["text_secondary"])
+        population = ft.Container(
+            content=ft.Column([
+                ft.Text(f"Población (últimas {STATUS_SPARKLINE_WINDOW // 3600} h)", size=16,
+                        weight=ft.FontWeight.BOLD, color=COLORS["text_secondary"]),
+                self.sparkline_row,
+                self.sparkline_caption
+            ], spacing=10),
+            padding=20,
+            bgcolor=COLORS["card"],
+            border_radius=12,
+            border=ft.border.all(1, COLORS["border"])
+        )
+        self._update_sparkline()
+        
+        # Horas pico de la semana (del historial en disco, leído por rangos sin cargarlo entero)
+        self.peak_row = ft.Row(
+            [],
+            spacing=2,
+            height=PEAK_CHART_HEIGHT,
+            vertical_alignment=ft.CrossAxisAlignment.END
+        )
+        self.peak_caption = ft.Text("Sin historial todavía", size=12, color=COLORS["text_secondary"])
+        hour_labels = ft.Row(
+            [ft.Text(f"{hour:02d}h", size=10, color=COLORS["text_secondary"], expand=True) for hour in range(0, 24, 6)],
+            spacing=0
+        )
+        peak_hours = ft.Container(
+            content=ft.Column([
+                ft.Text(f"Horas pico (últimos {STATUS_PEAK_DAYS} días)", size=16,
+                        weight=ft.FontWeight.BOLD, color=COLORS["text_secondary"]),
+                self.peak_row,
+                hour_labels,
+                self.peak_caption
+            ], spacing=6),
+            padding=20,
+            bgcolor=COLORS["card"],
+            border_radius=12,
+            border=ft.border.all(1, COLORS["border"]),
+            visible=status_store.store is not None
+        )
+        self._update_peak_hours()
+        
         # Contenedor principal
         return ft.Container(
             content=ft.Column([
                 header,
+                self.cluster_grid,
                 main_info,
                 stats_grid,
+                population,
+                peak_hours,
                 extra_stats
             ], spacing=20),
             padding=30
@@ -126,6 +217,74 @@ class ServerStatusView:
             value_widget
         ], spacing=10)
     
+    def update_cluster(self, cluster: Dict[str, Dict[str, Any]], page=None):
+        """Actualizar con el estado de todos los servidores (del sondeo compartido)"""
+        if page:
+            self.page = page
+        
+        self.cluster = cluster
+        self._render_cluster()
+        data = cluster.get(self.selected_server)
+        if data:
+            self.update_server_data(data)
+        elif self.page:
+            self.page.update()
+    
+    def _render_cluster(self):
+        if self.cluster_grid is None or len(ARK_SERVER_IDS) < 2:
+            return
+        self.cluster_grid.controls = [
+            self._create_cluster_card(server_id, self.cluster.get(server_id))
+            for server_id in ARK_SERVER_IDS
+        ]
+    
+    def _create_cluster_card(self, server_id: str, data: Optional[Dict[str, Any]]) -> ft.Container:
+        """Tarjeta compacta de un servidor del cluster"""
+        if data:
+            online = data.get("online", False)
+            title = data.get("map", "Unknown")
+            detail = f"{data.get('players', 0)} / {data.get('max_players', 70)}"
+            age = self._stale_age(data)
+            if age is not None:
+                detail += f" · hace {self._format_uptime(age)}"
+            dot_color = COLORS["success"] if online else COLORS["danger"]
+        else:
+            title = server_id
+            detail = "Sin datos"
+            dot_color = COLORS["text_secondary"]
+        
+        selected = server_id == self.selected_server
+        return ft.Container(
+            content=ft.Row([
+                ft.Container(width=8, height=8, bgcolor=dot_color, border_radius=4),
+                ft.Column([
+                    ft.Text(title, size=13, weight=ft.FontWeight.BOLD, color=COLORS["text_primary"],
+                            max_lines=1, overflow=ft.TextOverflow.ELLIPSIS),
+                    ft.Text(detail, size=12, color=COLORS["text_secondary"])
+                ], spacing=2, expand=True)
+            ], spacing=8),
+            padding=12,
+            bgcolor=COLORS["card_hover"] if selected else COLORS["card"],
+            border_radius=10,
+            border=ft.border.all(1, COLORS["accent"] if selected else COLORS["border"]),
+            col={"xs": 6, "md": 4, "lg": 3},
+            on_click=lambda _, sid=server_id: self._select_server(sid)
+        )
+    
+    def _select_server(self, server_id: str):
+        """Mostrar en detalle otro servidor del cluster"""
+        self.selected_server = server_id
+        self._render_cluster()
+        self._update_peak_hours()
+        data = self.cluster.get(server_id)
+        if data:
+            self.update_server_data(data)
+        else:
+            self.name_text.value = "Cargando..."
+            self._update_sparkline()
+            if self.page:
+                self.page.update()
+    
     def update_server_data(self, data: Optional[Dict[str, Any]], page=None):
         """Actualizar datos del servidor"""
         if page:
@@ -164,9 +323,90 @@ class ServerStatusView:
         self.peak_text.value = str(data.get("peak_players", 0))
         self.platform_text.value = data.get("platform", "N/A")
         
+        age = self._stale_age(data)
+        if self.stale_badge:
+            self.stale_badge.visible = age is not None
+            if age is not None:
+                self.stale_text.value = f"Datos de hace {self._format_uptime(age)}"
+        
+        self._update_sparkline(max_players)
+        
         if self.page:
             self.page.update()
     
+    def _update_sparkline(self, max_players: int = 0):
+        """Pintar la media de jugadores por tramo desde status_history"""
+        if self.sparkline_row is None:
+            return
+        
+        now = int(time.time())
+        history = status_history.get(self.selected_server)
+        values = history.sparkline(STATUS_SPARKLINE_WINDOW, SPARKLINE_SLOTS, now)
+        known = [v for v in values if v is not None]
+        scale = max([max_players] + known) or 1
+        
+        bars = []
+        for value in values:
+            if value is None:
+                bars.append(ft.Container(height=2, expand=True, bgcolor=COLORS["border"]))
+            else:
+                bars.append(ft.Container(
+                    height=max(2, round(value / scale * SPARKLINE_HEIGHT)),
+                    expand=True,
+                    bgcolor=COLORS["accent"],
+                    border_radius=2,
+                    tooltip=f"{value:.0f}"
+                ))
+        self.sparkline_row.controls = bars
+        
+        summary = history.aggregate(now - STATUS_SPARKLINE_WINDOW, now)
+        if summary["samples"]:
+            self.sparkline_caption.value = (
+                f"Mín {summary['players_min']} · Máx {summary['players_max']} · "
+                f"Media {summary['players_avg']:.1f}"
+            )
+        else:
+            self.sparkline_caption.value = "Sin datos todavía"
+    
+    def _update_peak_hours(self):
+        """Media de jugadores por hora del día en la última semana"""
+        if self.peak_row is None or status_store.store is None:
+            return
+        
+        try:
+            averages = status_store.store.peak_hours(STATUS_PEAK_DAYS, server_id=self.selected_server)
+        except OSError as e:
+            print(f"Error leyendo historial del servidor: {e}")
+            return
+        
+        known = [v for v in averages if v is not None]
+        top = max(known) if known else 0
+        bars = []
+        for hour, value in enumerate(averages):
+            height = max(2, round(value / top * PEAK_CHART_HEIGHT)) if value and top else 2
+            bars.append(ft.Container(
+                height=height,
+                expand=True,
+                bgcolor=COLORS["warning"] if value is not None and value == top else COLORS["accent"],
+                border_radius=2,
+                tooltip=f"{hour:02d}:00 · {value:.1f}" if value is not None else f"{hour:02d}:00 · sin datos"
+            ))
+        self.peak_row.controls = bars
+        
+        if known:
+            best = averages.index(top)
+            self.peak_caption.value = f"Más jugadores hacia las {best:02d}:00 (media {top:.1f})"
+        else:
+            self.peak_caption.value = "Sin historial todavía"
+    
+    def _stale_age(self, data: Dict[str, Any]) -> Optional[int]:
+        """Segundos desde que se obtuvo el estado si supera SERVER_STALE_AFTER (None = reciente)"""
+        fetched_at = data.get("fetched_at")
+        if not fetched_at:
+            return None
+        age = int(time.time() - fetched_at)
+        return age if age > SERVER_STALE_AFTER else None
+    
     def _show_offline(self):
         """Mostrar estado offline"""
         if self.status_indicator:
@@ -117,6 +117,10 @@ class Sidebar:
         
         return sidebar_container
     
+    def build_controls(self) -> ft.Container:
+        """Contenido del menú lateral móvil (NavigationDrawer)"""
+        return self.build()
+    
     def _create_nav_button(self, text: str, section: str, icon) -> ft.Container:
         """Crear botón de navegación"""
         is_selected = self.current_section == section
@@ -181,9 +185,9 @@ class Sidebar:
                     ft.Text("Ninguno", size=12, color=COLORS["text_secondary"])
                 )
             else:
-                for admin_id, admin_data in admins.items():
-                    is_active = admin_data.get("active", False)
-                    roles = admin_data.get("roles", [])
+                for admin_id, admin in admins.items():
+                    is_active = admin.active
+                    roles = admin.roles
                     
                     # Crear badges de roles
                     role_badges = []
@@ -2,8 +2,9 @@
 # Vista de gestión de tareas con tags
 
 import flet as ft
-from config import COLORS, ROLE_TAGS
-from typing import Dict, Any
+from config import COLORS, ROLE_TAGS, PAGE_SIZE
+from models import Task
+from components.keyed_list import KeyedList
 
 
 class TasksView:
@@ -47,7 +48,17 @@ class TasksView:
         )
         
         self.tasks_container = ft.Column([], spacing=10)
+        self.task_cards = KeyedList(self.tasks_container, create=self._create_task_card, empty_text="No hay tareas activas")
         self.error_text = ft.Text("", color=COLORS["danger"], size=12)
+        
+        # Paginación (más recientes primero)
+        self.tasks = []  # [(task_id, Task), ...] cargados hasta ahora
+        self.cursor = None
+        self.load_more_button = ft.TextButton(
+            content=ft.Text("Cargar más", size=12, color=COLORS["accent"]),
+            visible=False,
+            on_click=lambda _: self.page.run_task(self._load_more)
+        )
 
     def build(self) -> ft.Container:
         """Construir vista de tareas"""
@@ -65,7 +76,7 @@ class TasksView:
             bgcolor=COLORS["accent"],
             color="#000000",
             height=40,
-            on_click=lambda _: self._add_task()
+            on_click=lambda _: self.page.run_task(self._add_task)
         )
         
         add_form = ft.Container(
@@ -91,7 +102,8 @@ class TasksView:
                     weight=ft.FontWeight.BOLD,
                     color=COLORS["text_secondary"]
                 ),
-                self.tasks_container
+                self.tasks_container,
+                self.load_more_button
             ], spacing=15),
             padding=20,
             bgcolor=COLORS["card"],
@@ -109,7 +121,7 @@ class TasksView:
             padding=30
         )
     
-    def _add_task(self):
+    async def _add_task(self):
         """Añadir nueva tarea"""
         self.error_text.value = ""
         
@@ -126,48 +138,83 @@ class TasksView:
             if self.page: self.page.update()
             return
         
-        success = self.firebase.add_task(text, tag)
-        if success:
-            self.task_control.value = ""
-            self.tag_dropdown.value = None
-            if self.page:
-                self.page.update()
-            self.refresh_tasks(self.page)
+        # Optimista: se pinta ya y la cola de escritura la guarda en segundo plano
+        task_id = self.firebase.new_key()
+        task_data = self.firebase.task_record(text, tag)
+        self.firebase.enqueue_set(
+            f"tasks/{task_id}", task_data,
+            on_error=lambda _: self._rollback("No se pudo guardar la tarea.", lambda: self._remove_local(task_id))
+        )
+        
+        self.tasks.insert(0, (task_id, Task.from_dict(task_id, task_data)))
+        self.task_control.value = ""
+        self.tag_dropdown.value = None
+        self._render_tasks(force=True)
     
-    def refresh_tasks(self, page=None):
-        """Actualizar lista de tareas"""
+    async def refresh_tasks(self, page=None):
+        """Recargar la lista desde la primera página (conservando las páginas ya cargadas)"""
         if page:
             self.page = page
         
-        tasks = self.firebase.get_tasks()
-        self.tasks_container.controls.clear()
-        
-        if not tasks:
-            self.tasks_container.controls.append(
-                ft.Text("No hay tareas activas", size=14, color=COLORS["text_secondary"])
-            )
-        else:
-            for task_id, task_data in tasks.items():
-                self.tasks_container.controls.append(
-                    self._create_task_card(task_id, task_data)
-                )
+        limit = max(PAGE_SIZE, len(self.tasks))
+        tasks, self.cursor = await self.firebase.query_page_async(
+            "tasks", "timestamp", limit, descending=True
+        )
+        self.tasks = self._with_pending(tasks)
+        self._render_tasks()
+    
+    async def _load_more(self):
+        """Añadir la siguiente página al final de la lista"""
+        if self.cursor is None:
+            return
         
-        if self.page:
+        items, self.cursor = await self.firebase.query_page_async(
+            "tasks", "timestamp", PAGE_SIZE, cursor=self.cursor, descending=True
+        )
+        self.tasks = self._with_pending(self.tasks + items)
+        self._render_tasks()
+    
+    def _with_pending(self, tasks: list) -> list:
+        """Mantener visibles los cambios locales aún no confirmados, en orden"""
+        tasks = self.firebase.overlay_pending("tasks", tasks)
+        return sorted(tasks, key=lambda item: item[1].timestamp, reverse=True)
+    
+    def _render_tasks(self, force: bool = False):
+        """
+        Pintar la lista desde el estado local (solo se crean o sustituyen las tarjetas que cambian)
+        force: enviar la página aunque la lista no cambie (se tocaron otros controles)
+        """
+        changed = self.task_cards.render(self.tasks)
+        
+        has_more = self.cursor is not None
+        if self.load_more_button.visible != has_more:
+            self.load_more_button.visible = has_more
+            changed = True
+        if self.page and (changed or force):
             self.page.update()
     
-    def _create_task_card(self, task_id: str, task_data: Dict[str, Any]) -> ft.Container:
-        """Crear tarjeta de tarea"""
-        text = task_data.get("text", "Sin descripción")
-        tag = task_data.get("tag", "ADMIN")
-        created_by = task_data.get("created_by", "Unknown")
+    def _remove_local(self, task_id: str):
+        self.tasks = [item for item in self.tasks if item[0] != task_id]
+    
+    def _rollback(self, message: str, undo):
+        """Deshacer un cambio local cuyo guardado falló (llamado desde la cola de escritura)"""
+        async def apply():
+            undo()
+            self.error_text.value = message
+            self._render_tasks(force=True)
         
-        role_info = ROLE_TAGS.get(tag, {"color": COLORS["text_secondary"], "label": tag})
+        if self.page:
+            self.page.run_task(apply)
+    
+    def _create_task_card(self, task: Task) -> ft.Container:
+        """Crear tarjeta de tarea"""
+        role_info = ROLE_TAGS.get(task.tag, {"color": COLORS["text_secondary"], "label": task.tag})
         
         return ft.Container(
             content=ft.Row([
                 ft.Container(width=5, bgcolor=role_info["color"], border_radius=2),
                 ft.Column([
-                    ft.Text(text, size=14, color=COLORS["text_primary"]),
+                    ft.Text(task.text, size=14, color=COLORS["text_primary"]),
                     ft.Row([
                         ft.Container(
                             content=ft.Text(role_info["label"], size=9, color="#000000", weight=ft.FontWeight.BOLD),
@@ -175,14 +222,14 @@ class TasksView:
                             padding=ft.padding.symmetric(horizontal=6, vertical=2),
                             border_radius=4
                         ),
-                        ft.Text(f"Por: {created_by}", size=11, color=COLORS["text_secondary"]),
+                        ft.Text(f"Por: {task.created_by}", size=11, color=COLORS["text_secondary"]),
                     ], spacing=10)
                 ], spacing=8, expand=True),
                 ft.IconButton(
                     icon=ft.Icons.CHECK_CIRCLE_OUTLINE,
                     icon_color=COLORS["success"],
                     tooltip="Completar",
-                    on_click=lambda _, tid=task_id: self._delete_task(tid)
+                    on_click=lambda _, tid=task.id: self.page.run_task(self._delete_task, tid)
                 )
             ], spacing=15),
             padding=15,
@@ -191,7 +238,16 @@ class TasksView:
             border=ft.border.all(1, COLORS["border"])
         )
     
-    def _delete_task(self, task_id: str):
+    async def _delete_task(self, task_id: str):
         """Eliminar tarea (completar)"""
-        self.firebase.delete_task(task_id)
-        self.refresh_tasks(self.page)
+        removed = [(index, item) for index, item in enumerate(self.tasks) if item[0] == task_id]
+        if not removed:
+            return
+        
+        index, item = removed[0]
+        self.tasks.pop(index)
+        self.firebase.enqueue_set(
+            f"tasks/{task_id}", None,
+            on_error=lambda _: self._rollback("No se pudo completar la tarea.", lambda: self.tasks.insert(index, item))
+        )
+        self._render_tasks()
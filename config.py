@@ -16,14 +16,100 @@ DISCORD_WEBHOOK = os.getenv("DISCORD_WEBHOOK", "https://discord.com/api/webhooks
 
 # ARK Server Status API
 ARKSTATUS_API_KEY = os.getenv("ARKSTATUS_API_KEY", "ark_aa23ee3a531fd4d5926adb70ec7aa9c23ca22d6e85d3b47fe78316445d14e154")
-ARKSTATUS_URL = "https://arkstatus.com/api/v1/servers"
+ARKSTATUS_URL = os.getenv("ARKSTATUS_URL", "https://arkstatus.com/api/v1/servers")
 ARK_SERVER_ID = os.getenv("ARK_SERVER_ID", "68116671")  # ID del servidor en arkstatus.com
+# Servidores del cluster que se monitorizan (separados por comas); el primero es el principal
+ARK_SERVER_IDS = [s.strip() for s in os.getenv("ARK_SERVER_IDS", ARK_SERVER_ID).split(",") if s.strip()]
+ARKSTATUS_RATE_LIMIT = int(os.getenv("ARKSTATUS_RATE_LIMIT", "30"))  # Peticiones por minuto entre todos los servidores
+ARKSTATUS_BURST = 5  # Peticiones que pueden salir seguidas antes de repartirse en el tiempo
+
+# Fuente del estado: "arkstatus" (API de arkstatus.com) o "a2s" (consulta UDP directa al servidor de juego)
+STATUS_SOURCE = os.getenv("STATUS_SOURCE", "arkstatus").lower()
+# Puerto de consulta Steam de cada servidor: "68116671=1.2.3.4:27015,68116672=1.2.3.4:27017"
+def _parse_a2s_addresses(value: str) -> dict:
+    """{server_id: (host, puerto)}; las entradas mal formadas se ignoran con un aviso"""
+    addresses = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        server_id, _, address = entry.partition("=")
+        host, _, port = address.strip().rpartition(":")
+        if not server_id.strip() or not host or not port.isdigit() or not 0 < int(port) < 65536:
+            print(f"ARK_A2S_ADDRESSES: entrada inválida ignorada ({entry.strip()!r}), formato id=host:puerto")
+            continue
+        addresses[server_id.strip()] = (host, int(port))
+    return addresses
+
+
+ARK_A2S_ADDRESSES = _parse_a2s_addresses(os.getenv("ARK_A2S_ADDRESSES", ""))
+A2S_TIMEOUT = float(os.getenv("A2S_TIMEOUT", "2"))  # Segundos de espera por respuesta UDP
+A2S_RETRIES = 1  # Reenvíos si no llega respuesta (UDP puede perder paquetes)
+ARKSTATUS_CONNECT_TIMEOUT = float(os.getenv("ARKSTATUS_CONNECT_TIMEOUT", "5"))  # Segundos para conectar
+ARKSTATUS_READ_TIMEOUT = float(os.getenv("ARKSTATUS_READ_TIMEOUT", "10"))  # Segundos para leer la respuesta
+ARKSTATUS_KEEPALIVE = 75  # Segundos que se conserva la conexión ociosa (más que el intervalo de sondeo)
 
 # Configuración de actualización
 SERVER_UPDATE_INTERVAL = 50000  # 50 segundos (para respetar límite de API)
+SERVER_REFRESH_MIN_AGE = 10  # Segundos: un refresco manual reutiliza el último estado si es más reciente
+SERVER_POLL_FAST_INTERVAL = 20000  # 20 segundos durante unas consultas tras un cambio de estado o de mapa
+SERVER_POLL_FAST_COUNT = 3  # Consultas rápidas tras un cambio
+SERVER_POLL_SLOW_AFTER = 6  # Consultas seguidas sin cambios antes de ir espaciando el sondeo
+SERVER_POLL_MAX_INTERVAL = 180000  # 3 minutos como máximo sin cambios
+SERVER_POLL_BACKOFF_MAX = 900000  # 15 minutos como máximo entre reintentos tras errores
+SERVER_STALE_AFTER = int(os.getenv("SERVER_STALE_AFTER", "180"))  # Segundos: un estado más antiguo se marca como desactualizado
+
+# Historial en memoria del estado del servidor (filas por nivel; memoria fija)
+STATUS_HISTORY_RAW = 1024  # Muestras sin agregar (~14 h a una consulta cada 50 s)
+STATUS_HISTORY_MINUTES = 1440  # 24 horas por minuto
+STATUS_HISTORY_HOURS = 24 * 31  # 31 días por hora
+STATUS_HISTORY_DAYS = 366  # 1 año por día
+STATUS_SPARKLINE_WINDOW = 6 * 3600  # Segundos que muestra la gráfica de población
+STATUS_PEAK_DAYS = 7  # Días que resume la gráfica de horas pico
 HEARTBEAT_INTERVAL = 30000  # 30 segundos
+HEARTBEAT_IDLE_INTERVAL = 90000  # 90 segundos para sesiones sin actividad reciente
+PRESENCE_IDLE_AFTER = 300  # Segundos sin actividad para pasar a la cadencia lenta
+ADMIN_STATUS_WINDOW = 3600  # Segundos de historial de latidos que lee el sidebar
+ADMIN_STATUS_RETENTION = 7 * 24 * 3600  # Registros sin latido más antiguos se archivan
+ADMIN_STATUS_GC_INTERVAL = 3600  # Segundos entre pasadas de limpieza de admin_status
 GENERATOR_UPDATE_INTERVAL = 60000  # 1 minuto
-ADMIN_TIMEOUT = 120  # 2 minutos para considerar admin inactivo
+ADMIN_TIMEOUT = 120  # 2 minutos para considerar admin inactivo (o 2 latidos si su cadencia es mayor)
+
+# Conexiones a Firebase (una app y un pool HTTP compartidos por proceso)
+FIREBASE_SHARED_APP = os.getenv("FIREBASE_SHARED_APP", "1") != "0"  # "0" = una app por sesión (modo antiguo)
+FIREBASE_POOL_SIZE = int(os.getenv("FIREBASE_POOL_SIZE", "32"))  # Conexiones keep-alive por host
+FIREBASE_MAX_CONCURRENCY = int(os.getenv("FIREBASE_MAX_CONCURRENCY", "16"))  # Llamadas simultáneas (API async)
+
+# Streaming en tiempo real (espejo local compartido de generators/tasks/members)
+REALTIME_STREAMING = os.getenv("FIREBASE_STREAMING", "1") != "0"
+REALTIME_RECONNECT_MAX = 60  # Segundos máximos entre reintentos de conexión del stream
+
+# Caché de lecturas compartida (revalidación con ETag al expirar el TTL)
+READ_CACHE_TTL = float(os.getenv("FIREBASE_CACHE_TTL", "5"))  # Segundos sin consultar a Firebase
+
+# Paginación de listas (consultas ordenadas en el servidor)
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "25"))
+
+# Cola de escrituras en segundo plano (mutaciones optimistas)
+WRITE_QUEUE_DELAY = 0.05  # Segundos de espera para agrupar escrituras seguidas
+WRITE_MAX_ATTEMPTS = 5  # Intentos antes de deshacer el cambio local
+WRITE_RETRY_BASE = 1.0  # Segundos del primer reintento (se duplica en cada intento)
+WRITE_RETRY_MAX = 60.0  # Tope del backoff para fallos de red (se reintenta hasta que vuelva la conexión)
+
+# Datos locales (diario de escrituras pendientes, cachés persistentes)
+DATA_DIR = os.getenv("DATA_DIR", "data")
+WRITE_JOURNAL = os.getenv("WRITE_JOURNAL", "1") != "0"
+JOURNAL_PATH = os.getenv("WRITE_JOURNAL_PATH", os.path.join(DATA_DIR, "journal.sqlite3"))
+
+# Backend de almacenamiento: "firebase" (producción) o "sqlite" (autoalojado / pruebas locales sin red)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firebase").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(DATA_DIR, "fog.sqlite3"))
+
+# Historial persistente del estado del servidor (segmentos binarios por servidor y mes)
+STATUS_STORE = os.getenv("STATUS_STORE", "1") != "0"
+STATUS_STORE_DIR = os.getenv("STATUS_STORE_DIR", os.path.join(DATA_DIR, "status"))
+
+# Último estado conocido de cada servidor: se muestra al arrancar mientras se revalida ("" lo desactiva)
+STATUS_CACHE_PATH = os.getenv("STATUS_CACHE_PATH", os.path.join(DATA_DIR, "status_cache.json"))
 
 # Colores del tema
 COLORS = {
@@ -1,22 +1,214 @@
 # firebase_manager.py
 # Gestión de conexión y operaciones con Firebase
 
+import json
 import pyrebase
+import realtime
+import threading
+import write_queue
 import time
-from typing import Optional, Dict, Any
-from config import FIREBASE_CONFIG, ADMIN_TIMEOUT
+import weakref
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple
+from config import (
+    FIREBASE_CONFIG,
+    FIREBASE_SHARED_APP,
+    FIREBASE_POOL_SIZE,
+    REALTIME_STREAMING,
+    READ_CACHE_TTL,
+    ADMIN_STATUS_WINDOW
+)
+from models import MODELS, Generator, Task, Member, AdminStatus, decode_collection
+from storage import StorageBackend, _page_records, _sessions, any_session
 
 
-class FirebaseManager:
+# ==================== APP COMPARTIDA (POR PROCESO) ====================
+
+_shared_app = None
+_shared_app_lock = threading.Lock()
+_adapters = weakref.WeakSet()  # Adaptadores HTTP de las apps vivas (para estadísticas de reutilización)
+
+
+def _create_app():
+    """Crear app de pyrebase con un pool HTTP keep-alive dimensionado"""
+    app = pyrebase.initialize_app(FIREBASE_CONFIG)
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=FIREBASE_POOL_SIZE,
+        max_retries=3
+    )
+    for scheme in ("http://", "https://"):
+        app.requests.mount(scheme, adapter)
+    _adapters.add(adapter)
+    return app
+
+
+def get_shared_app():
+    """Obtener la app de Firebase compartida por todas las sesiones del proceso"""
+    global _shared_app
+    if _shared_app is None:
+        with _shared_app_lock:
+            if _shared_app is None:
+                _shared_app = _create_app()
+    return _shared_app
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Estadísticas de conexiones HTTP hacia Firebase en este proceso
+    Returns: Dict con apps, sesiones, peticiones, conexiones abiertas y ratio de reutilización
+    """
+    requests_count = 0
+    connections = 0
+    for adapter in list(_adapters):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+    
+    return {
+        "apps": len(_adapters),
+        "sessions": sum(1 for session in list(_sessions) if isinstance(session, FirebaseManager)),
+        "requests": requests_count,
+        "connections": connections,
+        "reuse_ratio": 1 - (connections / requests_count) if requests_count else 0.0
+    }
+
+
+# ==================== CACHÉ DE LECTURAS ====================
+
+class ReadCache:
+    """
+    Caché de lecturas por ruta compartida entre sesiones
+    - Dentro del TTL se sirve sin tocar la red
+    - Al expirar se revalida con el ETag de RTDB (304 = sin descarga ni parseo)
+    - Lecturas simultáneas de la misma ruta comparten una única petición
+    - Una lectura en curso cuando se invalida su colección no se guarda (traería el dato anterior
+      a la escritura durante todo el TTL)
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0  # Respuestas 304 (no modificado)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._generations: Dict[str, int] = {}  # Colección -> invalidaciones hasta ahora
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, path: str, fetch):
+        """
+        Leer ruta; fetch(etag) -> (status_code, etag, value) solo se llama si hace falta
+        """
+        entry = self._entries.get(path)
+        if entry and time.monotonic() - entry["fetched_at"] < self.ttl:
+            self.hits += 1
+            return entry["value"]
+        
+        with self._path_lock(path):
+            # Otra sesión pudo refrescar la ruta mientras esperábamos
+            entry = self._entries.get(path)
+            if entry and time.monotonic() - entry["fetched_at"] < self.ttl:
+                self.hits += 1
+                return entry["value"]
+            
+            generation = self._generation(path)
+            try:
+                status, etag, value = fetch(entry["etag"] if entry else None)
+            except Exception:
+                if entry:
+                    return entry["value"]  # Mejor dato viejo que vacío
+                raise
+            
+            if self._generation(path) != generation:
+                # Escritura propia durante la lectura: la respuesta puede ser anterior a ella
+                self.misses += 1
+                return entry["value"] if status == 304 and entry else value
+            
+            if status == 304 and entry:
+                self.revalidations += 1
+                entry["fetched_at"] = time.monotonic()
+                return entry["value"]
+            
+            self.misses += 1
+            self._entries[path] = {"etag": etag, "value": value, "fetched_at": time.monotonic()}
+            return value
+    
+    def invalidate(self, path: str):
+        """Descartar la ruta y cualquier ruta padre o hija (tras una escritura propia)"""
+        path = path.strip("/")
+        root = path.split("/")[0]
+        with self._lock:
+            self._generations[root] = self._generations.get(root, 0) + 1
+        for cached in list(self._entries):
+            if cached == path or cached.startswith(path + "/") or path.startswith(cached + "/"):
+                self._entries.pop(cached, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.revalidations
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hit_ratio": (self.hits + self.revalidations) / lookups if lookups else 0.0
+        }
+    
+    def _generation(self, path: str) -> int:
+        return self._generations.get(path.strip("/").split("/")[0], 0)
+    
+    def _path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            if path not in self._path_locks:
+                self._path_locks[path] = threading.Lock()
+            return self._path_locks[path]
+
+
+_read_cache = ReadCache(READ_CACHE_TTL)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Contadores de la caché de lecturas compartida"""
+    return _read_cache.stats()
+
+
+def get_write_stats() -> Dict[str, Any]:
+    """Estado de la cola de escrituras y del diario (backlog, throughput de reenvío)"""
+    return write_queue.queue.stats()
+
+
+def _stream_token(force_refresh: bool) -> Optional[str]:
+    """Token para los streams compartidos: el de cualquier sesión autenticada"""
+    manager = any_session(FirebaseManager)
+    if manager is None:
+        return None
+    if force_refresh:
+        manager.refresh_id_token()
+    return manager.id_token
+
+
+realtime.hub.set_token_provider(_stream_token)
+
+
+class FirebaseManager(StorageBackend):
     """Gestor centralizado para todas las operaciones de Firebase"""
     
     def __init__(self):
-        self.firebase = pyrebase.initialize_app(FIREBASE_CONFIG)
+        super().__init__()
+        # La app (config + pool HTTP) se comparte; el estado de auth es por sesión
+        self.firebase = get_shared_app() if FIREBASE_SHARED_APP else _create_app()
         self.auth = self.firebase.auth()
-        self.db = self.firebase.database()
         self.user = None
         self.id_token = None
-        self.user_email = None
+    
+    @property
+    def db(self):
+        """Referencia nueva a la base de datos (pyrebase acumula la ruta en el objeto)"""
+        return self.firebase.database()
         
     def login(self, email: str, password: str) -> tuple[bool, str]:
         """
@@ -27,6 +219,7 @@ class FirebaseManager:
             self.user = self.auth.sign_in_with_email_and_password(email, password)
             self.id_token = self.user['idToken']
             self.user_email = email.split('@')[0]  # Username sin dominio
+            write_queue.queue.start()  # Reenviar escrituras que quedaron en el diario
             return True, "Login exitoso"
         except Exception as e:
             error_msg = str(e)
@@ -47,6 +240,7 @@ class FirebaseManager:
                     "active": False,
                     "last_heartbeat": int(time.time())
                 }, self.id_token)
+                _read_cache.invalidate("admin_status")
             except:
                 pass
         self.user = None
@@ -57,35 +251,194 @@ class FirebaseManager:
         """Verificar si hay sesión activa"""
         return self.user is not None and self.id_token is not None
     
+    def refresh_id_token(self) -> bool:
+        """Renovar el id token (Firebase lo invalida a la hora)"""
+        try:
+            self.user = self.auth.refresh(self.user['refreshToken'])
+            self.id_token = self.user['idToken']
+            return True
+        except Exception as e:
+            print(f"Error renovando token: {e}")
+            return False
+    
+    # ==================== TIEMPO REAL ====================
+    
+    def subscribe(self, collection: str, callback) -> Optional[callable]:
+        """
+        Suscribirse a cambios de generators/tasks/members vía el stream compartido
+        Returns: función para desuscribirse, o None si el streaming está desactivado
+        """
+        if not REALTIME_STREAMING:
+            return None
+        return realtime.hub.subscribe(collection, callback)
+    
+    def _get_collection(self, name: str) -> Dict[str, Any]:
+        """Leer colección: del espejo local si está sincronizado, si no de la caché/HTTP"""
+        snapshot = realtime.hub.snapshot(name)
+        if snapshot is not None:
+            return snapshot
+        try:
+            return dict(self._cached_get(name) or {})
+        except:
+            return {}
+    
+    # ==================== LECTURAS CON CACHÉ ====================
+    
+    def _cached_get(self, path: str) -> Any:
+        """GET de una ruta a través de la caché compartida"""
+        return _read_cache.get(path, lambda etag: self._fetch_with_etag(path, etag))
+    
+    def _fetch_with_etag(self, path: str, etag: Optional[str], query: Optional[Dict[str, Any]] = None) -> tuple:
+        """
+        GET REST con ETag (pyrebase no expone cabeceras); query = parámetros orderBy/startAt/endAt
+        Returns: (status_code, etag, value) con las colecciones ya decodificadas a modelos
+        """
+        url = f"{self.firebase.database_url.rstrip('/')}/{path}.json"
+        headers = {"X-Firebase-ETag": "true"}
+        if etag:
+            headers["if-none-match"] = etag
+        
+        response = self.firebase.requests.get(
+            url, params=dict(query or {}, auth=self.id_token), headers=headers, timeout=10
+        )
+        if response.status_code == 304:
+            return 304, etag, None
+        response.raise_for_status()
+        value = response.json()
+        if path in MODELS:
+            value = decode_collection(path, value)
+        return response.status_code, response.headers.get("ETag"), value
+    
+    # ==================== LOTES ====================
+    
+    def apply_updates(self, updates: Dict[str, Any], raise_errors: bool = False) -> bool:
+        """PATCH multi-ruta en la raíz: {"ruta/a/nodo": valor, "otra/ruta": None, ...}"""
+        try:
+            url = f"{self.firebase.database_url.rstrip('/')}/.json"
+            response = self.firebase.requests.patch(
+                url, params={"auth": self.id_token}, data=json.dumps(updates), timeout=15
+            )
+            response.raise_for_status()
+            for collection in {path.strip("/").split("/")[0] for path in updates}:
+                _read_cache.invalidate(collection)
+            return True
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error aplicando lote ({len(updates)} rutas): {e}")
+            return False
+    
+    # ==================== ESCRITURAS OPTIMISTAS ====================
+    
+    def new_key(self) -> str:
+        """Clave push de pyrebase (mismo formato que las generadas por el servidor)"""
+        return self.db.generate_key()
+    
+    def _set_journaled(self, path: str, value: Any):
+        """
+        Escritura directa que pasa antes por el diario: si el proceso muere o Firebase no responde
+        (red, timeout, 5xx) la cola la reenvía; si la rechaza, sale del diario y se propaga el error
+        """
+        journal = write_queue.queue.journal
+        journal_id = journal.append(path, value, self.user_email) if journal else None
+        try:
+            self.db.child(path).set(value, self.id_token)
+        except Exception as e:
+            if journal_id is not None and write_queue.is_transient(e):
+                print(f"Escritura en {path} pendiente de reenvío: {e}")
+                write_queue.queue.enqueue(self, path, value, journal_id=journal_id)
+                return
+            if journal_id is not None:
+                journal.remove([journal_id])
+            raise
+        if journal_id is not None:
+            journal.remove([journal_id])
+    
+    # ==================== CONSULTAS PAGINADAS ====================
+    
+    def query_page(self, collection: str, order_by: str, limit: int,
+                   cursor: Optional[tuple] = None, descending: bool = False) -> Tuple[List[tuple], Optional[tuple]]:
+        """
+        Página ordenada de una colección (orderBy + limitToFirst/limitToLast + startAt/endAt)
+        cursor: (valor, clave) del último registro de la página anterior
+        Returns: ([(key, record), ...], siguiente cursor o None)
+        """
+        snapshot = realtime.hub.snapshot(collection)
+        if snapshot is not None:
+            return _page_records(snapshot, order_by, limit, cursor, descending)
+        
+        # startAt/endAt son inclusivos y pueden repetirse valores: pedir de más y filtrar
+        fetch_limit = limit + 1
+        try:
+            while True:
+                records = decode_collection(
+                    collection, self._query(collection, order_by, fetch_limit, cursor, descending)
+                )
+                page, next_cursor = _page_records(records, order_by, limit, cursor, descending)
+                if next_cursor or len(records) < fetch_limit or len(page) >= limit:
+                    return page, next_cursor
+                fetch_limit *= 2
+        except Exception as e:
+            print(f"Error consultando {collection} por {order_by}: {e}")
+            return [], None
+    
+    def _query(self, collection: str, order_by: str, limit: int,
+               cursor: Optional[tuple], descending: bool) -> Dict[str, Any]:
+        """GET REST con parámetros de consulta (requiere .indexOn en el campo)"""
+        params = {"auth": self.id_token, "orderBy": json.dumps(order_by)}
+        if descending:
+            params["limitToLast"] = limit
+            if cursor is not None:
+                params["endAt"] = json.dumps(cursor[0])
+        else:
+            params["limitToFirst"] = limit
+            if cursor is not None:
+                params["startAt"] = json.dumps(cursor[0])
+        
+        url = f"{self.firebase.database_url.rstrip('/')}/{collection}.json"
+        response = self.firebase.requests.get(url, params=params, timeout=10)
+        if response.status_code == 400 and "Index not defined" in response.text:
+            print(f"Falta .indexOn [{order_by}] en {collection} (ver database.rules.json)")
+        response.raise_for_status()
+        return response.json() or {}
+    
+    def _query_range(self, collection: str, order_by: str,
+                     start_at: Any = None, end_at: Any = None) -> Dict[str, Any]:
+        """GET REST de un rango de valores (orderBy + startAt/endAt, requiere .indexOn)"""
+        params = {"auth": self.id_token, "orderBy": json.dumps(order_by)}
+        if start_at is not None:
+            params["startAt"] = json.dumps(start_at)
+        if end_at is not None:
+            params["endAt"] = json.dumps(end_at)
+        
+        url = f"{self.firebase.database_url.rstrip('/')}/{collection}.json"
+        response = self.firebase.requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json() or {}
+    
     # ==================== GENERADORES ====================
     
     def add_generator(self, name: str, duration_days: int) -> bool:
         """Añadir nuevo generador"""
+        generator_id = self.new_key()
+        generator_data = self.generator_record(name, duration_days)
         try:
-            generator_data = {
-                "name": name,
-                "start_timestamp": int(time.time()),
-                "duration_seconds": duration_days * 24 * 60 * 60,
-                "created_by": self.user_email
-            }
-            self.db.child("generators").push(generator_data, self.id_token)
+            self._set_journaled(f"generators/{generator_id}", generator_data)
+            _read_cache.invalidate("generators")
             return True
         except Exception as e:
             print(f"Error añadiendo generador: {e}")
             return False
     
-    def get_generators(self) -> Dict[str, Any]:
+    def get_generators(self) -> Dict[str, Generator]:
         """Obtener todos los generadores"""
-        try:
-            data = self.db.child("generators").get(self.id_token)
-            return data.val() if data.val() else {}
-        except:
-            return {}
+        return self._get_collection("generators")
     
     def delete_generator(self, generator_id: str) -> bool:
         """Eliminar generador"""
         try:
             self.db.child("generators").child(generator_id).remove(self.id_token)
+            _read_cache.invalidate("generators")
             return True
         except:
             return False
@@ -94,31 +447,25 @@ class FirebaseManager:
     
     def add_task(self, text: str, tag: str) -> bool:
         """Añadir nueva tarea"""
+        task_id = self.new_key()
+        task_data = self.task_record(text, tag)
         try:
-            task_data = {
-                "text": text,
-                "tag": tag,
-                "created_by": self.user_email,
-                "timestamp": int(time.time())
-            }
-            self.db.child("tasks").push(task_data, self.id_token)
+            self._set_journaled(f"tasks/{task_id}", task_data)
+            _read_cache.invalidate("tasks")
             return True
         except Exception as e:
             print(f"Error añadiendo tarea: {e}")
             return False
     
-    def get_tasks(self) -> Dict[str, Any]:
+    def get_tasks(self) -> Dict[str, Task]:
         """Obtener todas las tareas"""
-        try:
-            data = self.db.child("tasks").get(self.id_token)
-            return data.val() if data.val() else {}
-        except:
-            return {}
+        return self._get_collection("tasks")
     
     def delete_task(self, task_id: str) -> bool:
         """Eliminar tarea"""
         try:
             self.db.child("tasks").child(task_id).remove(self.id_token)
+            _read_cache.invalidate("tasks")
             return True
         except:
             return False
@@ -127,32 +474,25 @@ class FirebaseManager:
     
     def add_member(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> bool:
         """Añadir nuevo miembro"""
+        member_id = self.new_key()
+        member_data = self.member_record(name, discord, vouch, trust, roles)
         try:
-            member_data = {
-                "name": name,
-                "discord": discord,
-                "vouch": vouch,
-                "trust_level": trust,
-                "roles": roles
-            }
-            self.db.child("members").push(member_data, self.id_token)
+            self._set_journaled(f"members/{member_id}", member_data)
+            _read_cache.invalidate("members")
             return True
         except Exception as e:
             print(f"Error añadiendo miembro: {e}")
             return False
     
-    def get_members(self) -> Dict[str, Any]:
+    def get_members(self) -> Dict[str, Member]:
         """Obtener todos los miembros"""
-        try:
-            data = self.db.child("members").get(self.id_token)
-            return data.val() if data.val() else {}
-        except:
-            return {}
+        return self._get_collection("members")
     
     def delete_member(self, member_id: str) -> bool:
         """Eliminar miembro"""
         try:
             self.db.child("members").child(member_id).remove(self.id_token)
+            _read_cache.invalidate("members")
             return True
         except:
             return False
@@ -161,6 +501,7 @@ class FirebaseManager:
         """Actualizar datos de miembro"""
         try:
             self.db.child("members").child(member_id).update(data, self.id_token)
+            _read_cache.invalidate("members")
             return True
         except:
             return False
@@ -177,31 +518,44 @@ class FirebaseManager:
                 "roles": roles
             }
             self.db.child("admin_status").child(self.user_email).set(status_data, self.id_token)
+            _read_cache.invalidate("admin_status")
             return True
         except Exception as e:
             print(f"Error actualizando heartbeat: {e}")
             return False
     
-    def get_active_admins(self) -> Dict[str, Any]:
-        """Obtener admins activos (últimos 2 minutos)"""
+    def get_active_admins(self) -> Dict[str, AdminStatus]:
+        """Obtener admins activos (últimos 2 minutos) e inactivos recientes (ADMIN_STATUS_WINDOW)"""
         try:
-            data = self.db.child("admin_status").get(self.id_token)
-            if not data.val():
-                return {}
-            
-            current_time = int(time.time())
-            active_admins = {}
-            
-            for admin_id, admin_data in data.val().items():
-                last_beat = admin_data.get("last_heartbeat", 0)
-                if current_time - last_beat < ADMIN_TIMEOUT:
-                    active_admins[admin_id] = admin_data
-                    active_admins[admin_id]["active"] = True
-                else:
-                    # Marcar como inactivo si pasó el timeout
-                    active_admins[admin_id] = admin_data
-                    active_admins[admin_id]["active"] = False
-            
-            return active_admins
+            # Solo latidos recientes: el coste no crece con el historial de la tribu. El inicio se
+            # redondea a 5 minutos para que la consulta (y su ETag) se repita entre refrescos
+            start_at = (int(time.time()) - ADMIN_STATUS_WINDOW) // 300 * 300
+            query = {"orderBy": json.dumps("last_heartbeat"), "startAt": json.dumps(start_at)}
+            data = _read_cache.get("admin_status", lambda etag: self._fetch_with_etag("admin_status", etag, query))
+            # Copias: los registros de la caché son compartidos entre sesiones
+            return self._mark_activity(data or {})
         except:
             return {}
+    
+    def compact_admin_status(self, retention: int, archive: bool = True) -> int:
+        """
+        Quitar de admin_status los registros sin latido en `retention` segundos
+        archive=True los mueve a admin_status_archive en el mismo PATCH
+        Returns: número de registros compactados
+        """
+        try:
+            stale = self._query_range(
+                "admin_status", "last_heartbeat", end_at=int(time.time()) - retention
+            )
+        except Exception as e:
+            print(f"Error buscando admin_status antiguos: {e}")
+            return 0
+        if not stale:
+            return 0
+        
+        batch = self.batch()
+        for admin_id, admin_data in stale.items():
+            if archive:
+                batch.set(f"admin_status_archive/{admin_id}", admin_data)
+            batch.delete(f"admin_status/{admin_id}")
+        return len(stale) if batch.commit() else 0
@@ -0,0 +1,100 @@
+# journal.py
+# Diario local (SQLite) de mutaciones pendientes: se registran antes de enviarse a Firebase
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import JOURNAL_PATH
+
+
+class MutationJournal:
+    """
+    Write-ahead log de escrituras hacia Firebase
+    - append() antes de enviar; remove() cuando Firebase confirma
+    - Al reiniciar, pending() devuelve lo que quedó sin confirmar, en orden
+    - Compactación: una escritura nueva descarta las pendientes de la misma ruta y sus hijas
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.compacted = 0
+        self.replayed = 0
+        self.replay_rate = 0.0  # Mutaciones/s confirmadas en el último envío
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mutations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    owner TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mutations_path ON mutations(path)")
+
+    def append(self, path: str, value: Any, owner: Optional[str] = None) -> int:
+        """Registrar mutación (value=None elimina el nodo); devuelve su id"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "DELETE FROM mutations WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                    (path, _like_prefix(path))
+                )
+                self.compacted += max(cursor.rowcount, 0)
+                cursor = self._conn.execute(
+                    "INSERT INTO mutations (path, value, owner, created_at) VALUES (?, ?, ?, ?)",
+                    (path, json.dumps(value), owner, time.time())
+                )
+                self._conn.execute("COMMIT")
+                return cursor.lastrowid
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove(self, ids: List[int], elapsed: Optional[float] = None):
+        """Borrar mutaciones confirmadas (elapsed = duración del envío, para el throughput)"""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM mutations WHERE id = ?", [(i,) for i in ids])
+        self.replayed += len(ids)
+        if elapsed:
+            self.replay_rate = len(ids) / elapsed
+
+    def pending(self) -> List[Tuple[int, str, Any, Optional[str]]]:
+        """Mutaciones sin confirmar, en el orden en que se registraron"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, path, value, owner FROM mutations ORDER BY id"
+            ).fetchall()
+        return [(row_id, path, json.loads(value), owner) for row_id, path, value, owner in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            backlog, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM mutations"
+            ).fetchone()
+        return {
+            "backlog": backlog,
+            "oldest_age": time.time() - oldest if oldest else 0.0,
+            "replayed": self.replayed,
+            "replay_rate": self.replay_rate,
+            "compacted": self.compacted
+        }
+
+
+def _like_prefix(path: str) -> str:
+    """Patrón LIKE para las rutas hijas de path"""
+    escaped = path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "/%"
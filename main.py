@@ -10,8 +10,9 @@ import time
 # Asegurar que el directorio actual esté en el path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from firebase_manager import FirebaseManager
-from ark_api import ARKStatusAPI
+import presence
+import status_poller
+from storage import create_backend
 from components.login_view import LoginView
 from components.sidebar import Sidebar
 from components.server_status_view import ServerStatusView
@@ -20,8 +21,6 @@ from components.tasks_view import TasksView
 from components.members_view import MembersView
 from config import (
     COLORS, 
-    SERVER_UPDATE_INTERVAL, 
-    HEARTBEAT_INTERVAL, 
     GENERATOR_UPDATE_INTERVAL
 )
 
@@ -30,8 +29,7 @@ class ARKTribeManager:
     
     def __init__(self, page: ft.Page):
         self.page = page
-        self.firebase = FirebaseManager()
-        self.ark_api = ARKStatusAPI()
+        self.firebase = create_backend()  # FirebaseManager o SQLiteBackend según STORAGE_BACKEND
         
         # Componentes
         self.login_view = None
@@ -44,6 +42,10 @@ class ARKTribeManager:
         # Estado
         self.current_section = "server"
         self.is_running = True
+        self._login_count = 0  # Cada login arranca sus propios bucles de fondo
+        self._unsubscribers = []  # Suscripciones al stream en tiempo real
+        self.presence = None  # Registro en el heartbeat agregado del proceso
+        self.server_status = None  # Suscripción al sondeo de ARK Status del proceso
         
         # UI Elements
         self.content_container = ft.Container(expand=True, bgcolor=COLORS["background"])
@@ -52,6 +54,7 @@ class ARKTribeManager:
         
         self._setup_page()
         self._show_login()
+        self.page.on_close = lambda _: self._handle_session_close()
 
     def _setup_page(self):
         self.page.title = "ARK Manager - FOG"
@@ -79,9 +82,13 @@ class ARKTribeManager:
         self.page.update()
 
     def _handle_login_success(self, email: str):
+        # Tras un logout en la misma pestaña: reactivar los callbacks del stream, heartbeat y sondeo
+        self.is_running = True
+        self._login_count += 1
         self._init_app_components()
         self._setup_navigation()
         self._start_background_tasks()
+        self._start_live_updates()
         self._refresh_view()
 
     def _init_app_components(self):
@@ -89,7 +96,7 @@ class ARKTribeManager:
         self.sidebar = Sidebar(
             on_section_change=self._handle_section_change,
             on_roles_change=self._handle_roles_change,
-            on_logout=self._handle_logout,
+            on_logout=lambda: self.page.run_task(self._handle_logout),
             username=self.firebase.user_email
         )
         self.sidebar.page = self.page
@@ -118,7 +125,7 @@ class ARKTribeManager:
             center_title=True,
             bgcolor=COLORS["card"],
             actions=[
-                ft.IconButton(ft.Icons.REFRESH, icon_color=COLORS["text_secondary"], on_click=lambda _: self._refresh_current_data())
+                ft.IconButton(ft.Icons.REFRESH, icon_color=COLORS["text_secondary"], on_click=lambda _: self._handle_refresh_click())
             ]
         )
         self.page.appbar = self.app_bar
@@ -141,6 +148,8 @@ class ARKTribeManager:
 
     def _handle_section_change(self, section: str):
         self.current_section = section
+        if self.presence:
+            self.presence.touch()
         if self.page.drawer:
             self.page.drawer.open = False
             self.page.update()
@@ -151,82 +160,118 @@ class ARKTribeManager:
         if self.current_section == "server":
             self.content_container.content = self.server_view.build()
             self.server_view.page = self.page
-            self._update_server_data()
         elif self.current_section == "generators":
             self.content_container.content = self.generators_view.build()
             self.generators_view.page = self.page
-            self.generators_view.refresh_generators()
+            self.page.run_task(self.generators_view.refresh_generators)
         elif self.current_section == "tasks":
             self.content_container.content = self.tasks_view.build()
             self.tasks_view.page = self.page
-            self.tasks_view.refresh_tasks()
+            self.page.run_task(self.tasks_view.refresh_tasks)
         elif self.current_section == "members":
             self.content_container.content = self.members_view.build()
             self.members_view.page = self.page
-            self.members_view.refresh_members()
+            self.page.run_task(self.members_view.refresh_members)
         
+        # El sondeo compartido solo reparte el estado a las sesiones que lo muestran
+        if self.server_status:
+            self.server_status.set_watching(self.current_section == "server")
         self.page.update()
 
     def _handle_roles_change(self, roles: list):
         """Actualizar roles y forzar actualización inmediata de heartbeat"""
-        asyncio.create_task(self._force_heartbeat(roles))
-
-    async def _force_heartbeat(self, roles):
-        self.firebase.update_heartbeat(roles)
+        if self.presence:
+            self.presence.set_roles(roles)
 
-    def _handle_logout(self):
+    async def _handle_logout(self):
         self.is_running = False
-        self.firebase.logout()
+        self._stop_live_updates()
+        self._stop_presence()
+        self._stop_server_status()
+        # Esperar al logout antes de mostrar el login: si no, un login rápido podría terminar antes
+        # y el logout tardío borraría el token y el usuario de la sesión nueva
+        await self.firebase.logout_async()
         self.page.appbar = None
         self.page.drawer = None
         self._show_login()
 
+    def _handle_refresh_click(self):
+        if self.presence:
+            self.presence.touch()
+        self._refresh_current_data()
+
     def _refresh_current_data(self):
-        if self.current_section == "server": self._update_server_data()
-        elif self.current_section == "generators": self.generators_view.refresh_generators()
-        elif self.current_section == "tasks": self.tasks_view.refresh_tasks()
-        elif self.current_section == "members": self.members_view.refresh_members()
+        if self.current_section == "server": self.server_status.refresh()
+        elif self.current_section == "generators": self.page.run_task(self.generators_view.refresh_generators)
+        elif self.current_section == "tasks": self.page.run_task(self.tasks_view.refresh_tasks)
+        elif self.current_section == "members": self.page.run_task(self.members_view.refresh_members)
+
+    def _handle_session_close(self):
+        """Sesión de Flet cerrada (pestaña cerrada o expirada)"""
+        self.is_running = False
+        self._stop_live_updates()
+        self._stop_presence()
+        self._stop_server_status()
+
+    # ==================== TIEMPO REAL ====================
+
+    def _start_live_updates(self):
+        """Suscribirse a los streams compartidos de generators/tasks/members"""
+        for collection in ("generators", "tasks", "members"):
+            unsubscribe = self.firebase.subscribe(collection, self._handle_remote_change)
+            if unsubscribe:
+                self._unsubscribers.append(unsubscribe)
+
+    def _stop_live_updates(self):
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+
+    def _handle_remote_change(self, collection: str):
+        """Cambio recibido por el stream (se llama desde el hilo del stream)"""
+        if self.is_running and collection == self.current_section:
+            self._refresh_current_data()
 
     # ==================== BACKGROUND TASKS ====================
     
     def _start_background_tasks(self):
-        asyncio.create_task(self._bg_server_update())
-        asyncio.create_task(self._bg_heartbeat())
-        asyncio.create_task(self._bg_generators_update())
-
-    async def _bg_server_update(self):
-        while self.is_running:
-            if self.current_section == "server":
-                self._update_server_data()
-            await asyncio.sleep(SERVER_UPDATE_INTERVAL / 1000)
-
-    async def _bg_heartbeat(self):
-        while self.is_running:
-            roles = self.sidebar.selected_roles if self.sidebar else []
-            self.firebase.update_heartbeat(roles)
-            
-            # Actualizar lista de admins activos en el sidebar
-            admins = self.firebase.get_active_admins()
-            if self.sidebar:
-                self.sidebar.update_active_admins(admins, self.page)
-                
-            await asyncio.sleep(HEARTBEAT_INTERVAL / 1000)
-
-    async def _bg_generators_update(self):
-        while self.is_running:
-            if self.current_section == "generators":
-                self.generators_view.refresh_generators()
-            await asyncio.sleep(GENERATOR_UPDATE_INTERVAL / 1000)
+        # run_task: los handlers síncronos de Flet corren en hilos sin event loop
+        self.page.run_task(self._bg_generators_update, self._login_count)
+        
+        # Estado del servidor: un único sondeo por proceso reparte el resultado a todas las sesiones
+        self.server_status = status_poller.poller.subscribe(self._handle_server_status)
+        
+        # Heartbeat: un único ciclo por proceso escribe y lee admin_status para todas las sesiones
+        roles = self.sidebar.selected_roles if self.sidebar else []
+        self.presence = presence.hub.register(self.firebase, roles, self._handle_active_admins)
+
+    def _stop_presence(self):
+        if self.presence:
+            self.presence.unregister()
+            self.presence = None
 
-    def _update_server_data(self):
-        """Consultar API y actualizar vista de servidor"""
-        # Ejecutar en hilo para no bloquear Flet
-        asyncio.create_task(self._fetch_server_async())
+    def _stop_server_status(self):
+        if self.server_status:
+            self.server_status.unsubscribe()
+            self.server_status = None
 
-    async def _fetch_server_async(self):
-        data = await asyncio.to_thread(self.ark_api.get_server_status)
-        if data and self.server_view:
-            self.server_view.update_data(data, self.page)
+    def _handle_active_admins(self, admins: dict):
+        """Lectura de admin_status del heartbeat agregado (se llama desde su hilo)"""
+        if self.is_running and self.sidebar:
+            self.sidebar.update_active_admins(admins, self.page)
+
+    def _handle_server_status(self, cluster: dict):
+        """Estado de los servidores del sondeo compartido (se llama desde su hilo)"""
+        if self.is_running and self.server_view:
+            self.server_view.update_cluster(cluster, self.page)
+
+    async def _bg_generators_update(self, login_count: int):
+        # Re-render periódico de los countdowns; los datos salen del espejo local si está activo
+        # (termina con el logout aunque se vuelva a entrar antes de que despierte)
+        while self.is_running and login_count == self._login_count:
+            if self.current_section == "generators":
+                await self.generators_view.refresh_generators()
+            await asyncio.sleep(GENERATOR_UPDATE_INTERVAL / 1000)
 
 async def main(page: ft.Page):
     app = ARKTribeManager(page)
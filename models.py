@@ -0,0 +1,212 @@
+# models.py
+# Registros tipados y compactos (dataclasses con __slots__) para los datos de Firebase
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+
+@dataclass(slots=True, frozen=True)
+class Generator:
+    """Generador de la tribu con su temporizador"""
+    id: str
+    name: str = "Sin nombre"
+    start_timestamp: int = 0
+    duration_seconds: int = 0
+    created_by: str = "Unknown"
+
+    @classmethod
+    def from_dict(cls, key: str, raw: Dict[str, Any]) -> "Generator":
+        get = raw.get
+        return cls(
+            key,
+            get("name") or "Sin nombre",
+            get("start_timestamp") or 0,
+            get("duration_seconds") or 0,
+            get("created_by") or "Unknown"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_timestamp": self.start_timestamp,
+            "duration_seconds": self.duration_seconds,
+            "created_by": self.created_by
+        }
+
+    @property
+    def end_timestamp(self) -> int:
+        return self.start_timestamp + self.duration_seconds
+
+    def remaining(self, now: int) -> int:
+        """Segundos que le quedan (0 si expiró)"""
+        return max(0, self.end_timestamp - now)
+
+
+@dataclass(slots=True, frozen=True)
+class Task:
+    """Tarea de la tribu con tag de rol"""
+    id: str
+    text: str = "Sin descripción"
+    tag: str = "ADMIN"
+    created_by: str = "Unknown"
+    timestamp: int = 0
+
+    @classmethod
+    def from_dict(cls, key: str, raw: Dict[str, Any]) -> "Task":
+        get = raw.get
+        return cls(
+            key,
+            get("text") or "Sin descripción",
+            get("tag") or "ADMIN",
+            get("created_by") or "Unknown",
+            get("timestamp") or 0
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "tag": self.tag,
+            "created_by": self.created_by,
+            "timestamp": self.timestamp
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class Member:
+    """Miembro de la tribu"""
+    id: str
+    name: str = "Unknown"
+    discord: str = "-"
+    vouch: str = "None"
+    trust_level: str = "medium"
+    roles: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, key: str, raw: Dict[str, Any]) -> "Member":
+        get = raw.get
+        return cls(
+            key,
+            get("name") or "Unknown",
+            get("discord") or "-",
+            get("vouch") or "None",
+            get("trust_level") or "medium",
+            _as_tuple(get("roles"))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "discord": self.discord,
+            "vouch": self.vouch,
+            "trust_level": self.trust_level,
+            "roles": list(self.roles)
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class AdminStatus:
+    """Presencia de un admin (admin_status/<usuario>)"""
+    id: str
+    username: str = ""
+    last_heartbeat: int = 0
+    active: bool = False
+    roles: Tuple[str, ...] = ()
+    heartbeat_interval: int = 0
+
+    @classmethod
+    def from_dict(cls, key: str, raw: Dict[str, Any]) -> "AdminStatus":
+        get = raw.get
+        return cls(
+            key,
+            get("username") or key,
+            get("last_heartbeat") or 0,
+            bool(get("active")),
+            _as_tuple(get("roles")),
+            get("heartbeat_interval") or 0
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "username": self.username,
+            "last_heartbeat": self.last_heartbeat,
+            "active": self.active,
+            "roles": list(self.roles),
+            "heartbeat_interval": self.heartbeat_interval
+        }
+
+
+# Modelo de cada colección de la base de datos
+MODELS: Dict[str, Type] = {
+    "generators": Generator,
+    "tasks": Task,
+    "members": Member,
+    "admin_status": AdminStatus,
+}
+
+
+def decode(model: Type, key: str, raw: Any) -> Optional[Any]:
+    """Registro JSON -> modelo (None si el nodo no es un registro válido)"""
+    if not isinstance(raw, dict):
+        return None
+    return model.from_dict(key, raw)
+
+
+def decode_collection(collection: str, raw: Any) -> Dict[str, Any]:
+    """
+    JSON de una colección -> {clave: modelo}
+    Colecciones sin modelo se devuelven tal cual (como dict)
+    """
+    if isinstance(raw, list):
+        # RTDB devuelve listas cuando las claves son índices numéricos
+        raw = {str(i): v for i, v in enumerate(raw) if v is not None}
+    if not isinstance(raw, dict):
+        return {}
+    model = MODELS.get(collection)
+    if model is None:
+        return raw
+    from_dict = model.from_dict
+    return {key: from_dict(key, value) for key, value in raw.items() if isinstance(value, dict)}
+
+
+def with_field(record: Any, field: str, value: Any) -> Any:
+    """Copia del registro con un campo cambiado (los modelos son inmutables)"""
+    if isinstance(record, dict):
+        return dict(record, **{field: value})
+    raw = record.to_dict()
+    if value is None:
+        raw.pop(field, None)
+    else:
+        raw[field] = value
+    return type(record).from_dict(record.id, raw)
+
+
+def set_path(record: Dict[str, Any], parts: List[str], value: Any):
+    """
+    Asignar value en record[parts[0]][parts[1]]... (None borra el nodo)
+    Copia los nodos intermedios, así los dicts compartidos con otros registros no se alteran
+    """
+    node = record
+    for part in parts[:-1]:
+        child = node.get(part)
+        if isinstance(child, list):
+            # RTDB guarda las listas como {índice: valor}
+            child = {str(i): v for i, v in enumerate(child) if v is not None}
+        elif isinstance(child, dict):
+            child = dict(child)
+        else:
+            child = {}
+        node[part] = child
+        node = child
+    if value is None:
+        node.pop(parts[-1], None)
+    else:
+        node[parts[-1]] = value
+
+
+def _as_tuple(value: Any) -> Tuple[str, ...]:
+    """Listas de RTDB: pueden llegar como lista, como dict {índice: valor} o faltar"""
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return ()
+    return tuple(v for v in value if v is not None)
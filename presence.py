@@ -0,0 +1,228 @@
+# presence.py
+# Latido (heartbeat) agregado por proceso: una escritura y una lectura de admin_status por intervalo
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config import (
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_IDLE_INTERVAL,
+    PRESENCE_IDLE_AFTER,
+    ADMIN_STATUS_RETENTION,
+    ADMIN_STATUS_GC_INTERVAL
+)
+
+# Ticks entre latidos de una sesión inactiva (90 s / 30 s = uno de cada 3 ticks)
+IDLE_EVERY = max(1, round(HEARTBEAT_IDLE_INTERVAL / HEARTBEAT_INTERVAL))
+
+
+class PresenceSession:
+    """Presencia de una sesión de Flet registrada en el hub"""
+
+    def __init__(self, hub: "PresenceHub", manager, roles: list, on_admins: Callable[[Dict[str, Any]], None]):
+        self.hub = hub
+        self.manager = manager
+        self.roles = list(roles)
+        self.on_admins = on_admins
+        self.updated_at = time.monotonic()
+        self.last_activity = time.monotonic()
+        self.last_beat = 0.0
+        self.next_beat = 0.0  # 0 = publicar sin esperar al siguiente tick (sesión nueva o cambio de roles)
+
+    @property
+    def username(self) -> Optional[str]:
+        return self.manager.user_email
+
+    @property
+    def interval(self) -> float:
+        """Segundos entre latidos: más largo si la sesión lleva un rato sin actividad"""
+        if self.is_idle:
+            return HEARTBEAT_IDLE_INTERVAL / 1000
+        return HEARTBEAT_INTERVAL / 1000
+
+    @property
+    def is_idle(self) -> bool:
+        return time.monotonic() - self.last_activity > PRESENCE_IDLE_AFTER
+
+    def set_roles(self, roles: list):
+        """Cambiar roles y publicar el latido sin esperar al siguiente intervalo"""
+        self.roles = list(roles)
+        self.updated_at = time.monotonic()
+        self.last_activity = self.updated_at
+        self.next_beat = 0.0
+        self.hub.wake()
+
+    def touch(self):
+        """Registrar actividad del usuario (vuelve a latir en cada tick si estaba inactiva)"""
+        self.last_activity = time.monotonic()
+
+    def unregister(self):
+        self.hub.unregister(self)
+
+
+class PresenceHub:
+    """
+    Agrega el latido de todas las sesiones del proceso
+    - Un único PATCH multi-ruta por ciclo con la presencia de las sesiones a las que les toca
+    - Solo se envían los campos que cambiaron desde la última escritura, más last_heartbeat
+    - Un único tick por proceso cada HEARTBEAT_INTERVAL: todas las sesiones laten juntas aunque
+      hayan entrado en momentos distintos
+    - Cadencia adaptativa: las sesiones inactivas solo entran en uno de cada IDLE_EVERY ticks; los
+      cambios de roles y las sesiones nuevas se publican al momento (sin lectura extra)
+    - Una única lectura de admin_status por tick, repartida a todas las sesiones
+    - Limpieza periódica: los registros sin latido en ADMIN_STATUS_RETENTION se archivan
+    """
+
+    def __init__(self):
+        self._sessions: List[PresenceSession] = []
+        self._written: Dict[str, Dict[str, Any]] = {}  # Último registro escrito por usuario
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_tick = 0.0
+        self.ticks = 0
+        self.cycles = 0
+        self.fields_written = 0
+        self.compacted = 0
+        self._last_gc = 0.0
+        self.last_admins: Dict[str, Any] = {}
+
+    def register(self, manager, roles: list, on_admins: Callable[[Dict[str, Any]], None]) -> PresenceSession:
+        """Registrar una sesión autenticada; on_admins(admins) recibe cada lectura de admin_status"""
+        session = PresenceSession(self, manager, roles, on_admins)
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="presence", daemon=True)
+                self._thread.start()
+        self.wake()
+        return session
+
+    def unregister(self, session: PresenceSession):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            # Sin más pestañas de ese usuario: la próxima vez se escribe el registro completo
+            if not any(s.username == session.username for s in self._sessions):
+                self._written.pop(session.username, None)
+
+    def wake(self):
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions)
+        return {
+            "sessions": len(sessions),
+            "idle_sessions": sum(1 for s in sessions if s.is_idle),
+            "cycles": self.cycles,
+            "fields_written": self.fields_written,
+            "compacted": self.compacted
+        }
+
+    # ==================== CICLO ====================
+
+    def _run(self):
+        while True:
+            with self._lock:
+                sessions = [s for s in self._sessions if s.manager.is_authenticated()]
+            now = time.monotonic()
+            tick = bool(sessions) and now >= self._next_tick
+            if tick:
+                self.ticks += 1
+                self._next_tick = now + HEARTBEAT_INTERVAL / 1000
+                idle_turn = self.ticks % IDLE_EVERY == 0
+                due = [s for s in sessions if idle_turn or not s.is_idle or s.next_beat == 0]
+            else:
+                due = [s for s in sessions if s.next_beat == 0]
+
+            if tick or due:
+                marks = {id(s): s.updated_at for s in due}
+                try:
+                    self._cycle(sessions, due, read=tick)
+                except Exception as e:
+                    print(f"Error en heartbeat agregado: {e}")
+                    # Reintento en el siguiente tick (salvo que los roles cambiaran durante el ciclo)
+                    for session in due:
+                        if session.updated_at == marks[id(session)]:
+                            session.next_beat = self._next_tick
+            if sessions and now - self._last_gc > ADMIN_STATUS_GC_INTERVAL:
+                self._last_gc = now
+                self._compact(sessions[0].manager)
+
+            timeout = max(0.0, self._next_tick - time.monotonic()) if sessions else None
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _cycle(self, sessions: List[PresenceSession], due: List[PresenceSession], read: bool = True):
+        """Escribir la presencia de `due` en un único PATCH y, en los ticks, leer admin_status una vez"""
+        marks = {id(s): s.updated_at for s in due}
+        now = int(time.time())
+        updates = {}
+        records = {}
+        for username in {s.username for s in due}:
+            user_sessions = [s for s in sessions if s.username == username]
+            # Varias pestañas del mismo usuario: manda la que cambió roles más recientemente
+            latest = max(user_sessions, key=lambda s: s.updated_at)
+            record = {
+                "username": username,
+                "active": True,
+                "roles": latest.roles,
+                "heartbeat_interval": int(min(s.interval for s in user_sessions))
+            }
+            records[username] = record
+
+            written = self._written.get(username)
+            if written is None:
+                updates[f"admin_status/{username}"] = dict(record, last_heartbeat=now)
+                self.fields_written += len(record) + 1
+            else:
+                for field, value in record.items():
+                    if written.get(field) != value:
+                        updates[f"admin_status/{username}/{field}"] = value
+                updates[f"admin_status/{username}/last_heartbeat"] = now
+                self.fields_written += len([p for p in updates if p.startswith(f"admin_status/{username}/")])
+
+        manager = (due or sessions)[0].manager
+        if updates and not manager.apply_updates(updates):
+            raise ConnectionError("no se pudo escribir admin_status")
+        self._written.update(records)
+
+        beat = time.monotonic()
+        for session in sessions:
+            if session.username not in records:
+                continue
+            session.last_beat = beat
+            # set_roles() durante el ciclo deja next_beat a 0: no pisarlo para publicarlo enseguida
+            if marks.get(id(session), session.updated_at) == session.updated_at:
+                session.next_beat = beat + session.interval
+        self.cycles += 1
+
+        if read:
+            admins = manager.get_active_admins()
+            self.last_admins = admins
+            targets = sessions
+        else:
+            # Fuera de tick: las sesiones nuevas reciben la última lectura sin leer otra vez
+            admins = self.last_admins
+            targets = due
+
+        for session in targets:
+            try:
+                session.on_admins(admins)
+            except Exception as e:
+                print(f"Error actualizando admins de {session.username}: {e}")
+
+    def _compact(self, manager):
+        """Archivar registros de admin_status abandonados (idempotente entre procesos)"""
+        try:
+            removed = manager.compact_admin_status(ADMIN_STATUS_RETENTION)
+            if removed:
+                self.compacted += removed
+                print(f"admin_status: {removed} registros antiguos archivados")
+        except Exception as e:
+            print(f"Error compactando admin_status: {e}")
+
+
+# Instancia única por proceso
+hub = PresenceHub()
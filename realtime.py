@@ -0,0 +1,234 @@
+# realtime.py
+# Espejo local de colecciones de Firebase alimentado por el stream REST (Server-Sent Events)
+
+import json
+import threading
+import requests
+from typing import Callable, Dict, Any, Optional, List
+from config import FIREBASE_CONFIG, REALTIME_RECONNECT_MAX
+from models import MODELS, decode, decode_collection, set_path
+
+
+class CollectionMirror:
+    """Copia local de una colección (generators, tasks, members) compartida por todas las sesiones"""
+
+    def __init__(self, hub, name: str):
+        self.hub = hub
+        self.name = name
+        self.model = MODELS.get(name)
+        self.data: Dict[str, Any] = {}  # {clave: modelo}
+        self.synced = False  # True tras recibir el primer "put" completo
+        self.events = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[str], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._response = None
+
+    # ==================== SUSCRIPCIONES ====================
+
+    def subscribe(self, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Registrar callback de cambios; devuelve la función para desuscribirse"""
+        with self._lock:
+            self._subscribers.append(callback)
+            self._stop.clear()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"rtdb-stream-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+                if not self._subscribers:
+                    self._close()
+
+        return unsubscribe
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia superficial del estado actual (los registros se reemplazan, no se mutan)"""
+        with self._lock:
+            return dict(self.data)
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback(self.name)
+            except Exception as e:
+                print(f"Error notificando cambios de {self.name}: {e}")
+
+    def _close(self):
+        self._stop.set()
+        self.synced = False
+        response = self._response
+        if response is not None:
+            # El hilo lector está bloqueado leyendo: cerrar desde aquí esperaría al siguiente
+            # evento (hasta 30 s); se cierra en segundo plano para no bloquear a quien desuscribe
+            threading.Thread(target=_close_quietly, args=(response,), daemon=True).start()
+
+    # ==================== APLICAR EVENTOS ====================
+
+    def apply(self, event: str, path: str, data: Any):
+        """Aplicar un evento put/patch del stream sobre el espejo local"""
+        parts = [p for p in path.split("/") if p]
+        with self._lock:
+            if event == "put":
+                self._put(parts, data)
+                if not parts:
+                    self.synced = True
+            elif event == "patch":
+                for key, value in (data or {}).items():
+                    self._put(parts + [p for p in key.split("/") if p], value)
+            self.events += 1
+
+    def _put(self, parts: List[str], value: Any):
+        if not parts:
+            self.data = decode_collection(self.name, value)
+            return
+
+        record_id = parts[0]
+        if len(parts) == 1:
+            record = self._decode(record_id, value)
+            if record is None:
+                self.data.pop(record_id, None)
+            else:
+                self.data[record_id] = record
+            return
+
+        # Cambio dentro de un registro: se reconstruye (los modelos son inmutables y
+        # los snapshots ya entregados no deben verse alterados)
+        current = self.data.get(record_id)
+        if self.model is not None:
+            record = current.to_dict() if current is not None else {}
+        else:
+            record = dict(current) if isinstance(current, dict) else {}
+        set_path(record, parts[1:], value)
+        self.data[record_id] = self._decode(record_id, record)
+
+    def _decode(self, record_id: str, value: Any) -> Any:
+        if self.model is None:
+            return value
+        return decode(self.model, record_id, value)
+
+    # ==================== STREAM ====================
+
+    def _run(self):
+        """Hilo lector: conecta, procesa eventos y reconecta con backoff"""
+        backoff = 1
+        while not self._stop.is_set():
+            token = self.hub.get_token()
+            if not token:
+                self._stop.wait(backoff)
+                continue
+            try:
+                self._consume(token)
+                backoff = 1
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"Stream {self.name} desconectado: {e}")
+            self.synced = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, REALTIME_RECONNECT_MAX)
+
+    def _consume(self, token: str):
+        url = f"{self.hub.database_url}/{self.name}.json"
+        response = self.hub.session.get(
+            url,
+            params={"auth": token},
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            timeout=(10, 90)  # Firebase envía keep-alive cada 30 s
+        )
+        self._response = response
+        response.raise_for_status()
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if self._stop.is_set():
+                break
+            if not line:
+                continue
+            self.bytes_received += len(line)
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                self._handle(event, line[5:].strip())
+
+    def _handle(self, event: Optional[str], raw: str):
+        if event in ("put", "patch"):
+            payload = json.loads(raw)
+            self.apply(event, payload.get("path", "/"), payload.get("data"))
+            self._notify()
+        elif event in ("cancel", "auth_revoked"):
+            # Token caducado o permisos revocados: reconectar con token nuevo
+            self.hub.invalidate_token()
+            raise ConnectionError(event)
+
+
+class RealtimeHub:
+    """Streams compartidos por proceso: una conexión por colección, sin importar las sesiones"""
+
+    def __init__(self):
+        self.database_url = FIREBASE_CONFIG["databaseURL"].rstrip("/")
+        self.session = requests.Session()
+        self._mirrors: Dict[str, CollectionMirror] = {}
+        self._lock = threading.Lock()
+        self._token_provider: Optional[Callable[[bool], Optional[str]]] = None
+        self._token_stale = False
+
+    def set_token_provider(self, provider: Callable[[bool], Optional[str]]):
+        """provider(force_refresh) -> id token de cualquier sesión autenticada"""
+        self._token_provider = provider
+
+    def get_token(self) -> Optional[str]:
+        if not self._token_provider:
+            return None
+        force = self._token_stale
+        self._token_stale = False
+        return self._token_provider(force)
+
+    def invalidate_token(self):
+        self._token_stale = True
+
+    def mirror(self, name: str) -> CollectionMirror:
+        with self._lock:
+            if name not in self._mirrors:
+                self._mirrors[name] = CollectionMirror(self, name)
+            return self._mirrors[name]
+
+    def subscribe(self, name: str, callback: Callable[[str], None]) -> Callable[[], None]:
+        """Suscribirse a cambios de una colección (arranca su stream si no existía)"""
+        return self.mirror(name).subscribe(callback)
+
+    def snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        """Estado local de la colección, o None si el espejo no está sincronizado"""
+        mirror = self._mirrors.get(name)
+        if mirror is None or not mirror.synced:
+            return None
+        return mirror.snapshot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "synced": mirror.synced,
+                "records": len(mirror.data),
+                "events": mirror.events,
+                "bytes": mirror.bytes_received,
+                "subscribers": len(mirror._subscribers)
+            }
+            for name, mirror in self._mirrors.items()
+        }
+
+
+def _close_quietly(response):
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+# Instancia única por proceso
+hub = RealtimeHub()
@@ -0,0 +1,374 @@
+# sqlite_backend.py
+# Backend local en SQLite: mismas operaciones que FirebaseManager, sin red (autoalojado y pruebas)
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import write_queue
+from dataclasses import fields
+from typing import Optional, Dict, Any, List, Tuple
+from config import SQLITE_PATH, ADMIN_STATUS_WINDOW
+from models import MODELS, Generator, Task, Member, AdminStatus, set_path
+from storage import StorageBackend, QUERY_INDEXES
+
+
+# Una tabla por colección; las columnas salen de los campos del modelo
+TABLES = dict(MODELS, admin_status_archive=AdminStatus)
+
+PASSWORD_ITERATIONS = 200_000
+
+
+def _columns(model: type) -> List[str]:
+    return [field.name for field in fields(model) if field.name != "id"]
+
+
+def _sql_type(field) -> str:
+    if field.type in (int, bool):
+        return "INTEGER"
+    return "TEXT"  # Textos y listas (JSON)
+
+
+class LocalDatabase:
+    """
+    Conexión SQLite compartida por todas las sesiones del proceso (una por fichero)
+    - WAL: lecturas concurrentes mientras se escribe
+    - Índices en los mismos campos que .indexOn de RTDB (QUERY_INDEXES)
+    - Notifica en proceso los cambios a los suscriptores (equivalente al stream de RTDB)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        self._subscribers: Dict[str, List] = {}
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema()
+
+    def _create_schema(self):
+        for table, model in TABLES.items():
+            columns = ", ".join(
+                f"{field.name} {_sql_type(field)}" for field in fields(model) if field.name != "id"
+            )
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, {columns})")
+            for column in QUERY_INDEXES.get(table, []):
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column}, id)"
+                )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                email TEXT PRIMARY KEY,
+                salt BLOB NOT NULL,
+                password_hash BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    # ==================== USUARIOS ====================
+
+    def create_user(self, email: str, password: str):
+        """Crear o reemplazar un usuario local (contraseña con PBKDF2-SHA256)"""
+        salt = secrets.token_bytes(16)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users (email, salt, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                (email.lower(), salt, _hash_password(password, salt), time.time())
+            )
+
+    def check_user(self, email: str, password: str) -> Optional[bool]:
+        """None si no existe; True/False según la contraseña"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT salt, password_hash FROM users WHERE email = ?", (email.lower(),)
+            ).fetchone()
+        if row is None:
+            return None
+        salt, password_hash = row
+        return hmac.compare_digest(_hash_password(password, salt), password_hash)
+
+    # ==================== SUSCRIPCIONES ====================
+
+    def subscribe(self, collection: str, callback):
+        with self.lock:
+            self._subscribers.setdefault(collection, []).append(callback)
+
+        def unsubscribe():
+            with self.lock:
+                callbacks = self._subscribers.get(collection, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+        return unsubscribe
+
+    def notify(self, collections):
+        for collection in collections:
+            for callback in list(self._subscribers.get(collection, [])):
+                try:
+                    callback(collection)
+                except Exception as e:
+                    print(f"Error notificando cambios de {collection}: {e}")
+
+
+_databases: Dict[str, LocalDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path: str = SQLITE_PATH) -> LocalDatabase:
+    """Base de datos local compartida por las sesiones del proceso"""
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = LocalDatabase(path)
+        return _databases[path]
+
+
+class SQLiteBackend(StorageBackend):
+    """Backend de almacenamiento local (STORAGE_BACKEND=sqlite)"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        super().__init__()
+        self.db = get_database(path)
+
+    # ==================== SESIÓN ====================
+
+    def login(self, email: str, password: str) -> tuple[bool, str]:
+        """
+        Autenticar contra los usuarios locales (ver tools/local_users.py)
+        Returns: (success: bool, message: str)
+        """
+        valid = self.db.check_user(email, password)
+        if valid is None:
+            return False, "Email no registrado"
+        if not valid:
+            return False, "Contraseña incorrecta"
+        self.user_email = email.split('@')[0]  # Username sin dominio
+        write_queue.queue.start()  # Reenviar escrituras que quedaron en el diario
+        return True, "Login exitoso"
+
+    def logout(self):
+        """Cerrar sesión y marcar el admin como inactivo"""
+        if self.user_email:
+            self.apply_updates({
+                f"admin_status/{self.user_email}/active": False,
+                f"admin_status/{self.user_email}/last_heartbeat": int(time.time())
+            })
+        self.user_email = None
+
+    def is_authenticated(self) -> bool:
+        return self.user_email is not None
+
+    def subscribe(self, collection: str, callback) -> Optional[callable]:
+        """Cambios hechos por cualquier sesión de este proceso"""
+        return self.db.subscribe(collection, callback)
+
+    # ==================== ESCRITURAS ====================
+
+    def apply_updates(self, updates: Dict[str, Any], raise_errors: bool = False) -> bool:
+        """Escritura multi-ruta en una transacción, con la misma semántica de rutas que RTDB"""
+        touched = set()
+        try:
+            with self.db.lock:
+                self.db.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for path, value in updates.items():
+                        touched.add(self._write_path(path, value))
+                    self.db.conn.execute("COMMIT")
+                except Exception:
+                    self.db.conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error aplicando lote ({len(updates)} rutas): {e}")
+            return False
+        self.db.notify(touched)
+        return True
+
+    def _write_path(self, path: str, value: Any) -> str:
+        """Aplicar una ruta (con la transacción abierta); devuelve la colección afectada"""
+        parts = [p for p in path.split("/") if p]
+        if not parts or parts[0] not in TABLES:
+            raise ValueError(f"Ruta no soportada en el backend local: {path}")
+        table = parts[0]
+        conn = self.db.conn
+
+        if len(parts) == 1:
+            # Colección completa
+            conn.execute(f"DELETE FROM {table}")
+            for key, raw in (value or {}).items():
+                self._upsert(table, key, raw)
+        elif len(parts) == 2:
+            if isinstance(value, dict):
+                self._upsert(table, parts[1], value)
+            else:
+                conn.execute(f"DELETE FROM {table} WHERE id = ?", (parts[1],))
+        else:
+            # Campo (o subcampo) de un registro: leer, modificar y reescribir
+            current = self._load(table, parts[1])
+            record = current.to_dict() if current is not None else {}
+            set_path(record, parts[2:], value)
+            self._upsert(table, parts[1], record)
+        return table
+
+    def _upsert(self, table: str, key: str, raw: Dict[str, Any]):
+        model = TABLES[table]
+        record = model.from_dict(key, raw)
+        columns = _columns(model)
+        values = [_to_sql(getattr(record, column)) for column in columns]
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        self.db.conn.execute(
+            f"INSERT OR REPLACE INTO {table} (id, {', '.join(columns)}) VALUES ({placeholders})",
+            [key] + values
+        )
+
+    def _load(self, table: str, key: str):
+        rows = self._select(table, "WHERE id = ?", (key,))
+        return rows[0][1] if rows else None
+
+    # ==================== LECTURAS ====================
+
+    def _select(self, table: str, clause: str = "", params: tuple = ()) -> List[Tuple[str, Any]]:
+        """SELECT sobre una colección -> [(key, modelo), ...]"""
+        model = TABLES[table]
+        columns = _columns(model)
+        with self.db.lock:
+            rows = self.db.conn.execute(
+                f"SELECT id, {', '.join(columns)} FROM {table} {clause}", params
+            ).fetchall()
+        decoders = [_from_sql(field) for field in fields(model) if field.name != "id"]
+        return [
+            (row[0], model(row[0], *[decode(value) for decode, value in zip(decoders, row[1:])]))
+            for row in rows
+        ]
+
+    def query_page(self, collection: str, order_by: str, limit: int,
+                   cursor: Optional[tuple] = None, descending: bool = False) -> Tuple[List[tuple], Optional[tuple]]:
+        """Página ordenada por un campo indexado (cursor = (valor, clave) del último registro)"""
+        column = "id" if order_by == "$key" else order_by
+        if collection not in TABLES or column not in ["id"] + _columns(TABLES[collection]):
+            print(f"Consulta no soportada: {collection} por {order_by}")
+            return [], None
+
+        direction = "DESC" if descending else "ASC"
+        clause, params = "", ()
+        if cursor is not None:
+            clause = f"WHERE ({column}, id) {'<' if descending else '>'} (?, ?)"
+            params = (cursor[0], cursor[1])
+        items = self._select(
+            collection, f"{clause} ORDER BY {column} {direction}, id {direction} LIMIT ?", params + (limit + 1,)
+        )
+
+        page = items[:limit]
+        next_cursor = None
+        if len(items) > limit:
+            last_key, last_record = page[-1]
+            next_cursor = (getattr(last_record, column) if column != "id" else last_key, last_key)
+        return page, next_cursor
+
+    def get_generators(self) -> Dict[str, Generator]:
+        """Obtener todos los generadores"""
+        return dict(self._select("generators"))
+
+    def get_tasks(self) -> Dict[str, Task]:
+        """Obtener todas las tareas"""
+        return dict(self._select("tasks"))
+
+    def get_members(self) -> Dict[str, Member]:
+        """Obtener todos los miembros"""
+        return dict(self._select("members"))
+
+    def get_active_admins(self) -> Dict[str, AdminStatus]:
+        """Admins con latido en ADMIN_STATUS_WINDOW, marcados activos/inactivos"""
+        since = int(time.time()) - ADMIN_STATUS_WINDOW
+        return self._mark_activity(dict(self._select("admin_status", "WHERE last_heartbeat >= ?", (since,))))
+
+    # ==================== CRUD ====================
+
+    def add_generator(self, name: str, duration_days: int) -> bool:
+        """Añadir nuevo generador"""
+        return self.apply_updates({f"generators/{self.new_key()}": self.generator_record(name, duration_days)})
+
+    def delete_generator(self, generator_id: str) -> bool:
+        """Eliminar generador"""
+        return self.apply_updates({f"generators/{generator_id}": None})
+
+    def add_task(self, text: str, tag: str) -> bool:
+        """Añadir nueva tarea"""
+        return self.apply_updates({f"tasks/{self.new_key()}": self.task_record(text, tag)})
+
+    def delete_task(self, task_id: str) -> bool:
+        """Eliminar tarea"""
+        return self.apply_updates({f"tasks/{task_id}": None})
+
+    def add_member(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> bool:
+        """Añadir nuevo miembro"""
+        return self.apply_updates({
+            f"members/{self.new_key()}": self.member_record(name, discord, vouch, trust, roles)
+        })
+
+    def delete_member(self, member_id: str) -> bool:
+        """Eliminar miembro"""
+        return self.apply_updates({f"members/{member_id}": None})
+
+    def update_member(self, member_id: str, data: Dict[str, Any]) -> bool:
+        """Actualizar datos de miembro"""
+        return self.apply_updates({f"members/{member_id}/{field}": value for field, value in data.items()})
+
+    def update_heartbeat(self, roles: list) -> bool:
+        """Actualizar heartbeat del admin actual"""
+        return self.apply_updates({f"admin_status/{self.user_email}": {
+            "username": self.user_email,
+            "last_heartbeat": int(time.time()),
+            "active": True,
+            "roles": roles
+        }})
+
+    def compact_admin_status(self, retention: int, archive: bool = True) -> int:
+        """Mover (o borrar) los registros de admin_status sin latido en `retention` segundos"""
+        cutoff = int(time.time()) - retention
+        columns = ", ".join(["id"] + _columns(AdminStatus))
+        with self.db.lock:
+            self.db.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if archive:
+                    self.db.conn.execute(
+                        f"INSERT OR REPLACE INTO admin_status_archive ({columns}) "
+                        f"SELECT {columns} FROM admin_status WHERE last_heartbeat <= ?", (cutoff,)
+                    )
+                removed = self.db.conn.execute(
+                    "DELETE FROM admin_status WHERE last_heartbeat <= ?", (cutoff,)
+                ).rowcount
+                self.db.conn.execute("COMMIT")
+            except Exception as e:
+                self.db.conn.execute("ROLLBACK")
+                print(f"Error compactando admin_status: {e}")
+                return 0
+        if removed:
+            self.db.notify(["admin_status"])
+        return removed
+
+
+def _hash_password(password: str, salt: bytes) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PASSWORD_ITERATIONS)
+
+
+def _to_sql(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return json.dumps(list(value))
+    return value
+
+
+def _from_sql(field):
+    """Conversión de columna -> valor del modelo"""
+    if field.type is bool:
+        return bool
+    if field.type in (int, str):
+        return lambda value: value
+    return lambda value: tuple(json.loads(value)) if value else ()
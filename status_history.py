@@ -0,0 +1,221 @@
+# status_history.py
+# Historial en memoria del estado del servidor: buffers circulares de tamaño fijo con reducción por minuto, hora y día
+
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from config import (
+    ARK_SERVER_IDS,
+    STATUS_HISTORY_RAW,
+    STATUS_HISTORY_MINUTES,
+    STATUS_HISTORY_HOURS,
+    STATUS_HISTORY_DAYS
+)
+
+
+@dataclass(slots=True, frozen=True)
+class StatusPoint:
+    """Una muestra (count=1) o un intervalo agregado de muestras"""
+    ts: int  # Inicio del intervalo (o instante de la muestra)
+    count: int
+    players_avg: float
+    players_min: int
+    players_max: int
+    ping_avg: float
+    online_ratio: float
+
+
+# Columnas de cada buffer: ts, muestras, suma/mín/máx de jugadores, suma de ping y muestras online
+_COLUMNS = (("ts", "q"), ("count", "l"), ("players_sum", "q"), ("players_min", "l"),
+            ("players_max", "l"), ("ping_sum", "d"), ("online", "l"))
+
+
+class _Ring:
+    """Columnas de capacidad fija sobre array (al llenarse se sobrescribe la fila más antigua)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = [array(code, [0]) * capacity for _, code in _COLUMNS]
+        self.start = 0  # Posición física de la fila más antigua
+        self.size = 0
+
+    def append(self, row: list):
+        if self.size < self.capacity:
+            position = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            position = self.start
+            self.start = (self.start + 1) % self.capacity
+        for column, value in zip(self.columns, row):
+            column[position] = value
+
+    def ts(self, i: int) -> int:
+        return self.columns[0][(self.start + i) % self.capacity]
+
+    def row(self, i: int) -> list:
+        position = (self.start + i) % self.capacity
+        return [column[position] for column in self.columns]
+
+    def first_at_or_after(self, ts: int) -> int:
+        """Índice lógico de la primera fila con ts >= ts (las filas están ordenadas por tiempo)"""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class _Tier:
+    """Nivel de resolución: filas de `width` segundos (0 = muestras sin agregar)"""
+
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.ring = _Ring(capacity)
+        self.open: Optional[list] = None  # Intervalo en curso (aún no guardado en el buffer)
+
+    def add(self, ts: int, players: int, ping: float, online: bool):
+        if self.width == 0:
+            self.ring.append([ts, 1, players, players, players, ping, int(online)])
+            return
+
+        start = ts - ts % self.width
+        if self.open is not None and self.open[0] != start:
+            self.ring.append(self.open)
+            self.open = None
+        if self.open is None:
+            self.open = [start, 0, 0, players, players, 0.0, 0]
+        row = self.open
+        row[1] += 1
+        row[2] += players
+        row[3] = min(row[3], players)
+        row[4] = max(row[4], players)
+        row[5] += ping
+        row[6] += int(online)
+
+    def oldest(self) -> Optional[int]:
+        if self.ring.size:
+            return self.ring.ts(0)
+        return self.open[0] if self.open else None
+
+    def rows(self, start: int, end: int) -> List[list]:
+        """Filas con ts en [start, end), incluido el intervalo en curso"""
+        ring = self.ring
+        first = ring.first_at_or_after(start - self.width + 1 if self.width else start)
+        rows = []
+        for i in range(first, ring.size):
+            row = ring.row(i)
+            if row[0] >= end:
+                break
+            rows.append(row)
+        if self.open is not None and self.open[0] < end and self.open[0] + self.width > start:
+            rows.append(list(self.open))
+        return rows
+
+
+class StatusHistory:
+    """
+    Historial de jugadores, ping y online del servidor, compartido por todas las sesiones
+    - Memoria fija: un buffer circular por nivel (muestras, minutos, horas, días)
+    - Se alimenta desde el sondeo compartido (status_poller): mostrarlo no hace más consultas a la API
+    - series() elige el nivel más fino que cubre el rango pedido
+    """
+
+    def __init__(self, raw: int = STATUS_HISTORY_RAW, minutes: int = STATUS_HISTORY_MINUTES,
+                 hours: int = STATUS_HISTORY_HOURS, days: int = STATUS_HISTORY_DAYS):
+        self.tiers = [
+            _Tier(0, raw),
+            _Tier(60, minutes),
+            _Tier(3600, hours),
+            _Tier(86400, days),
+        ]
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def add(self, data: Dict[str, Any], ts: Optional[int] = None):
+        """Registrar un estado de ARKStatusAPI (dict de _parse_server_data)"""
+        ts = int(ts if ts is not None else time.time())
+        players = int(data.get("players") or 0)
+        ping = float(data.get("ping") or 0)
+        online = bool(data.get("online"))
+        with self._lock:
+            # Las muestras deben llegar en orden: los buffers se consultan con búsqueda binaria
+            last = self.tiers[0].ring
+            if last.size and ts < last.ts(last.size - 1):
+                return
+            for tier in self.tiers:
+                tier.add(ts, players, ping, online)
+            self.samples += 1
+
+    # ==================== CONSULTAS ====================
+
+    def series(self, start: int, end: Optional[int] = None) -> List[StatusPoint]:
+        """Puntos en [start, end) con la mejor resolución disponible para ese rango"""
+        end = int(end if end is not None else time.time()) + 1
+        with self._lock:
+            tier = self._tier_for(start)
+            rows = tier.rows(start, end)
+        return [_to_point(row) for row in rows]
+
+    def aggregate(self, start: int, end: Optional[int] = None) -> Dict[str, Any]:
+        """Resumen del rango: muestras, jugadores mín/máx/media, ping medio y fracción online"""
+        points = self.series(start, end)
+        count = sum(p.count for p in points)
+        if not count:
+            return {"samples": 0, "players_min": None, "players_max": None,
+                    "players_avg": None, "ping_avg": None, "online_ratio": None}
+        return {
+            "samples": count,
+            "players_min": min(p.players_min for p in points),
+            "players_max": max(p.players_max for p in points),
+            "players_avg": sum(p.players_avg * p.count for p in points) / count,
+            "ping_avg": sum(p.ping_avg * p.count for p in points) / count,
+            "online_ratio": sum(p.online_ratio * p.count for p in points) / count
+        }
+
+    def sparkline(self, window: int, slots: int, now: Optional[int] = None) -> List[Optional[float]]:
+        """Media de jugadores en `slots` tramos iguales de los últimos `window` segundos (None = sin datos)"""
+        now = int(now if now is not None else time.time())
+        start = now - window
+        sums = [0.0] * slots
+        counts = [0] * slots
+        for point in self.series(start, now):
+            slot = min(slots - 1, max(0, (point.ts - start) * slots // window))
+            sums[slot] += point.players_avg * point.count
+            counts[slot] += point.count
+        return [sums[i] / counts[i] if counts[i] else None for i in range(slots)]
+
+    def _tier_for(self, start: int) -> _Tier:
+        for tier in self.tiers:
+            oldest = tier.oldest()
+            if oldest is not None and oldest <= start:
+                return tier
+        # Ningún nivel llega tan atrás: el más largo es el que más cubre
+        for tier in reversed(self.tiers):
+            if tier.oldest() is not None:
+                return tier
+        return self.tiers[0]
+
+
+def _to_point(row: list) -> StatusPoint:
+    ts, count, players_sum, players_min, players_max, ping_sum, online = row
+    return StatusPoint(ts, count, players_sum / count, players_min, players_max,
+                       ping_sum / count, online / count)
+
+
+# Un historial por servidor, compartido por todo el proceso
+_histories: Dict[str, StatusHistory] = {}
+_histories_lock = threading.Lock()
+
+
+def get(server_id: str = ARK_SERVER_IDS[0]) -> StatusHistory:
+    """Historial de un servidor (se crea al pedirlo por primera vez)"""
+    with _histories_lock:
+        history = _histories.get(server_id)
+        if history is None:
+            history = _histories[server_id] = StatusHistory()
+        return history
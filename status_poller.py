@@ -0,0 +1,376 @@
+# status_poller.py
+# Consulta del estado del servidor ARK compartida por todas las sesiones del proceso
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import status_history
+import status_store
+from config import (
+    ARK_SERVER_IDS,
+    STATUS_SOURCE,
+    STATUS_CACHE_PATH,
+    SERVER_UPDATE_INTERVAL,
+    SERVER_REFRESH_MIN_AGE,
+    SERVER_POLL_FAST_INTERVAL,
+    SERVER_POLL_FAST_COUNT,
+    SERVER_POLL_SLOW_AFTER,
+    SERVER_POLL_MAX_INTERVAL,
+    SERVER_POLL_BACKOFF_MAX
+)
+
+
+class PollSchedule:
+    """
+    Intervalo adaptativo entre consultas
+    - normal: SERVER_UPDATE_INTERVAL
+    - fast: unas pocas consultas a SERVER_POLL_FAST_INTERVAL tras pasar a online/offline o cambiar de mapa
+    - slow: tras SERVER_POLL_SLOW_AFTER respuestas idénticas el intervalo crece x1.5 hasta SERVER_POLL_MAX_INTERVAL
+    - backoff: errores seguidos duplican la espera (con jitter) hasta SERVER_POLL_BACKOFF_MAX;
+      un 429 espera al menos lo que pida Retry-After
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.base = SERVER_UPDATE_INTERVAL / 1000
+        self.random = rng or random.Random()
+        self.mode = "normal"
+        self.interval = self.base  # Segundos hasta la siguiente consulta
+        self.failures = 0
+        self.retry_after: Optional[float] = None
+        self.fast_left = 0
+        self.unchanged = 0
+        self._state = None  # (online, map) de la última respuesta
+        self._fingerprint = None  # Campos visibles de la última respuesta
+
+    def on_success(self, data: Dict[str, Any]) -> float:
+        """Respuesta válida: devuelve los segundos hasta la siguiente consulta"""
+        self.failures = 0
+        self.retry_after = None
+
+        state = (data.get("online"), data.get("map"))
+        fingerprint = state + (data.get("players"), data.get("max_players"), data.get("version"))
+        if self._state is not None and state != self._state:
+            self.fast_left = SERVER_POLL_FAST_COUNT
+        if fingerprint == self._fingerprint:
+            self.unchanged += 1
+        else:
+            self.unchanged = 0
+        self._state = state
+        self._fingerprint = fingerprint
+
+        if self.fast_left > 0:
+            self.fast_left -= 1
+            self.mode = "fast"
+            self.interval = min(self.base, SERVER_POLL_FAST_INTERVAL / 1000)
+        elif self.unchanged >= SERVER_POLL_SLOW_AFTER:
+            self.mode = "slow"
+            steps = self.unchanged - SERVER_POLL_SLOW_AFTER + 1
+            self.interval = min(SERVER_POLL_MAX_INTERVAL / 1000, self.base * 1.5 ** steps)
+        else:
+            self.mode = "normal"
+            self.interval = self.base
+        return self.interval
+
+    def on_failure(self, retry_after: Optional[float] = None) -> float:
+        """Error, timeout o límite de peticiones: devuelve los segundos hasta el reintento"""
+        self.failures += 1
+        self.retry_after = retry_after
+        self.mode = "backoff"
+        # Nunca antes del intervalo normal: base, 2x base, 4x base... más un jitter de hasta otro
+        # tanto para que varios procesos no reintenten a la vez
+        wait = self.base * 2 ** (self.failures - 1)
+        delay = min(SERVER_POLL_BACKOFF_MAX / 1000, wait + self.random.uniform(0, wait))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        self.interval = delay
+        return delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "interval": self.interval,
+            "failures": self.failures,
+            "retry_after": self.retry_after,
+            "unchanged": self.unchanged
+        }
+
+
+class StatusSubscription:
+    """Sesión de Flet suscrita al estado de los servidores"""
+
+    def __init__(self, poller: "StatusPoller", on_status: Callable[[Dict[str, Dict[str, Any]]], None]):
+        self.poller = poller
+        self.on_status = on_status
+        self.watching = False
+
+    def set_watching(self, watching: bool):
+        """La sesión muestra (o deja de mostrar) la sección del servidor"""
+        self.watching = watching
+        if watching:
+            self.poller.deliver_cached(self)
+            self.poller.refresh()
+
+    def refresh(self):
+        """Refresco manual (no consulta la API si el último dato es reciente)"""
+        self.poller.refresh()
+
+    def unsubscribe(self):
+        self.poller.unsubscribe(self)
+
+
+class ServerState:
+    """Estado del sondeo de un servidor: último dato, calendario adaptativo y consulta en curso"""
+
+    def __init__(self, server_id: str):
+        self.server_id = server_id
+        self.schedule = PollSchedule()
+        self.next_poll = 0.0  # Monotónico: cuándo toca la siguiente consulta
+        self.last_fetch = 0.0  # Monotónico: fin de la última consulta (con éxito o no)
+        self.last_status: Optional[Dict[str, Any]] = None
+        self.inflight: Optional[asyncio.Future] = None
+        self.history = status_history.get(server_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return dict(
+            self.schedule.snapshot(),
+            age=now - self.last_fetch if self.last_fetch else None,
+            next_poll_in=max(0.0, self.next_poll - now)
+        )
+
+
+class StatusPoller:
+    """
+    Un único sondeo de ARK Status por proceso para todos los servidores de ARK_SERVER_IDS
+    - Consulta mientras alguna sesión esté mirando el servidor, con intervalo adaptativo por servidor (PollSchedule)
+    - Los servidores que tocan a la vez se consultan en paralelo (dentro del presupuesto de peticiones
+      de ARKStatusAPI), así añadir servidores no suma latencia
+    - Single-flight por servidor: las peticiones concurrentes comparten la misma consulta en curso
+    - Guarda el último resultado de cada servidor y reparte el conjunto a todas las sesiones que lo
+      muestran; una sesión que entra en la sección recibe los datos guardados al momento
+    - Los refrescos manuales solo consultan si el dato tiene más de SERVER_REFRESH_MIN_AGE
+      y no se está esperando un reintento tras errores
+    - Stale-while-revalidate: el último estado se guarda en STATUS_CACHE_PATH y se carga al arrancar,
+      así las sesiones lo reciben al instante (con su fetched_at) mientras la primera consulta lo revalida
+    Así las llamadas a la API no dependen del número de sesiones abiertas.
+    """
+
+    def __init__(self, server_ids: Optional[List[str]] = None):
+        self._api = None
+        self.servers: Dict[str, ServerState] = {
+            server_id: ServerState(server_id) for server_id in (server_ids or ARK_SERVER_IDS)
+        }
+        self._subscribers: List[StatusSubscription] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._refresh_requested = False
+        self.fetches = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.cache_path = STATUS_CACHE_PATH
+        self._load_cache()
+
+    @property
+    def api(self):
+        """Fuente del estado según STATUS_SOURCE (ARKStatusAPI o A2SStatusSource, misma interfaz)"""
+        if self._api is None:
+            if STATUS_SOURCE == "a2s":
+                from a2s_query import A2SStatusSource
+                self._api = A2SStatusSource(list(self.servers))
+            else:
+                from ark_api import ARKStatusAPI
+                self._api = ARKStatusAPI(list(self.servers))
+        return self._api
+
+    @property
+    def last_status(self) -> Optional[Dict[str, Any]]:
+        """Último estado del servidor principal (el primero de ARK_SERVER_IDS)"""
+        return next(iter(self.servers.values())).last_status
+
+    def cluster(self) -> Dict[str, Dict[str, Any]]:
+        """{server_id: último estado} de los servidores con algún dato, en el orden configurado"""
+        return {sid: state.last_status for sid, state in self.servers.items() if state.last_status is not None}
+
+    def subscribe(self, on_status: Callable[[Dict[str, Dict[str, Any]]], None]) -> StatusSubscription:
+        """Registrar una sesión; on_status(cluster) recibe {server_id: estado} mientras la sesión mire el servidor"""
+        subscription = StatusSubscription(self, on_status)
+        with self._lock:
+            self._subscribers.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._wake = asyncio.Event()
+                self._thread = threading.Thread(target=self._run_loop, name="status-poller", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def refresh(self):
+        """Pedir una consulta si el dato guardado ya no es reciente (desde cualquier hilo)"""
+        self._refresh_requested = True
+        self.wake()
+
+    def wake(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def deliver_cached(self, subscription: StatusSubscription):
+        """Entregar los últimos estados conocidos sin esperar a la siguiente consulta"""
+        cluster = self.cluster()
+        if cluster:
+            self._notify(subscription, cluster)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "watching": sum(1 for s in subscribers if s.watching),
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "servers": {sid: state.snapshot() for sid, state in self.servers.items()},
+            "api": self.api.stats()
+        }
+
+    # ==================== CICLO ====================
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._run())
+
+    def _watching(self) -> List[StatusSubscription]:
+        with self._lock:
+            return [s for s in self._subscribers if s.watching]
+
+    def _warm_history(self):
+        """Recuperar del disco el último día de muestras (el historial en memoria no sobrevive a un reinicio)"""
+        if status_store.store is None:
+            return
+        for server_id, state in self.servers.items():
+            if state.history.samples:
+                continue
+            try:
+                status_store.store.replay(state.history, int(time.time()) - 86400, server_id)
+            except Exception as e:
+                print(f"Error leyendo historial del servidor {server_id}: {e}")
+
+    async def _run(self):
+        self._warm_history()
+        while True:
+            timeout = None
+            if self._watching():
+                now = time.monotonic()
+                requested, self._refresh_requested = self._refresh_requested, False
+                due = [
+                    state.server_id for state in self.servers.values()
+                    if now >= state.next_poll or (requested and now - state.last_fetch >= SERVER_REFRESH_MIN_AGE
+                                                  and not state.schedule.failures)
+                ]
+                if due:
+                    await self.poll(due)
+                timeout = max(0.0, min(s.next_poll for s in self.servers.values()) - time.monotonic())
+            else:
+                self._refresh_requested = False
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def poll(self, server_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Consultar varios servidores en paralelo y repartir el resultado una sola vez"""
+        results = await asyncio.gather(*[self.fetch(server_id) for server_id in server_ids])
+        if any(results):
+            self._save_cache()
+        # También tras un error: las vistas marcan como desactualizado el dato que no se pudo revalidar
+        cluster = self.cluster()
+        if cluster:
+            for subscription in self._watching():
+                self._notify(subscription, cluster)
+        return dict(zip(server_ids, results))
+
+    async def fetch(self, server_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Consultar un servidor ahora (en el loop del poller); las llamadas concurrentes comparten la consulta"""
+        state = self.servers[server_id] if server_id else next(iter(self.servers.values()))
+        if state.inflight is None or state.inflight.done():
+            state.inflight = asyncio.ensure_future(self._fetch_once(state))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(state.inflight)
+
+    async def _fetch_once(self, state: ServerState) -> Optional[Dict[str, Any]]:
+        try:
+            data = await self.api.get_server_status_async(state.server_id)
+        except Exception as e:
+            print(f"Error consultando estado del servidor {state.server_id}: {e}")
+            data = None
+        self.fetches += 1
+        state.last_fetch = time.monotonic()
+
+        if not data:
+            self.errors += 1
+            # retry_after solo viene informado en respuestas 429/503 con cabecera Retry-After
+            state.next_poll = state.last_fetch + state.schedule.on_failure(self.api.retry_after.get(state.server_id))
+            return None
+
+        state.next_poll = state.last_fetch + state.schedule.on_success(data)
+        data = dict(data, fetched_at=time.time())
+        state.last_status = data
+        state.history.add(data)
+        if status_store.store is not None:
+            try:
+                status_store.store.append(data, server_id=state.server_id)
+            except OSError as e:
+                print(f"Error guardando historial del servidor: {e}")
+        return data
+
+    # ==================== CACHÉ EN DISCO ====================
+
+    def _load_cache(self):
+        """Cargar el último estado guardado de cada servidor (antes de la primera consulta)"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo caché de estado del servidor: {e}")
+            return
+        for server_id, state in self.servers.items():
+            data = cached.get(server_id)
+            if isinstance(data, dict) and data.get("fetched_at"):
+                state.last_status = data
+
+    def _save_cache(self):
+        """Guardar el último estado de los servidores (escritura atómica: fichero temporal + replace)"""
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.cluster(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error guardando caché de estado del servidor: {e}")
+
+    def _notify(self, subscription: StatusSubscription, cluster: Dict[str, Dict[str, Any]]):
+        try:
+            subscription.on_status(cluster)
+        except Exception as e:
+            print(f"Error actualizando estado del servidor en una sesión: {e}")
+
+
+# Instancia única por proceso
+poller = StatusPoller()
@@ -0,0 +1,223 @@
+# status_store.py
+# Historial persistente del estado del servidor: segmentos binarios de ancho fijo, solo anexado y leídos con mmap
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import STATUS_STORE, STATUS_STORE_DIR, ARK_SERVER_IDS
+
+# Registro de 12 bytes: ts (uint32), jugadores, máximo de jugadores, ping (ms), online y relleno
+RECORD = struct.Struct("<IHHHBx")
+
+
+class StatusStore:
+    """
+    Muestras de ARK Status en disco, un segmento por servidor y mes: <dir>/<servidor>/AAAA-MM.bin
+    - Solo anexado: cada muestra es un único write() de RECORD.size bytes (O_APPEND)
+    - Los registros de un segmento están ordenados por ts, así un rango se localiza con búsqueda
+      binaria sobre el fichero mapeado en memoria; nunca se carga el historial completo
+    - Un registro a medias (corte durante la escritura) se descarta al volver a abrir el segmento
+    Meses de muestras cada 50 s ocupan ~0,6 MB por servidor y mes.
+    """
+
+    def __init__(self, root: str = STATUS_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._fds: Dict[Tuple[str, str], int] = {}  # (servidor, mes) -> descriptor abierto para anexar
+        self._last_ts: Dict[str, int] = {}
+        self.appended = 0
+
+    # ==================== ESCRITURA ====================
+
+    def append(self, data: Dict[str, Any], ts: Optional[int] = None, server_id: str = ARK_SERVER_IDS[0]) -> bool:
+        """Anexar un estado de ARKStatusAPI; False si la muestra es anterior a la última guardada"""
+        ts = int(ts if ts is not None else time.time())
+        record = RECORD.pack(
+            ts,
+            _clamp(data.get("players")),
+            _clamp(data.get("max_players")),
+            _clamp(data.get("ping")),
+            1 if data.get("online") else 0
+        )
+        month = _month(ts)
+        with self._lock:
+            last = self._last_ts.get(server_id)
+            if last is None:
+                last = self._read_last_ts(server_id)
+            if last is not None and ts < last:
+                return False
+            os.write(self._fd(server_id, month), record)
+            self._last_ts[server_id] = ts
+            self.appended += 1
+        return True
+
+    def _fd(self, server_id: str, month: str) -> int:
+        key = (server_id, month)
+        fd = self._fds.get(key)
+        if fd is None:
+            # Mes nuevo: cerrar los segmentos anteriores de ese servidor
+            for old in [k for k in self._fds if k[0] == server_id]:
+                os.close(self._fds.pop(old))
+            path = self._segment_path(server_id, month)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            size = os.fstat(fd).st_size
+            if size % RECORD.size:
+                os.ftruncate(fd, size - size % RECORD.size)
+            self._fds[key] = fd
+        return fd
+
+    def _read_last_ts(self, server_id: str) -> Optional[int]:
+        for segment in reversed(self._segments(server_id)):
+            with _Segment(segment) as records:
+                if len(records):
+                    return records.ts(len(records) - 1)
+        return None
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+    # ==================== LECTURA ====================
+
+    def scan(self, start: int, end: int, server_id: str = ARK_SERVER_IDS[0]) -> Iterator[Tuple[int, int, int, int, int]]:
+        """Registros (ts, jugadores, máximo, ping, online) con ts en [start, end), en orden"""
+        first_month, last_month = _month(start), _month(max(start, end - 1))
+        for path in self._segments(server_id):
+            month = os.path.basename(path)[:-4]
+            if month < first_month or month > last_month:
+                continue
+            with _Segment(path) as records:
+                lo = records.first_at_or_after(start)
+                hi = records.first_at_or_after(end)
+                if lo < hi:
+                    yield from records.iter(lo, hi)
+
+    def rollup(self, start: int, end: int, bucket: int, server_id: str = ARK_SERVER_IDS[0]) -> List[Dict[str, Any]]:
+        """Agregados por intervalos de `bucket` segundos: muestras, media y máximo de jugadores, fracción online"""
+        buckets: Dict[int, list] = {}
+        for ts, players, _, _, online in self.scan(start, end, server_id):
+            key = ts - ts % bucket
+            row = buckets.get(key)
+            if row is None:
+                row = buckets[key] = [0, 0, 0, 0]
+            row[0] += 1
+            row[1] += players
+            row[2] = max(row[2], players)
+            row[3] += online
+        return [
+            {"ts": key, "samples": n, "players_avg": total / n, "players_max": peak, "online_ratio": up / n}
+            for key, (n, total, peak, up) in sorted(buckets.items())
+        ]
+
+    def peak_hours(self, days: int = 7, now: Optional[int] = None,
+                   server_id: str = ARK_SERVER_IDS[0]) -> List[Optional[float]]:
+        """Media de jugadores por hora del día (hora local) en los últimos `days` días; None = sin datos"""
+        now = int(now if now is not None else time.time())
+        sums = [0] * 24
+        counts = [0] * 24
+        offset = _utc_offset(now)
+        for ts, players, _, _, online in self.scan(now - days * 86400, now + 1, server_id):
+            if not online:
+                continue
+            hour = (ts + offset) // 3600 % 24
+            sums[hour] += players
+            counts[hour] += 1
+        return [sums[h] / counts[h] if counts[h] else None for h in range(24)]
+
+    def replay(self, target, since: int, server_id: str = ARK_SERVER_IDS[0]) -> int:
+        """Volcar en un StatusHistory las muestras desde `since` (para no empezar vacío tras reiniciar)"""
+        count = 0
+        for ts, players, max_players, ping, online in self.scan(since, int(time.time()) + 1, server_id):
+            target.add({"players": players, "max_players": max_players, "ping": ping, "online": bool(online)}, ts)
+            count += 1
+        return count
+
+    def _segments(self, server_id: str) -> List[str]:
+        directory = os.path.join(self.root, _dirname(server_id))
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".bin")]
+
+    def _segment_path(self, server_id: str, month: str) -> str:
+        return os.path.join(self.root, _dirname(server_id), f"{month}.bin")
+
+
+class _Segment:
+    """Segmento mapeado en memoria (solo lectura) con acceso por índice de registro"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.count = 0
+
+    def __enter__(self) -> "_Segment":
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.count = size // RECORD.size
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), self.count * RECORD.size, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def ts(self, i: int) -> int:
+        return struct.unpack_from("<I", self._map, i * RECORD.size)[0]
+
+    def first_at_or_after(self, ts: int) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter(self, lo: int, hi: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        view = memoryview(self._map)[lo * RECORD.size:hi * RECORD.size]
+        records = RECORD.iter_unpack(view)
+        try:
+            yield from records
+        finally:
+            # Soltar el buffer antes de cerrar el mmap (si no, close() falla por punteros exportados)
+            del records
+            view.release()
+
+
+def _clamp(value: Any) -> int:
+    """Campos uint16: valores ausentes o fuera de rango se recortan"""
+    try:
+        return max(0, min(0xFFFF, int(value or 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _dirname(server_id: str) -> str:
+    """Directorio del servidor: los ids host:puerto de A2S no son nombres válidos en Windows"""
+    return server_id.replace(":", "_")
+
+
+def _month(ts: int) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+
+def _utc_offset(ts: int) -> int:
+    """Segundos de diferencia de la hora local del proceso con UTC"""
+    return time.localtime(ts).tm_gmtoff or 0
+
+
+# Instancia única por proceso (None si STATUS_STORE=0)
+store = StatusStore() if STATUS_STORE else None
@@ -0,0 +1,448 @@
+# storage.py
+# Interfaz común de los backends de almacenamiento (Firebase, SQLite) y utilidades compartidas
+
+import asyncio
+import functools
+import random
+import time
+import weakref
+import write_queue
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Optional, Dict, Any, List, Tuple
+from config import FIREBASE_MAX_CONCURRENCY, ADMIN_TIMEOUT, STORAGE_BACKEND
+from models import MODELS, Generator, Task, Member, AdminStatus, decode, with_field
+
+
+# Hilos para la API async: limita las llamadas bloqueantes simultáneas de todas las sesiones
+_executor = ThreadPoolExecutor(max_workers=FIREBASE_MAX_CONCURRENCY, thread_name_prefix="storage")
+_sessions = weakref.WeakSet()  # Backends (sesiones) vivos en este proceso
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def create_backend(kind: Optional[str] = None) -> "StorageBackend":
+    """Crear la sesión de almacenamiento configurada (STORAGE_BACKEND)"""
+    kind = (kind or STORAGE_BACKEND).lower()
+    if kind == "firebase":
+        from firebase_manager import FirebaseManager
+        return FirebaseManager()
+    if kind == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    raise ValueError(f"STORAGE_BACKEND desconocido: {kind}")
+
+
+def any_session(kind: type = None) -> Optional["StorageBackend"]:
+    """Cualquier sesión autenticada del proceso (opcionalmente de un tipo de backend)"""
+    for session in list(_sessions):
+        if (kind is None or isinstance(session, kind)) and session.is_authenticated():
+            return session
+    return None
+
+
+def push_key() -> str:
+    """Clave con el formato de los push IDs de RTDB: 8 caracteres de tiempo + 12 aleatorios"""
+    now = int(time.time() * 1000)
+    stamp = []
+    for _ in range(8):
+        stamp.append(PUSH_CHARS[now % 64])
+        now //= 64
+    return "".join(reversed(stamp)) + "".join(random.choice(PUSH_CHARS) for _ in range(12))
+
+
+# Las escrituras restauradas del diario se envían con cualquier sesión autenticada
+write_queue.queue.set_manager_provider(any_session)
+
+
+# ==================== ESCRITURAS POR LOTES ====================
+
+class WriteBatch:
+    """
+    Acumula altas, cambios y bajas para aplicarlas en una sola operación (PATCH multi-ruta en Firebase)
+    Uso:
+        batch = storage.batch()
+        batch.delete("generators/<id>")
+        batch.add("members", {...})
+        batch.commit()
+    """
+    
+    def __init__(self, manager: "StorageBackend"):
+        self.manager = manager
+        self.updates: Dict[str, Any] = {}
+    
+    def __len__(self) -> int:
+        return len(self.updates)
+    
+    def add(self, collection: str, data: Dict[str, Any]) -> str:
+        """Alta con clave push generada localmente; devuelve la clave"""
+        key = self.manager.new_key()
+        self._put(f"{collection}/{key}", data)
+        return key
+    
+    def set(self, path: str, data: Any):
+        """Reemplazar el nodo completo"""
+        self._put(path, data)
+    
+    def update(self, path: str, data: Dict[str, Any]):
+        """Actualizar solo los campos indicados"""
+        for field, value in data.items():
+            self._put(f"{path}/{field}", value)
+    
+    def delete(self, path: str):
+        """Eliminar el nodo"""
+        self._put(path, None)
+    
+    def commit(self) -> bool:
+        """Aplicar todas las operaciones en una sola petición"""
+        if not self.updates:
+            return True
+        success = self.manager.apply_updates(self.updates)
+        if success:
+            self.updates = {}
+        return success
+    
+    async def commit_async(self) -> bool:
+        """Versión async de commit"""
+        return await self.manager._run(self.commit)
+    
+    def _put(self, path: str, value: Any):
+        # RTDB rechaza un PATCH que contenga una ruta y una de sus antecesoras
+        path = path.strip("/")
+        for existing in list(self.updates):
+            if existing.startswith(path + "/"):
+                del self.updates[existing]
+        
+        for existing, current in self.updates.items():
+            if path.startswith(existing + "/"):
+                # Fusionar dentro del valor del antecesor
+                node = dict(current) if isinstance(current, dict) else {}
+                self.updates[existing] = node
+                parts = path[len(existing) + 1:].split("/")
+                for part in parts[:-1]:
+                    child = node.get(part)
+                    node[part] = dict(child) if isinstance(child, dict) else {}
+                    node = node[part]
+                if value is None:
+                    node.pop(parts[-1], None)
+                else:
+                    node[parts[-1]] = value
+                return
+        
+        self.updates[path] = value
+
+
+# ==================== CONSULTAS PAGINADAS ====================
+
+# Campos por los que se ordena en el servidor; deben figurar en .indexOn (database.rules.json)
+QUERY_INDEXES = {
+    "generators": ["start_timestamp"],
+    "tasks": ["timestamp"],
+    "members": ["name"],
+    "admin_status": ["last_heartbeat"],
+}
+
+
+def _order_value(key: str, record: Any, order_by: str) -> tuple:
+    """Clave de orden con la misma precedencia que RTDB: null < bool < números < strings < objetos"""
+    value = key if order_by == "$key" else _field(record, order_by)
+    if value is None:
+        return (0, 0, key)
+    if isinstance(value, bool):
+        return (1, value, key)
+    if isinstance(value, (int, float)):
+        return (2, value, key)
+    if isinstance(value, str):
+        return (3, value, key)
+    return (4, 0, key)
+
+
+def _field(record: Any, name: str) -> Any:
+    """Campo de un registro, sea modelo o dict"""
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def _page_records(records: Dict[str, Any], order_by: str, limit: int,
+                  cursor: Optional[tuple], descending: bool) -> Tuple[List[tuple], Optional[tuple]]:
+    """
+    Ordenar, aplicar cursor y recortar una página
+    Returns: ([(key, record), ...], siguiente cursor o None si no hay más)
+    """
+    items = sorted(
+        records.items(),
+        key=lambda item: _order_value(item[0], item[1], order_by),
+        reverse=descending
+    )
+    if cursor is not None:
+        bound = _order_value(cursor[1], {order_by: cursor[0]}, order_by)
+        if descending:
+            items = [item for item in items if _order_value(item[0], item[1], order_by) < bound]
+        else:
+            items = [item for item in items if _order_value(item[0], item[1], order_by) > bound]
+    
+    page = items[:limit]
+    next_cursor = None
+    if len(items) > limit:
+        last_key, last_record = page[-1]
+        last_value = last_key if order_by == "$key" else _field(last_record, order_by)
+        next_cursor = (last_value, last_key)
+    return page, next_cursor
+
+
+# ==================== INTERFAZ ====================
+
+class StorageBackend(ABC):
+    """
+    Operaciones de datos que usan las vistas, la presencia y la cola de escrituras
+    Las subclases implementan autenticación, lecturas y apply_updates; el resto
+    (lotes, escrituras optimistas, registros y API async) es común
+    """
+    
+    def __init__(self):
+        self.user_email = None
+        _sessions.add(self)
+    
+    # ==================== SESIÓN ====================
+    
+    @abstractmethod
+    def login(self, email: str, password: str) -> tuple[bool, str]:
+        """Returns: (success: bool, message: str)"""
+    
+    @abstractmethod
+    def logout(self):
+        ...
+    
+    @abstractmethod
+    def is_authenticated(self) -> bool:
+        ...
+    
+    def subscribe(self, collection: str, callback) -> Optional[callable]:
+        """callback(collection) ante cambios; Returns: función para desuscribirse o None"""
+        return None
+    
+    # ==================== ESCRITURAS ====================
+    
+    def new_key(self) -> str:
+        """Clave generada localmente (permite pintar el registro antes de guardarlo)"""
+        return push_key()
+    
+    @abstractmethod
+    def apply_updates(self, updates: Dict[str, Any], raise_errors: bool = False) -> bool:
+        """Escritura multi-ruta atómica: {"ruta/a/nodo": valor, "otra/ruta": None, ...}"""
+    
+    def batch(self) -> WriteBatch:
+        """Crear un lote de escrituras (una única operación al confirmar)"""
+        return WriteBatch(self)
+    
+    # ==================== ESCRITURAS OPTIMISTAS ====================
+    
+    def enqueue_set(self, path: str, value: Any, on_error=None):
+        """Guardar en segundo plano (value=None elimina); on_error(mensaje) si se descarta"""
+        write_queue.queue.enqueue(self, path, value, on_error)
+    
+    def enqueue_update(self, path: str, data: Dict[str, Any], on_error=None):
+        """Actualizar campos en segundo plano (cada campo se coalesce por separado)"""
+        for field, value in data.items():
+            write_queue.queue.enqueue(self, f"{path}/{field}", value, on_error)
+    
+    def overlay_pending(self, collection: str, items: List[tuple]) -> List[tuple]:
+        """
+        Aplicar escrituras aún no confirmadas sobre registros leídos del servidor
+        Returns: [(key, record), ...] sin los borrados pendientes y con las altas/cambios locales
+        """
+        pending = write_queue.queue.pending(collection)
+        if not pending:
+            return items
+        
+        model = MODELS.get(collection)
+        records = dict(items)
+        for path, value in pending.items():
+            key, _, field = path.partition("/")
+            if not field:
+                record = decode(model, key, value) if model else value
+                if record is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = record
+            elif key in records:
+                records[key] = with_field(records[key], field, value)
+        return list(records.items())
+    
+    # ==================== REGISTROS ====================
+    
+    def generator_record(self, name: str, duration_days: int) -> Dict[str, Any]:
+        """Datos de un generador nuevo"""
+        return {
+            "name": name,
+            "start_timestamp": int(time.time()),
+            "duration_seconds": duration_days * 24 * 60 * 60,
+            "created_by": self.user_email
+        }
+    
+    def task_record(self, text: str, tag: str) -> Dict[str, Any]:
+        """Datos de una tarea nueva"""
+        return {
+            "text": text,
+            "tag": tag,
+            "created_by": self.user_email,
+            "timestamp": int(time.time())
+        }
+    
+    def member_record(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> Dict[str, Any]:
+        """Datos de un miembro nuevo"""
+        return {
+            "name": name,
+            "discord": discord,
+            "vouch": vouch,
+            "trust_level": trust,
+            "roles": roles
+        }
+    
+    # ==================== LECTURAS ====================
+    
+    @abstractmethod
+    def query_page(self, collection: str, order_by: str, limit: int,
+                   cursor: Optional[tuple] = None, descending: bool = False) -> Tuple[List[tuple], Optional[tuple]]:
+        """
+        Página ordenada de una colección
+        cursor: (valor, clave) del último registro de la página anterior
+        Returns: ([(key, record), ...], siguiente cursor o None)
+        """
+    
+    @abstractmethod
+    def get_generators(self) -> Dict[str, Generator]:
+        ...
+    
+    @abstractmethod
+    def get_tasks(self) -> Dict[str, Task]:
+        ...
+    
+    @abstractmethod
+    def get_members(self) -> Dict[str, Member]:
+        ...
+    
+    @abstractmethod
+    def get_active_admins(self) -> Dict[str, AdminStatus]:
+        ...
+    
+    # ==================== CRUD ====================
+    
+    @abstractmethod
+    def add_generator(self, name: str, duration_days: int) -> bool:
+        ...
+    
+    @abstractmethod
+    def delete_generator(self, generator_id: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def add_task(self, text: str, tag: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def delete_task(self, task_id: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def add_member(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> bool:
+        ...
+    
+    @abstractmethod
+    def delete_member(self, member_id: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def update_member(self, member_id: str, data: Dict[str, Any]) -> bool:
+        ...
+    
+    @abstractmethod
+    def update_heartbeat(self, roles: list) -> bool:
+        ...
+    
+    @abstractmethod
+    def compact_admin_status(self, retention: int, archive: bool = True) -> int:
+        """Quitar (y archivar) los registros de admin_status sin latido en `retention` segundos"""
+    
+    def _mark_activity(self, admins: Dict[str, AdminStatus]) -> Dict[str, AdminStatus]:
+        """Copias con `active` según el último latido (los registros de origen pueden ser compartidos)"""
+        current_time = int(time.time())
+        active_admins = {}
+        for admin_id, admin in admins.items():
+            # Cadencia adaptativa: tolerar hasta dos latidos perdidos de la sesión
+            timeout = max(ADMIN_TIMEOUT, 2 * admin.heartbeat_interval)
+            # Marcar como inactivo si pasó el timeout
+            active_admins[admin_id] = replace(admin, active=current_time - admin.last_heartbeat < timeout)
+        return active_admins
+
+    # ==================== API ASYNC ====================
+    # Misma semántica que los métodos síncronos, pero sin bloquear el event loop de Flet.
+    # La concurrencia total del proceso queda acotada por FIREBASE_MAX_CONCURRENCY.
+    
+    async def _run(self, func, *args):
+        """Ejecutar una operación bloqueante en el pool de hilos compartido"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args))
+    
+    async def logout_async(self):
+        """Versión async de logout"""
+        return await self._run(self.logout)
+    
+    async def apply_updates_async(self, updates: Dict[str, Any]) -> bool:
+        """Versión async de apply_updates"""
+        return await self._run(self.apply_updates, updates)
+    
+    async def query_page_async(self, collection: str, order_by: str, limit: int,
+                               cursor: Optional[tuple] = None, descending: bool = False) -> Tuple[List[tuple], Optional[tuple]]:
+        """Versión async de query_page"""
+        return await self._run(self.query_page, collection, order_by, limit, cursor, descending)
+    
+    async def add_generator_async(self, name: str, duration_days: int) -> bool:
+        """Versión async de add_generator"""
+        return await self._run(self.add_generator, name, duration_days)
+    
+    async def get_generators_async(self) -> Dict[str, Generator]:
+        """Versión async de get_generators"""
+        return await self._run(self.get_generators)
+    
+    async def delete_generator_async(self, generator_id: str) -> bool:
+        """Versión async de delete_generator"""
+        return await self._run(self.delete_generator, generator_id)
+    
+    async def add_task_async(self, text: str, tag: str) -> bool:
+        """Versión async de add_task"""
+        return await self._run(self.add_task, text, tag)
+    
+    async def get_tasks_async(self) -> Dict[str, Task]:
+        """Versión async de get_tasks"""
+        return await self._run(self.get_tasks)
+    
+    async def delete_task_async(self, task_id: str) -> bool:
+        """Versión async de delete_task"""
+        return await self._run(self.delete_task, task_id)
+    
+    async def add_member_async(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> bool:
+        """Versión async de add_member"""
+        return await self._run(self.add_member, name, discord, vouch, trust, roles)
+    
+    async def get_members_async(self) -> Dict[str, Member]:
+        """Versión async de get_members"""
+        return await self._run(self.get_members)
+    
+    async def delete_member_async(self, member_id: str) -> bool:
+        """Versión async de delete_member"""
+        return await self._run(self.delete_member, member_id)
+    
+    async def update_member_async(self, member_id: str, data: Dict[str, Any]) -> bool:
+        """Versión async de update_member"""
+        return await self._run(self.update_member, member_id, data)
+    
+    async def update_heartbeat_async(self, roles: list) -> bool:
+        """Versión async de update_heartbeat"""
+        return await self._run(self.update_heartbeat, roles)
+    
+    async def get_active_admins_async(self) -> Dict[str, AdminStatus]:
+        """Versión async de get_active_admins"""
+        return await self._run(self.get_active_admins)
@@ -0,0 +1,2 @@
+# tools/__init__.py
+# Herramientas de diagnóstico y medición (no se usan en la app)
@@ -0,0 +1,503 @@
+# tools/benchmark.py
+# Micro-benchmarks de los caminos calientes de refresco y pintado, con líneas base y umbrales
+#
+# Uso:
+#   python -m tools.benchmark                       (compara con tools/benchmark_baselines.json)
+#   python -m tools.benchmark --filter refresh_tasks
+#   python -m tools.benchmark --update-baselines    (tras un cambio de rendimiento intencionado)
+#
+# Todo corre sin red sobre datos sintéticos deterministas. Cada benchmark informa la mediana
+# del tiempo por llamada. Para comparar, cada muestra se divide por el tiempo de una carga de
+# referencia medida justo después (calibración en la misma ejecución): así una máquina más lenta o
+# cargada en ese momento no cuenta como regresión. El proceso termina con código 1 si la mediana
+# de esa proporción supera la de la línea base en más de la tolerancia del benchmark.
+# Las líneas base dependen de la máquina y del intérprete: se regeneran donde se compara.
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Generator, Member, Task, decode_collection
+from storage import PUSH_CHARS, StorageBackend, _page_records
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+SIZES = [10, 100, 1000, 10000]
+DEFAULT_TOLERANCE = 0.40
+# Con pocos registros el tiempo es de microsegundos y el ruido relativo es mayor
+SMALL_TOLERANCE = 0.75
+
+
+# ==================== DATOS SINTÉTICOS ====================
+
+def synthetic_collections(size: int, seed: int = 1) -> Dict[str, Dict[str, Any]]:
+    """JSON de cada colección tal como lo devuelve RTDB (deterministas para una misma semilla)"""
+    rng = random.Random(seed * 100003 + size)
+    now = int(time.time())
+    tags = ["ADMIN", "builder", "GH", "BR"]
+    trust = ["low", "medium", "high"]
+
+    def key():
+        return "-" + "".join(rng.choice(PUSH_CHARS) for _ in range(19))
+
+    generators = {}
+    for i in range(size):
+        duration = rng.randint(1, 14) * 86400
+        generators[key()] = {
+            "name": f"Generador {i}",
+            "start_timestamp": now - rng.randint(0, duration),
+            "duration_seconds": duration,
+            "created_by": f"admin{i % 7}@tribu.gg"
+        }
+
+    tasks = {}
+    for i in range(size):
+        tasks[key()] = {
+            "text": f"Tarea {i}: farmear metal en la montaña norte",
+            "tag": rng.choice(tags),
+            "created_by": f"admin{i % 7}@tribu.gg",
+            "timestamp": now - rng.randint(0, 30 * 86400)
+        }
+
+    members = {}
+    for i in range(size):
+        members[key()] = {
+            "name": f"Superviviente {rng.randint(0, size * 10):06d}",
+            "discord": f"user{i}#{rng.randint(1000, 9999)}",
+            "vouch": f"admin{i % 7}",
+            "trust_level": rng.choice(trust),
+            "roles": rng.sample(tags, rng.randint(0, 2))
+        }
+
+    admin_status = {}
+    for i in range(size):
+        interval = rng.choice([30, 30, 60, 300])
+        admin_status[f"admin{i}"] = {
+            "username": f"admin{i}@tribu.gg",
+            "last_heartbeat": now - rng.randint(0, 600),
+            "active": True,
+            "roles": rng.sample(tags, rng.randint(0, 3)),
+            "heartbeat_interval": interval
+        }
+
+    return {
+        "generators": generators,
+        "tasks": tasks,
+        "members": members,
+        "admin_status": admin_status
+    }
+
+
+def synthetic_server_payload() -> Dict[str, Any]:
+    """Respuesta de ARK Status para un servidor"""
+    return {
+        "data": {
+            "name": "FOG | PvP x5 | The Island",
+            "map": "TheIsland",
+            "players": 47,
+            "maxPlayers": 70,
+            "ping": 38,
+            "version": "358.24",
+            "online": True,
+            "uptime": 97.3,
+            "peakPlayers": 68,
+            "platform": "PC",
+            "lastUpdate": "2026-10-18T12:00:00Z"
+        }
+    }
+
+
+class SyntheticBackend(StorageBackend):
+    """
+    Backend en memoria para los benchmarks
+    - Guarda el JSON crudo y decodifica en cada lectura, como FirebaseManager sin caché
+    - _run ejecuta en línea: se mide la CPU del camino, no el salto al pool de hilos
+    """
+
+    def __init__(self, collections: Dict[str, Dict[str, Any]]):
+        super().__init__()
+        self.collections = collections
+        self.user_email = "bench@tribu.gg"
+
+    async def _run(self, func, *args):
+        return func(*args)
+
+    def is_authenticated(self) -> bool:
+        return True
+
+    def _records(self, collection: str) -> Dict[str, Any]:
+        return decode_collection(collection, self.collections.get(collection))
+
+    def query_page(self, collection: str, order_by: str, limit: int,
+                   cursor: Optional[tuple] = None, descending: bool = False):
+        return _page_records(self._records(collection), order_by, limit, cursor, descending)
+
+    def get_generators(self):
+        return self._records("generators")
+
+    def get_tasks(self):
+        return self._records("tasks")
+
+    def get_members(self):
+        return self._records("members")
+
+    def get_active_admins(self):
+        return self._mark_activity(self._records("admin_status"))
+
+    # Las vistas escriben por la cola o por lotes; los benchmarks no miden escrituras
+    def login(self, email: str, password: str) -> tuple[bool, str]:
+        return True, "Login exitoso"
+
+    def logout(self):
+        pass
+
+    def apply_updates(self, updates: Dict[str, Any], raise_errors: bool = False) -> bool:
+        return True
+
+    def add_generator(self, name: str, duration_days: int) -> bool:
+        return True
+
+    def delete_generator(self, generator_id: str) -> bool:
+        return True
+
+    def add_task(self, text: str, tag: str) -> bool:
+        return True
+
+    def delete_task(self, task_id: str) -> bool:
+        return True
+
+    def add_member(self, name: str, discord: str, vouch: str, trust: str, roles: list) -> bool:
+        return True
+
+    def delete_member(self, member_id: str) -> bool:
+        return True
+
+    def update_member(self, member_id: str, data: Dict[str, Any]) -> bool:
+        return True
+
+    def update_heartbeat(self, roles: list) -> bool:
+        return True
+
+    def compact_admin_status(self, retention: int, archive: bool = True) -> int:
+        return 0
+
+
+class _StubResponse:
+    def __init__(self, status_code: int, etag: str, text: str = ""):
+        self.status_code = status_code
+        self.headers = {"ETag": etag}
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class _StubRTDB:
+    """
+    Sustituto de firebase.requests: responde el GET REST de admin_status como RTDB
+    (orderBy last_heartbeat + startAt, ETag y 304 si no cambió)
+    """
+
+    database_url = "https://bench.invalid"
+
+    def __init__(self, admin_status: Dict[str, Any]):
+        self.admin_status = admin_status
+        self.requests = self
+        self._bodies: Dict[str, str] = {}  # startAt -> JSON filtrado (el filtrado lo hace el servidor)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        start_at = params["startAt"]
+        if start_at not in self._bodies:
+            since = json.loads(start_at)
+            self._bodies[start_at] = json.dumps({
+                key: record for key, record in self.admin_status.items() if record["last_heartbeat"] >= since
+            })
+        etag = f"{len(self.admin_status)}-{start_at}"
+        if (headers or {}).get("if-none-match") == etag:
+            return _StubResponse(304, etag)
+        return _StubResponse(200, etag, self._bodies[start_at])
+
+
+def stubbed_firebase_manager(collections: Dict[str, Dict[str, Any]]):
+    """FirebaseManager real (caché de lectura, consulta por ventana, _mark_activity) sin red"""
+    import firebase_manager
+    from firebase_manager import FirebaseManager
+
+    # TTL 0: cada llamada revalida con el ETag, el caso de un refresco sin cambios tras el TTL
+    if firebase_manager._read_cache.ttl:
+        firebase_manager._read_cache = firebase_manager.ReadCache(0)
+    manager = FirebaseManager.__new__(FirebaseManager)
+    StorageBackend.__init__(manager)
+    manager.firebase = _StubRTDB(collections["admin_status"])
+    manager.auth = None
+    manager.user = None
+    manager.id_token = "bench"
+    manager.user_email = "bench"
+    return manager
+
+
+# ==================== MEDICIÓN ====================
+
+class Benchmark:
+    """Una medición: función sin argumentos (síncrona o corrutina) y su tolerancia"""
+
+    def __init__(self, name: str, func: Callable, is_async: bool = False,
+                 tolerance: float = DEFAULT_TOLERANCE):
+        self.name = name
+        self.func = func
+        self.is_async = is_async
+        self.tolerance = tolerance
+
+
+def _timer(bench: Benchmark, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    """Función que ejecuta n llamadas y devuelve los segundos que tardaron"""
+    func = bench.func
+    if bench.is_async:
+        async def many(n):
+            started = time.perf_counter()
+            for _ in range(n):
+                await func()
+            return time.perf_counter() - started
+        return lambda n: loop.run_until_complete(many(n))
+
+    def many_sync(n):
+        started = time.perf_counter()
+        for _ in range(n):
+            func()
+        return time.perf_counter() - started
+    return many_sync
+
+
+REFERENCE_JSON = json.dumps({
+    f"-ref{i:05d}": {"name": f"Registro {i}", "timestamp": 1_700_000_000 + i, "roles": ["ADMIN", "GH"]}
+    for i in range(200)
+})
+
+
+def reference_workload():
+    """Carga fija de CPU (parseo JSON y dicts, como los caminos medidos) usada como unidad de tiempo"""
+    return json.loads(REFERENCE_JSON)
+
+
+def _loops(run: Callable[[int], float], min_sample: float) -> int:
+    """Llamadas por muestra para que cada muestra dure al menos min_sample"""
+    run(1)  # calentamiento (cachés, imports perezosos)
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= min_sample or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_sample / 10 else 2
+
+
+def measure(bench: Benchmark, loop: asyncio.AbstractEventLoop,
+            repeat: int, min_sample: float) -> Dict[str, float]:
+    """
+    Mediana del tiempo por llamada y de su proporción con la carga de referencia
+    Cada muestra dura al menos min_sample y va seguida de una medición de reference_workload
+    """
+    run = _timer(bench, loop)
+    reference = _timer(Benchmark("referencia", reference_workload), loop)
+    number = _loops(run, min_sample)
+    reference_number = _loops(reference, min_sample / 2)
+
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        samples, ratios = [], []
+        for _ in range(repeat):
+            elapsed = run(number) / number
+            samples.append(elapsed)
+            ratios.append(elapsed / (reference(reference_number) / reference_number))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "us": statistics.median(samples) * 1e6,
+        "min_us": min(samples) * 1e6,
+        "ratio": statistics.median(ratios),
+        "loops": number
+    }
+
+
+# ==================== SUITE ====================
+
+def build_suite(sizes: List[int]) -> List[Benchmark]:
+    """Registrar todos los benchmarks (los datos se generan aquí, fuera del tiempo medido)"""
+    from ark_api import ARKStatusAPI
+    from components.generators_view import GeneratorsView
+    from components.members_view import MembersView
+    from components.sidebar import Sidebar
+    from components.tasks_view import TasksView
+
+    suite = []
+
+    for size in sizes:
+        tolerance = SMALL_TOLERANCE if size <= 10 else DEFAULT_TOLERANCE
+        backend = SyntheticBackend(synthetic_collections(size))
+
+        generators_view = GeneratorsView(backend)
+        tasks_view = TasksView(backend)
+        members_view = MembersView(backend)
+        suite.append(Benchmark(f"refresh_generators[{size}]", generators_view.refresh_generators, True, tolerance))
+        suite.append(Benchmark(f"refresh_tasks[{size}]", tasks_view.refresh_tasks, True, tolerance))
+        suite.append(Benchmark(f"refresh_members[{size}]", members_view.refresh_members, True, tolerance))
+
+        raw_admins = backend.collections["admin_status"]
+        suite.append(Benchmark(
+            f"decode_collection.admin_status[{size}]",
+            lambda raw=raw_admins: decode_collection("admin_status", raw),
+            tolerance=tolerance
+        ))
+        manager = stubbed_firebase_manager(backend.collections)
+        suite.append(Benchmark(f"get_active_admins[{size}]", manager.get_active_admins, tolerance=tolerance))
+
+    # Tarjetas sueltas: coste de construir los controles de un registro
+    collections = synthetic_collections(1)
+    gen_id, gen_raw = next(iter(collections["generators"].items()))
+    task_id, task_raw = next(iter(collections["tasks"].items()))
+    member_id, member_raw = next(iter(collections["members"].items()))
+    generator = Generator.from_dict(gen_id, gen_raw)
+    task = Task.from_dict(task_id, task_raw)
+    member = Member.from_dict(member_id, dict(member_raw, roles=["ADMIN", "builder"]))
+    backend = SyntheticBackend(collections)
+    generators_view = GeneratorsView(backend)
+    tasks_view = TasksView(backend)
+    members_view = MembersView(backend)
+    suite.append(Benchmark("_create_generator_card", lambda: generators_view._create_generator_card(generator)))
+    suite.append(Benchmark("_create_task_card", lambda: tasks_view._create_task_card(task)))
+    suite.append(Benchmark("_create_member_card", lambda: members_view._create_member_card(member)))
+
+    # Barra lateral: el número de admins conectados es pequeño en la práctica
+    for size in (10, 100):
+        admins = SyntheticBackend(synthetic_collections(size)).get_active_admins()
+        sidebar = Sidebar(lambda section: None, lambda roles: None, lambda: None, "bench@tribu.gg")
+        sidebar.build()
+        suite.append(Benchmark(
+            f"Sidebar.update_active_admins[{size}]",
+            lambda sidebar=sidebar, admins=admins: sidebar.update_active_admins(admins),
+            tolerance=SMALL_TOLERANCE if size <= 10 else DEFAULT_TOLERANCE
+        ))
+
+    api = ARKStatusAPI()
+    payload = synthetic_server_payload()
+    suite.append(Benchmark("ARKStatusAPI._parse_server_data", lambda: api._parse_server_data(payload),
+                           tolerance=SMALL_TOLERANCE))
+
+    return suite
+
+
+# ==================== LÍNEAS BASE ====================
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"benchmarks": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(path: str, results: Dict[str, Dict[str, float]], suite: List[Benchmark],
+                   previous: Dict[str, Any]):
+    """Guardar resultados como nuevas líneas base (se conservan las que no se midieron)"""
+    benchmarks = dict(previous.get("benchmarks", {}))
+    tolerances = {bench.name: bench.tolerance for bench in suite}
+    for name, result in results.items():
+        benchmarks[name] = {
+            "us": round(result["us"], 3),
+            "ratio": round(result["ratio"], 4),
+            "tolerance": tolerances[name]
+        }
+    data = {
+        "machine": _machine(),
+        "benchmarks": dict(sorted(benchmarks.items()))
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def _machine() -> str:
+    return f"{platform.python_implementation()} {platform.python_version()} / {platform.machine()}"
+
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Any]) -> List[str]:
+    """Imprimir la tabla y devolver los nombres que empeoraron más de su tolerancia (por proporción)"""
+    recorded = baselines.get("benchmarks", {})
+    regressions = []
+    machine = _machine()
+    if baselines.get("machine") and baselines["machine"] != machine:
+        print(f"Líneas base de otra máquina ({baselines['machine']}, esta es {machine}): "
+              f"regénerelas aquí con --update-baselines antes de comparar\n")
+    print(f"{'benchmark':<42}{'µs/llamada':>14}{'base':>12}{'cambio':>10}")
+    for name, result in results.items():
+        base = recorded.get(name)
+        if not base:
+            print(f"{name:<42}{result['us']:>14.1f}{'-':>12}{'nuevo':>10}")
+            continue
+        change = result["ratio"] / base["ratio"] - 1 if "ratio" in base else result["us"] / base["us"] - 1
+        flag = ""
+        if change > base.get("tolerance", DEFAULT_TOLERANCE):
+            regressions.append(name)
+            flag = "  REGRESIÓN"
+        print(f"{name:<42}{result['us']:>14.1f}{base['us']:>12.1f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de refresco y pintado")
+    parser.add_argument("--filter", default="", help="Solo benchmarks cuyo nombre contenga este texto")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                        help="Tamaños de los datos sintéticos (separados por comas)")
+    parser.add_argument("--repeat", type=int, default=7, help="Muestras por benchmark")
+    parser.add_argument("--min-sample", type=float, default=0.05, help="Duración mínima de cada muestra (s)")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="Guardar los resultados como nuevas líneas base")
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados como JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    suite = [bench for bench in build_suite(sizes) if args.filter in bench.name]
+    if not suite:
+        print("Ningún benchmark coincide con el filtro")
+        sys.exit(2)
+
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for bench in suite:
+            results[bench.name] = measure(bench, loop, args.repeat, args.min_sample)
+    finally:
+        loop.close()
+
+    baselines = load_baselines(args.baselines)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.update_baselines:
+        save_baselines(args.baselines, results, suite, baselines)
+        print(f"Líneas base guardadas en {args.baselines}")
+        return
+
+    regressions = compare(results, baselines)
+    if regressions:
+        print(f"\n{len(regressions)} regresiones: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
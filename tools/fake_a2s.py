@@ -0,0 +1,182 @@
+# tools/fake_a2s.py
+# Servidor UDP local que responde A2S_INFO y A2S_PLAYER como un servidor de ARK
+#
+# Uso:
+#   python -m tools.fake_a2s --port 27015 --players 40
+#   STATUS_SOURCE=a2s ARK_SERVER_IDS=127.0.0.1:27015 python main.py
+#
+# En proceso (pruebas de a2s_query):
+#   server = FakeA2SServer(players=30, split_size=300).start()
+#   A2SStatusSource([server.server_id]) ...
+#   server.stop()
+
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER_SIMPLE = b"\xFF\xFF\xFF\xFF"
+
+
+class FakeA2SServer:
+    """
+    Respuestas A2S de un servidor de ARK en un socket UDP local
+    - challenge: exigir el desafío S2C_CHALLENGE antes de responder (como los servidores actuales)
+    - split_size: fragmentar respuestas mayores que este tamaño (formato Source, sin compresión)
+    - latency / drop_rate: retraso de cada respuesta y fracción de peticiones sin respuesta
+    - online=False deja de responder (servidor caído)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, name: str = "FOG Test Server",
+                 map_name: str = "TheIsland_WP", players: int = 20, max_players: int = 70,
+                 challenge: bool = True, split_size: Optional[int] = None, latency: float = 0.0,
+                 drop_rate: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.map_name = map_name
+        self.players = players
+        self.max_players = max_players
+        self.version = "358.24"
+        self.challenge = challenge
+        self.split_size = split_size
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.online = True
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._token = struct.pack("<l", self.random.randint(1, 2 ** 31 - 1))
+        self._split_id = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._socket.settimeout(0.2)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._socket.getsockname()[:2]
+
+    @property
+    def server_id(self) -> str:
+        """server_id con forma host:puerto (A2SStatusSource lo usa como dirección)"""
+        host, port = self.address
+        return f"{host}:{port}"
+
+    def start(self) -> "FakeA2SServer":
+        self._thread = threading.Thread(target=self._serve, name="fake-a2s", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self._socket.close()
+
+    # ==================== RESPUESTAS ====================
+
+    def info_payload(self) -> bytes:
+        """S2A_INFO con los campos extra (EDF) de puerto, SteamID, keywords y GameID"""
+        edf = 0x80 | 0x10 | 0x20 | 0x01
+        port = self.address[1]
+        return (
+            HEADER_SIMPLE + b"I" + bytes([17])
+            + _string(f"{self.name} - ({self.version})") + _string(self.map_name)
+            + _string("ark_survival_evolved") + _string("ARK: Survival Evolved")
+            + struct.pack("<h", 0)
+            + bytes([min(255, self.players), min(255, self.max_players), 0, ord("d"), ord("l"), 0, 1])
+            + _string("1.0.0.0") + bytes([edf])
+            + struct.pack("<h", port - 65536 if port > 32767 else port)
+            + struct.pack("<Q", 90000000000000000 + port)
+            + _string("OWNINGID:90000000000000000,NUMOPENPUBCONN:50,P2PADDR:0,ISPRIVATE:0")
+            + struct.pack("<Q", 346110)
+        )
+
+    def player_payload(self) -> bytes:
+        players = b"".join(
+            bytes([0]) + _string(f"Superviviente {i}") + struct.pack("<lf", i * 10, 60.0 * (i + 1))
+            for i in range(self.players)
+        )
+        return HEADER_SIMPLE + b"D" + bytes([min(255, self.players)]) + players
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                data, addr = self._socket.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.requests += 1
+            if not self.online or (self.drop_rate and self.random.random() < self.drop_rate):
+                continue
+            for packet in self._respond(data):
+                if self.latency:
+                    time.sleep(self.latency)
+                self._socket.sendto(packet, addr)
+
+    def _respond(self, data: bytes) -> List[bytes]:
+        if not data.startswith(HEADER_SIMPLE) or len(data) < 5:
+            return []
+        kind = data[4:5]
+        if kind == b"T":
+            token = data[len(b"TSource Engine Query\x00") + 4:]
+            if self.challenge and token != self._token:
+                return [HEADER_SIMPLE + b"A" + self._token]
+            return self._split(self.info_payload())
+        if kind == b"U":
+            if data[5:9] != self._token:
+                return [HEADER_SIMPLE + b"A" + self._token]
+            return self._split(self.player_payload())
+        return []
+
+    def _split(self, payload: bytes) -> List[bytes]:
+        """Fragmentar en paquetes de formato Source si supera split_size"""
+        if not self.split_size or len(payload) <= self.split_size:
+            return [payload]
+        self._split_id = (self._split_id + 1) & 0x7FFFFFFF
+        chunks = [payload[i:i + self.split_size] for i in range(0, len(payload), self.split_size)]
+        packets = [
+            struct.pack("<llBBh", -2, self._split_id, len(chunks), number, self.split_size) + chunk
+            for number, chunk in enumerate(chunks)
+        ]
+        # Los fragmentos pueden llegar desordenados
+        self.random.shuffle(packets)
+        return packets
+
+
+def _string(value: str) -> bytes:
+    return value.encode("utf-8") + b"\x00"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor A2S falso para probar STATUS_SOURCE=a2s")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27015)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--max-players", type=int, default=70)
+    parser.add_argument("--map", default="TheIsland_WP")
+    parser.add_argument("--split-size", type=int, default=None, help="Fragmentar respuestas mayores (bytes)")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeA2SServer(args.host, args.port, map_name=args.map, players=args.players,
+                           max_players=args.max_players, split_size=args.split_size,
+                           latency=args.latency, drop_rate=args.drop_rate).start()
+    print(f"A2S falso en {server.server_id} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# tools/fake_services.py
+# Servidor local que imita la API REST de Firebase RTDB y el endpoint de arkstatus.com
+#
+# Uso:
+#   python -m tools.fake_services --port 9000 --latency 0.05 --error-rate 0.02 --records 1000
+#   FIREBASE_DB_URL=http://127.0.0.1:9000 ARKSTATUS_URL=http://127.0.0.1:9000/api/v1/servers python main.py
+#
+# En proceso (benchmarks, pruebas de carga), antes de importar la app:
+#   services = FakeServices(latency=0.02).start()
+#   os.environ.update(services.env())
+#   ...
+#   services.stop()
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# storage (y con él config) se importa al usarse: así se puede arrancar el servidor,
+# exportar env() y solo después importar la app
+
+KEEP_ALIVE_INTERVAL = 30  # Segundos entre keep-alive del stream (igual que RTDB)
+
+
+# ==================== BASE DE DATOS EN MEMORIA ====================
+
+class FakeRTDB:
+    """Árbol JSON en memoria con la semántica de rutas de RTDB y oyentes para el stream"""
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._listeners: List[Tuple[List[str], "queue.Queue"]] = []
+
+    def get(self, parts: List[str]) -> Any:
+        with self._lock:
+            node = self.root
+            for part in parts:
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return json.loads(json.dumps(node))  # Copia: el árbol sigue cambiando
+
+    def write(self, changes: List[Tuple[List[str], Any]]):
+        """Aplicar varias asignaciones (None borra) de forma atómica y avisar a los streams"""
+        with self._lock:
+            for parts, value in changes:
+                self._set(parts, _strip_nulls(value))
+            listeners = list(self._listeners)
+        for parts, value in changes:
+            for listen_parts, events in listeners:
+                if parts[:len(listen_parts)] == listen_parts:
+                    relative = "/" + "/".join(parts[len(listen_parts):])
+                    events.put(("put", relative, _strip_nulls(value)))
+                elif listen_parts[:len(parts)] == parts:
+                    events.put(("put", "/", self.get(listen_parts)))
+
+    def listen(self, parts: List[str]) -> "queue.Queue":
+        events = queue.Queue()
+        with self._lock:
+            self._listeners.append((parts, events))
+        return events
+
+    def unlisten(self, events: "queue.Queue"):
+        with self._lock:
+            self._listeners = [(p, q) for p, q in self._listeners if q is not events]
+
+    def _set(self, parts: List[str], value: Any):
+        if not parts:
+            self.root = value if isinstance(value, dict) else {}
+            return
+        node = self.root
+        trail = []
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[part] = child
+            trail.append((node, part))
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+            # RTDB no guarda nodos vacíos
+            for parent, part in reversed(trail):
+                if parent[part]:
+                    break
+                del parent[part]
+        else:
+            node[parts[-1]] = value
+
+
+def _strip_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        cleaned = {k: _strip_nulls(v) for k, v in value.items()}
+        return {k: v for k, v in cleaned.items() if v is not None} or None
+    return value
+
+
+def _query(collection: str, node: Any, params: Dict[str, str]) -> Tuple[int, Any]:
+    """orderBy + startAt/endAt + limitToFirst/limitToLast sobre un nodo"""
+    from storage import QUERY_INDEXES, _order_value
+    order_by = json.loads(params["orderBy"])
+    if order_by != "$key" and order_by not in QUERY_INDEXES.get(collection, []):
+        return 400, {"error": f"Index not defined, add \".indexOn\": \"{order_by}\", for path \"/{collection}\", to the rules"}
+    if not isinstance(node, dict):
+        return 200, None
+
+    items = sorted(node.items(), key=lambda item: _order_value(item[0], item[1], order_by))
+    if "startAt" in params:
+        bound = _order_value("", {order_by: json.loads(params["startAt"])}, order_by)[:2]
+        items = [item for item in items if _order_value(item[0], item[1], order_by)[:2] >= bound]
+    if "endAt" in params:
+        bound = _order_value("", {order_by: json.loads(params["endAt"])}, order_by)[:2]
+        items = [item for item in items if _order_value(item[0], item[1], order_by)[:2] <= bound]
+    if "limitToFirst" in params:
+        items = items[:int(params["limitToFirst"])]
+    if "limitToLast" in params:
+        items = items[-int(params["limitToLast"]):]
+    return 200, dict(items)
+
+
+# ==================== SERVIDOR HTTP ====================
+
+class FakeServices:
+    """
+    RTDB REST (GET/PUT/PATCH/POST/DELETE, consultas, ETag y streaming SSE) y
+    GET /api/v1/servers/<id> de arkstatus en un único servidor HTTP local
+    - latency/jitter: segundos añadidos a cada respuesta (distribución normal)
+    - error_rate: fracción de peticiones que responden error_status (503 por defecto)
+    - retry_after: segundos anunciados en Retry-After cuando error_status es 429 o 503
+    - padding: bytes de relleno por registro sembrado y por respuesta de arkstatus
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, padding: int = 0, seed: Optional[int] = None,
+                 retry_after: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.padding = padding
+        self.random = random.Random(seed)
+        self.db = FakeRTDB()
+        self.servers: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.errors = 0
+        self.streams = 0
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def arkstatus_url(self) -> str:
+        return f"{self.url}/api/v1/servers"
+
+    def env(self) -> Dict[str, str]:
+        """Variables de entorno para apuntar la app a este servidor (antes de importar config)"""
+        return {"FIREBASE_DB_URL": self.url, "ARKSTATUS_URL": self.arkstatus_url}
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors, "streams": self.streams}
+
+    # ==================== DATOS DE PRUEBA ====================
+
+    def seed(self, records: int, admins: int = 5):
+        """Sembrar generators, tasks y members con `records` registros cada uno"""
+        from storage import push_key
+        now = int(time.time())
+        notes = "x" * self.padding
+        tags = ["ADMIN", "builder", "GH", "BR"]
+        changes = []
+        for i in range(records):
+            changes.append((["generators", push_key()], {
+                "name": f"Gen {i}", "start_timestamp": now - self.random.randint(0, 14 * 86400),
+                "duration_seconds": self.random.randint(1, 14) * 86400, "created_by": "seed", "notes": notes
+            }))
+            changes.append((["tasks", push_key()], {
+                "text": f"Tarea {i}", "tag": self.random.choice(tags), "created_by": "seed",
+                "timestamp": now - self.random.randint(0, 30 * 86400), "notes": notes
+            }))
+            changes.append((["members", push_key()], {
+                "name": f"Miembro {i:05d}", "discord": f"user{i}", "vouch": "seed",
+                "trust_level": self.random.choice(["high", "medium", "low"]),
+                "roles": self.random.sample(tags, self.random.randint(0, 2)), "notes": notes
+            }))
+        for i in range(admins):
+            changes.append((["admin_status", f"admin{i}"], {
+                "username": f"admin{i}", "last_heartbeat": now - self.random.randint(0, 600),
+                "active": True, "roles": ["ADMIN"], "heartbeat_interval": 30
+            }))
+        self.db.write(changes)
+
+    def server_status(self, server_id: str) -> Dict[str, Any]:
+        """Estado simulado de un servidor (los jugadores varían entre llamadas)"""
+        state = self.servers.setdefault(server_id, {
+            "name": f"FOG Test Server {server_id}", "map": "TheIsland_WP", "players": 20,
+            "maxPlayers": 70, "ping": 40, "version": "47.11", "online": True, "uptime": 0,
+            "peakPlayers": 20, "platform": "PC"
+        })
+        state["players"] = max(0, min(state["maxPlayers"], state["players"] + self.random.randint(-3, 3)))
+        state["peakPlayers"] = max(state["peakPlayers"], state["players"])
+        state["uptime"] += 1
+        state["lastUpdate"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        data = dict(state)
+        if self.padding:
+            data["description"] = "x" * self.padding
+        return {"success": True, "data": data}
+
+    def _delay_and_fail(self) -> bool:
+        """Simular latencia; True si esta petición debe fallar"""
+        self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+
+def _make_handler(services: FakeServices):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive: mide la reutilización de conexiones
+
+        def log_message(self, format, *args):
+            pass
+
+        # ==================== RESPUESTAS ====================
+
+        def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+            payload = json.dumps(body).encode("utf-8") if status != 304 else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_body(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else None
+
+        def _route(self) -> Tuple[str, Optional[List[str]], Dict[str, str]]:
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path.startswith("/api/v1/servers/"):
+                return "arkstatus", [url.path.rsplit("/", 1)[-1]], params
+            if url.path.endswith(".json"):
+                return "rtdb", [p for p in url.path[:-len(".json")].split("/") if p], params
+            return "unknown", None, params
+
+        def _handle(self, method: str):
+            kind, parts, params = self._route()
+            if kind == "unknown":
+                self._send_json(404, {"error": "Not Found"})
+                return
+            if services._delay_and_fail():
+                headers = {}
+                if services.retry_after is not None and services.error_status in (429, 503):
+                    headers["Retry-After"] = str(services.retry_after)
+                self._send_json(services.error_status, {"error": "Injected failure"}, headers)
+                return
+            if kind == "arkstatus":
+                if method != "GET":
+                    self._send_json(405, {"error": "Method Not Allowed"})
+                else:
+                    self._send_json(200, services.server_status(parts[0]))
+                return
+            getattr(self, f"_rtdb_{method.lower()}")(parts, params)
+
+        # ==================== RTDB ====================
+
+        def _rtdb_get(self, parts: List[str], params: Dict[str, str]):
+            if "text/event-stream" in (self.headers.get("Accept") or ""):
+                self._stream(parts)
+                return
+            node = services.db.get(parts)
+            status = 200
+            if "orderBy" in params:
+                status, node = _query(parts[0] if parts else "", node, params)
+
+            headers = {}
+            if self.headers.get("X-Firebase-ETag") == "true":
+                etag = hashlib.sha1(json.dumps(node, sort_keys=True).encode("utf-8")).hexdigest()
+                if self.headers.get("if-none-match") == etag:
+                    self._send_json(304, None, {"ETag": etag})
+                    return
+                headers["ETag"] = etag
+            self._send_json(status, node, headers)
+
+        def _rtdb_put(self, parts: List[str], params: Dict[str, str]):
+            value = self._read_body()
+            services.db.write([(parts, value)])
+            self._send_json(200, value)
+
+        def _rtdb_patch(self, parts: List[str], params: Dict[str, str]):
+            value = self._read_body() or {}
+            services.db.write([(parts + [p for p in path.split("/") if p], v) for path, v in value.items()])
+            self._send_json(200, value)
+
+        def _rtdb_post(self, parts: List[str], params: Dict[str, str]):
+            from storage import push_key
+            key = push_key()
+            services.db.write([(parts + [key], self._read_body())])
+            self._send_json(200, {"name": key})
+
+        def _rtdb_delete(self, parts: List[str], params: Dict[str, str]):
+            services.db.write([(parts, None)])
+            self._send_json(200, None)
+
+        def _stream(self, parts: List[str]):
+            """Server-Sent Events: put inicial con el nodo completo y luego cada cambio"""
+            events = services.db.listen(parts)
+            services.streams += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                self._send_event("put", {"path": "/", "data": services.db.get(parts)})
+                while not services._stopped.is_set():
+                    try:
+                        event, path, data = events.get(timeout=KEEP_ALIVE_INTERVAL)
+                    except queue.Empty:
+                        self.wfile.write(b"event: keep-alive\ndata: null\n\n")
+                        self.wfile.flush()
+                        continue
+                    self._send_event(event, {"path": path, "data": data})
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                services.db.unlisten(events)
+                services.streams -= 1
+
+        def _send_event(self, event: str, payload: Dict[str, Any]):
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+
+# ==================== SESIONES DE PRUEBA ====================
+
+def fake_login(manager, email: str = "bench@fog.local"):
+    """
+    Autenticar un FirebaseManager sin Identity Toolkit (pyrebase llama a googleapis.com
+    para el login; el servidor falso acepta cualquier token)
+    """
+    manager.user = {"idToken": "fake-token", "refreshToken": "fake-token", "email": email}
+    manager.id_token = "fake-token"
+    manager.user_email = email.split("@")[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTDB y arkstatus falsos para benchmarks y pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos añadidos a cada respuesta")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Desviación de la latencia (segundos)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas con error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, default=None, help="Cabecera Retry-After en errores 429/503")
+    parser.add_argument("--records", type=int, default=0, help="Registros sembrados por colección")
+    parser.add_argument("--padding", type=int, default=0, help="Bytes de relleno por registro/respuesta")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    services = FakeServices(
+        args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.error_status, args.padding, args.seed, args.retry_after
+    )
+    if args.records:
+        services.seed(args.records)
+    services.start()
+    for name, value in services.env().items():
+        print(f"{name}={value}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{services.stats()}")
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+# tools/load_test.py
+# Prueba de carga sin navegador: N sesiones de ARKTribeManager en un único proceso
+#
+# Uso:
+#   python -m tools.load_test --sessions 200 --duration 120                 (servicios falsos en proceso)
+#   python -m tools.load_test --sessions 200 --latency 0.08 --error-rate 0.01
+#   python -m tools.load_test --sessions 50 --backend sqlite
+#   python -m tools.load_test --sessions 5 --backend firebase --email x@y.z --password ...   (producción)
+#
+# Cada sesión hace login, cambia de sección, añade y borra registros y mantiene sus bucles
+# de fondo, como un usuario real. Se informa la latencia p50/p95/p99 por acción, el retraso
+# del event loop, las peticiones salientes por segundo y la memoria (RSS) por sesión.
+
+import argparse
+import asyncio
+import inspect
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECTIONS = ["server", "generators", "tasks", "members"]
+
+
+# ==================== PÁGINA SIMULADA ====================
+
+class FakePage:
+    """
+    Sustituto de ft.Page para una sesión sin navegador
+    - run_task programa la corrutina en el event loop de la prueba (desde cualquier hilo)
+    - update() solo cuenta: el coste de serializar controles hacia el cliente no se mide aquí
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stats: "LoadStats"):
+        self.loop = loop
+        self.stats = stats
+        self.controls: List[Any] = []
+        self.drawer = None
+        self.appbar = None
+        self.on_close = None
+        self.updates = 0
+        self._captured: Optional[list] = None
+        self._lock = threading.Lock()
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def run_task(self, handler, *args):
+        future = asyncio.run_coroutine_threadsafe(handler(*args), self.loop)
+        future.add_done_callback(self.stats.task_done)
+        # Los bucles de fondo no terminan: no cuentan como parte de la acción que los lanzó
+        if not handler.__name__.startswith("_bg_"):
+            with self._lock:
+                if self._captured is not None:
+                    self._captured.append(future)
+        return future
+
+    async def measure(self, action, *args) -> float:
+        """Ejecutar una acción y esperar también a las tareas que lanzó (refrescos, guardados)"""
+        with self._lock:
+            self._captured = []
+        started = time.perf_counter()
+        try:
+            result = action(*args)
+            if inspect.isawaitable(result):
+                await result
+            while True:
+                with self._lock:
+                    pending, self._captured = self._captured, []
+                if not pending:
+                    break
+                await asyncio.gather(*[asyncio.wrap_future(f) for f in pending], return_exceptions=True)
+        finally:
+            with self._lock:
+                self._captured = None
+        return time.perf_counter() - started
+
+
+# ==================== MÉTRICAS ====================
+
+class LoadStats:
+    """Latencias por acción, retraso del event loop y peticiones HTTP salientes"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.loop_lag: List[float] = []
+        self.task_errors = 0
+        self.http_requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, action: str, seconds: float):
+        self.latencies.setdefault(action, []).append(seconds)
+
+    def task_done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self.task_errors += 1
+
+    def count_request(self):
+        with self._lock:
+            self.http_requests += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        rows = {}
+        all_values = []
+        for action, values in sorted(self.latencies.items()):
+            rows[action] = _describe(values)
+            all_values.extend(values)
+        rows["TOTAL"] = _describe(all_values)
+        return rows
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _describe(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50_ms": _percentile(values, 50) * 1000,
+        "p95_ms": _percentile(values, 95) * 1000,
+        "p99_ms": _percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0
+    }
+
+
+def _rss_bytes() -> int:
+    """Memoria residente del proceso"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _count_http(stats: LoadStats):
+    """Contar cada petición que sale por requests (Firebase, arkstatus, streams)"""
+    from requests.adapters import HTTPAdapter
+    original = HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        stats.count_request()
+        return original(self, request, *args, **kwargs)
+
+    HTTPAdapter.send = send
+
+
+async def _monitor_loop_lag(stats: LoadStats, stop: asyncio.Event, interval: float = 0.1):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, time.perf_counter() - started - interval))
+
+
+# ==================== SESIÓN SIMULADA ====================
+
+class SimulatedUser:
+    """Un miembro de la tribu usando la app: login, navegación, altas y bajas"""
+
+    def __init__(self, index: int, args, loop, stats: LoadStats):
+        from main import ARKTribeManager
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(index)
+        self.page = FakePage(loop, stats)
+        self.app = ARKTribeManager(self.page)
+        self.email = f"load{index}@fog.local"
+
+    async def login(self):
+        seconds = await self.page.measure(self._login)
+        self.stats.record("login", seconds)
+
+    async def _login(self):
+        manager = self.app.firebase
+        if self.args.backend == "fake":
+            from tools.fake_services import fake_login
+            fake_login(manager, self.email)
+            ok = True
+        else:
+            email = self.args.email or self.email
+            ok, message = await asyncio.to_thread(manager.login, email, self.args.password)
+            if not ok:
+                raise RuntimeError(f"Login fallido ({email}): {message}")
+        self.app._handle_login_success(self.email)
+
+    async def run(self, deadline: float):
+        while time.monotonic() < deadline:
+            action, handler, args = self._next_action()
+            try:
+                seconds = await self.page.measure(handler, *args)
+                self.stats.record(action, seconds)
+            except Exception as e:
+                self.stats.record(f"{action} (error)", 0.0)
+                if self.args.verbose:
+                    print(f"Sesión {self.index}: {action} falló: {e}")
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think))
+
+    def close(self):
+        self.app._handle_session_close()
+
+    def _next_action(self):
+        app = self.app
+        section = app.current_section
+        roll = self.rng.random()
+        if section == "generators" and roll < 0.25:
+            return "add_generator", self._add_generator, ()
+        if section == "tasks" and roll < 0.25:
+            return "add_task", self._add_task, ()
+        if section == "members" and roll < 0.2:
+            return "add_member", self._add_member, ()
+        if section in ("generators", "tasks", "members") and roll < 0.4:
+            return f"delete_{section[:-1]}", self._delete_own, (section,)
+        if roll < 0.55:
+            return "refresh", app._handle_refresh_click, ()
+        target = self.rng.choice([s for s in SECTIONS if s != section])
+        return f"open_{target}", app._handle_section_change, (target,)
+
+    async def _add_generator(self):
+        view = self.app.generators_view
+        view.name_field.value = f"Gen {self.index}-{self.rng.randint(0, 9999)}"
+        view.duration_field.value = str(self.rng.randint(1, 14))
+        await view._add_generator()
+
+    async def _add_task(self):
+        view = self.app.tasks_view
+        view.task_control.value = f"Tarea de carga {self.index}"
+        view.tag_dropdown.value = self.rng.choice(["ADMIN", "builder", "GH", "BR"])
+        await view._add_task()
+
+    async def _add_member(self):
+        view = self.app.members_view
+        view.name_field.value = f"Load {self.index}-{self.rng.randint(0, 9999)}"
+        view.discord_field.value = f"load{self.index}"
+        view.vouch_field.value = "load_test"
+        await view._add_member()
+
+    async def _delete_own(self, section: str):
+        """Borrar un registro creado por la prueba (nunca datos reales)"""
+        username = self.app.firebase.user_email
+        if section == "generators":
+            view = self.app.generators_view
+            own = [gid for gid, g in view.generators.items() if g.created_by == username]
+            if own:
+                await view._delete_generator(own[0])
+        elif section == "tasks":
+            view = self.app.tasks_view
+            own = [tid for tid, t in view.tasks if t.created_by == username]
+            if own:
+                await view._delete_task(own[0])
+        else:
+            view = self.app.members_view
+            own = [mid for mid, m in view.members if m.vouch == "load_test" and m.discord == f"load{self.index}"]
+            if own:
+                await view._delete_member(own[0])
+
+
+# ==================== EJECUCIÓN ====================
+
+def _prepare_environment(args) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Apuntar config al backend elegido (antes de importar la app)
+    Returns: (servicios falsos, DATA_DIR temporal creado aquí o None si venía del entorno)
+    """
+    data_dir = None
+    if "DATA_DIR" not in os.environ:
+        data_dir = os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="fog-load-")
+    services = None
+    if args.backend in ("fake", "sqlite"):
+        from tools.fake_services import FakeServices
+        services = FakeServices(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, padding=args.padding, seed=1
+        )
+        os.environ["ARKSTATUS_URL"] = services.arkstatus_url
+        if args.backend == "fake":
+            os.environ["FIREBASE_DB_URL"] = services.url
+        if args.records:
+            services.seed(args.records)
+        services.start()
+    if args.backend == "sqlite":
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ.setdefault("SQLITE_PATH", os.path.join(os.environ["DATA_DIR"], "load.sqlite3"))
+    return services, data_dir
+
+
+async def run(args) -> Dict[str, Any]:
+    services, data_dir = _prepare_environment(args)
+    try:
+        return await _run_sessions(args, services)
+    finally:
+        if services:
+            services.stop()
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+async def _run_sessions(args, services) -> Dict[str, Any]:
+    stats = LoadStats()
+    _count_http(stats)
+    if args.backend == "sqlite":
+        from sqlite_backend import get_database
+        database = get_database()
+        args.password = args.password or "load-test"
+        for index in range(args.sessions):
+            database.create_user(f"load{index}@fog.local", args.password)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(stats, stop))
+
+    rss_before = _rss_bytes()
+    users = [SimulatedUser(index, args, loop, stats) for index in range(args.sessions)]
+    for user in users:
+        await user.login()
+        await asyncio.sleep(args.ramp / max(args.sessions, 1))
+    rss_after = _rss_bytes()
+
+    requests_before = stats.http_requests
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*[user.run(deadline) for user in users])
+    elapsed = time.monotonic() - started
+    requests_made = stats.http_requests - requests_before
+
+    import status_poller
+    poller_stats = status_poller.poller.stats()
+
+    stop.set()
+    await monitor
+    for user in users:
+        user.close()
+
+    return {
+        "backend": args.backend,
+        "sessions": args.sessions,
+        "duration_s": elapsed,
+        "actions": stats.summary(),
+        "loop_lag": _describe(stats.loop_lag),
+        "task_errors": stats.task_errors,
+        "http_requests": requests_made,
+        "requests_per_s": requests_made / elapsed if elapsed else 0.0,
+        "server_requests_per_s": services.requests / elapsed if services and elapsed else None,
+        "status_fetches": poller_stats["fetches"],
+        "rss_bytes": _rss_bytes(),
+        "rss_per_session": (rss_after - rss_before) / max(args.sessions, 1)
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"\n{report['sessions']} sesiones, backend {report['backend']}, {report['duration_s']:.0f} s")
+    print(f"{'acción':<22}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = dict(report["actions"], **{"event loop lag": report["loop_lag"]})
+    for name, row in rows.items():
+        print(f"{name:<22}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print(f"\nPeticiones salientes: {report['http_requests']} ({report['requests_per_s']:.1f}/s)")
+    print(f"Consultas arkstatus:  {report['status_fetches']} (compartidas por todas las sesiones)")
+    print(f"Errores en tareas:    {report['task_errors']}")
+    print(f"RSS total:            {report['rss_bytes'] / 1048576:.1f} MiB")
+    print(f"RSS por sesión:       {report['rss_per_session'] / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de sesiones simultáneas de ARKTribeManager")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga tras el login")
+    parser.add_argument("--ramp", type=float, default=10, help="Segundos para repartir los logins")
+    parser.add_argument("--think", type=float, default=3.0, help="Pausa media entre acciones (s)")
+    parser.add_argument("--backend", choices=["fake", "sqlite", "firebase"], default="fake",
+                        help="fake = RTDB/arkstatus falsos en proceso; firebase = servicios reales")
+    parser.add_argument("--email", help="Cuenta real (solo --backend firebase)")
+    parser.add_argument("--password", help="Contraseña de la cuenta (firebase) o de los usuarios locales (sqlite)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada (fake/sqlite)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--records", type=int, default=100, help="Registros sembrados por colección (fake)")
+    parser.add_argument("--json", help="Guardar el informe en este fichero")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if args.backend == "firebase" and not (args.email and args.password):
+        parser.error("--backend firebase requiere --email y --password")
+
+    report = asyncio.run(run(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
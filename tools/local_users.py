@@ -0,0 +1,30 @@
+# tools/local_users.py
+# Alta de usuarios para el backend local (STORAGE_BACKEND=sqlite)
+#
+# Uso:
+#   python -m tools.local_users admin@fog.local contraseña
+#   SQLITE_PATH=/tmp/fog.sqlite3 python -m tools.local_users admin@fog.local contraseña
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SQLITE_PATH
+from sqlite_backend import get_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crear o reemplazar un usuario del backend SQLite")
+    parser.add_argument("email")
+    parser.add_argument("password")
+    parser.add_argument("--db", default=SQLITE_PATH, help="Fichero SQLite (por defecto SQLITE_PATH)")
+    args = parser.parse_args()
+    
+    get_database(args.db).create_user(args.email, args.password)
+    print(f"Usuario {args.email} guardado en {args.db}")
+
+
+if __name__ == "__main__":
+    main()
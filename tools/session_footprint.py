@@ -0,0 +1,59 @@
+# tools/session_footprint.py
+# Medición de memoria por sesión y reutilización de conexiones hacia Firebase
+#
+# Uso:
+#   python -m tools.session_footprint --sessions 40
+#   FIREBASE_SHARED_APP=0 python -m tools.session_footprint --sessions 40   (modo antiguo)
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FIREBASE_SHARED_APP
+from firebase_manager import FirebaseManager, get_pool_stats
+
+
+def measure(sessions: int, reads: int) -> dict:
+    """Crear N sesiones, hacer lecturas y medir memoria y conexiones"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    
+    managers = [FirebaseManager() for _ in range(sessions)]
+    
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    # Lecturas públicas (sin token) para ejercitar el pool HTTP
+    for _ in range(reads):
+        for manager in managers:
+            try:
+                manager.db.child(".info").child("serverTimeOffset").get()
+            except Exception:
+                pass
+    
+    stats = get_pool_stats()
+    stats["shared_app"] = FIREBASE_SHARED_APP
+    stats["bytes_per_session"] = (after - before) // max(sessions, 1)
+    stats["peak_bytes"] = peak - before
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por sesión y reutilización de conexiones")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--reads", type=int, default=2, help="Lecturas por sesión (0 = sin red)")
+    args = parser.parse_args()
+    
+    stats = measure(args.sessions, args.reads)
+    for key, value in stats.items():
+        print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# write_queue.py
+# Cola de escrituras en segundo plano (por proceso) para las mutaciones optimistas de las vistas
+
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import requests
+from config import WRITE_QUEUE_DELAY, WRITE_MAX_ATTEMPTS, WRITE_RETRY_BASE, WRITE_RETRY_MAX, WRITE_JOURNAL
+from journal import MutationJournal
+
+
+class PendingWrite:
+    """Escritura pendiente de una ruta (la última escritura sobre la misma ruta la reemplaza)"""
+
+    __slots__ = ("manager", "path", "value", "callbacks", "attempts", "not_before", "journal_id")
+
+    def __init__(self, manager, path: str, value: Any, journal_id: Optional[int] = None):
+        self.manager = manager  # None = restaurada del diario; se envía con cualquier sesión válida
+        self.path = path
+        self.value = value
+        self.callbacks: List[Callable[[str], None]] = []
+        self.attempts = 0
+        self.not_before = 0.0
+        self.journal_id = journal_id
+
+
+class WriteQueue:
+    """
+    Persiste en segundo plano las escrituras que las vistas ya aplicaron localmente
+    - Coalescencia: varias escrituras a la misma ruta antes del envío = una sola
+    - Lotes: todo lo pendiente de una sesión sale en un único PATCH multi-ruta
+    - Reintentos con backoff exponencial y jitter
+    - Durabilidad: el hilo de envío pasa cada escritura por el diario SQLite antes de enviarla
+      (enqueue no toca disco, se llama desde el bucle de eventos). Los fallos de red o 5xx se
+      reintentan sin límite (y sobreviven a reinicios); un 401 renueva el token y reintenta; los
+      rechazos (4xx) se deshacen al agotar WRITE_MAX_ATTEMPTS
+    """
+
+    def __init__(self):
+        self._pending: "OrderedDict[str, PendingWrite]" = OrderedDict()
+        self._inflight: Dict[str, PendingWrite] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._journal: Optional[MutationJournal] = None
+        self._restored = False
+        self._manager_provider: Optional[Callable[[], Any]] = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.retries = 0
+        self.failed = 0
+
+    def enqueue(self, manager, path: str, value: Any, on_error: Optional[Callable[[str], None]] = None,
+                journal_id: Optional[int] = None):
+        """
+        Encolar escritura (value=None elimina el nodo); on_error(mensaje) si se descarta
+        journal_id: la escritura ya está en el diario (si no, el hilo de envío la registra)
+        """
+        path = path.strip("/")
+        with self._cond:
+            op = self._pending.pop(path, None)
+            if op is None:
+                op = PendingWrite(manager, path, value, journal_id)
+            else:
+                self.coalesced += 1
+                op.value = value
+                op.manager = manager
+                op.journal_id = journal_id  # None: el valor nuevo se registra al enviarse
+            if on_error:
+                op.callbacks.append(on_error)
+            self._pending[path] = op  # Al final: la escritura más reciente gana al fusionar rutas
+            self.enqueued += 1
+
+            self._ensure_worker()
+            self._cond.notify()
+
+    def start(self):
+        """Reenviar lo que quedó en el diario (llamar cuando haya una sesión autenticada)"""
+        if WRITE_JOURNAL:
+            with self._cond:
+                self._ensure_worker()  # El hilo carga el diario al arrancar
+
+    def set_manager_provider(self, provider: Callable[[], Any]):
+        """provider() -> cualquier sesión de almacenamiento autenticada (para escrituras restauradas)"""
+        self._manager_provider = provider
+
+    @property
+    def journal(self) -> Optional[MutationJournal]:
+        if self._journal is None and WRITE_JOURNAL:
+            self._journal = MutationJournal()
+        return self._journal
+
+    def pending(self, collection: str) -> Dict[str, Any]:
+        """Escrituras aún no confirmadas bajo una colección: {ruta relativa: valor}"""
+        prefix = collection.strip("/") + "/"
+        with self._cond:
+            ops = list(self._inflight.values()) + list(self._pending.values())
+        return {op.path[len(prefix):]: op.value for op in ops if op.path.startswith(prefix)}
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "retries": self.retries,
+            "failed": self.failed
+        }
+        if self.journal:
+            stats["journal"] = self.journal.stats()
+        return stats
+
+    def _restore(self):
+        """Cargar una vez las mutaciones que quedaron sin confirmar en el diario (hilo de envío)"""
+        if self._restored or not self.journal:
+            return
+        self._restored = True
+        restored = self.journal.pending()
+        with self._cond:
+            count = 0
+            for journal_id, path, value, _owner in restored:
+                # Lo encolado desde que arrancó el proceso es más reciente que lo del diario
+                if any(path == p or path.startswith(p + "/") for p in self._pending):
+                    continue
+                self._pending[path] = PendingWrite(None, path, value, journal_id)
+                self._pending.move_to_end(path, last=False)
+                count += 1
+        if count:
+            print(f"Reenviando {count} escrituras pendientes del diario")
+
+    def _journal_ops(self, ops: List[PendingWrite]):
+        """Registrar en el diario, antes de enviarlas, las escrituras que aún no lo están"""
+        if not self.journal:
+            return
+        for op in ops:
+            if op.journal_id is None:
+                op.journal_id = self.journal.append(op.path, op.value, getattr(op.manager, "user_email", None))
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+            self._thread.start()
+
+    # ==================== WORKER ====================
+
+    def _run(self):
+        self._restore()
+        while True:
+            with self._cond:
+                while not self._ready():
+                    self._cond.wait(self._wait_time())
+
+            # Pequeña ventana para agrupar ráfagas de escrituras
+            time.sleep(WRITE_QUEUE_DELAY)
+
+            with self._cond:
+                now = time.monotonic()
+                ops = [op for op in self._pending.values() if op.not_before <= now]
+                for op in ops:
+                    del self._pending[op.path]
+                    self._inflight[op.path] = op
+
+            try:
+                # Primero al diario: si el proceso muere, la escritura se reenvía al volver
+                self._journal_ops(ops)
+                groups: Dict[int, List[PendingWrite]] = {}
+                for op in ops:
+                    if op.manager is None or not op.manager.is_authenticated():
+                        op.manager = self._manager_provider() if self._manager_provider else None
+                    groups.setdefault(id(op.manager), []).append(op)
+                for group in groups.values():
+                    if group[0].manager is None:
+                        self._postpone(group, 5.0)  # Sin sesión con token: esperar a que alguien entre
+                    else:
+                        self._flush(group)
+            except Exception as e:
+                print(f"Error en la cola de escrituras: {e}")
+            finally:
+                # Lo que un error inesperado dejó en vuelo vuelve a la cola
+                with self._cond:
+                    stuck = [op for op in ops if self._inflight.get(op.path) is op]
+                if stuck:
+                    self._postpone(stuck, WRITE_RETRY_BASE)
+
+    def _ready(self) -> bool:
+        now = time.monotonic()
+        return any(op.not_before <= now for op in self._pending.values())
+
+    def _wait_time(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return max(0.0, min(op.not_before for op in self._pending.values()) - time.monotonic())
+
+    def _flush(self, ops: List[PendingWrite]):
+        manager = ops[0].manager
+        batch = manager.batch()
+        for op in ops:
+            batch.set(op.path, op.value)
+
+        error = None
+        started = time.monotonic()
+        try:
+            manager.apply_updates(batch.updates, raise_errors=True)
+            self.flushes += 1
+        except Exception as e:
+            error = e
+
+        if error is None and self.journal:
+            self.journal.remove([op.journal_id for op in ops], time.monotonic() - started)
+
+        # 401: el id token caducó (dura una hora); con uno nuevo se reintenta enseguida.
+        # Si no era eso (reglas que deniegan) cuenta como intento y acaba deshaciéndose
+        refreshed = (error is not None and _status(error) == 401
+                     and hasattr(manager, "refresh_id_token") and manager.refresh_id_token())
+
+        with self._cond:
+            for op in ops:
+                self._inflight.pop(op.path, None)
+            if error is None:
+                return
+
+            transient = is_transient(error)
+            # Error local (payload inválido, bug): reintentar no sirve, se descarta al momento
+            rejected = not transient and _response(error) is None
+            for op in ops:
+                if op.path in self._pending:
+                    continue  # Ya hay una escritura más reciente de la misma ruta
+                op.attempts += 1
+                if rejected or (not transient and op.attempts >= WRITE_MAX_ATTEMPTS):
+                    self.failed += 1
+                    if self.journal:
+                        self.journal.remove([op.journal_id])
+                    self._fail(op, str(error))
+                    continue
+                self.retries += 1
+                delay = 0.0 if refreshed else min(WRITE_RETRY_BASE * (2 ** (op.attempts - 1)), WRITE_RETRY_MAX)
+                op.not_before = time.monotonic() + delay * random.uniform(0.5, 1.5)
+                self._pending[op.path] = op
+                self._pending.move_to_end(op.path, last=False)
+            self._cond.notify()
+
+    def _postpone(self, ops: List[PendingWrite], delay: float):
+        with self._cond:
+            for op in ops:
+                self._inflight.pop(op.path, None)
+                if op.path not in self._pending:
+                    op.not_before = time.monotonic() + delay
+                    self._pending[op.path] = op
+                    self._pending.move_to_end(op.path, last=False)
+
+    def _fail(self, op: PendingWrite, error: str):
+        print(f"Escritura descartada en {op.path} tras {op.attempts} intentos: {error}")
+        for callback in op.callbacks:
+            try:
+                callback(error)
+            except Exception as e:
+                print(f"Error en callback de escritura fallida: {e}")
+
+
+def is_transient(error: Exception) -> bool:
+    """Fallo de red, timeout, 5xx, 408 o 429: Firebase no rechazó la escritura, se reintenta"""
+    response = _response(error)
+    if response is None:
+        # Sin respuesta HTTP: solo los errores de red/timeout (o SQLite bloqueado) son pasajeros
+        return isinstance(error, (requests.ConnectionError, requests.Timeout, OSError, sqlite3.OperationalError))
+    return response.status_code >= 500 or response.status_code in (408, 429)
+
+
+def _response(error: Exception):
+    """Respuesta HTTP asociada al error (None si no llegó a haberla)"""
+    response = getattr(error, "response", None)
+    if response is None and error.args and getattr(error.args[0], "response", None) is not None:
+        response = error.args[0].response  # pyrebase envuelve el HTTPError original
+    return response
+
+
+def _status(error: Exception) -> Optional[int]:
+    response = _response(error)
+    return response.status_code if response is not None else None
+
+
+# Instancia única por proceso
+queue = WriteQueue()